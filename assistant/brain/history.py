@@ -0,0 +1,185 @@
+import asyncio
+import functools
+from typing import Awaitable, Callable, List, Optional, Tuple
+from assistant.core.logging_config import logger
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Per-message framing tokens added by the chat format
+MESSAGE_OVERHEAD = 4
+
+SUMMARY_PREFIX = "Önceki konuşmanın özeti:\n"
+
+SUMMARIZE_PROMPT = """
+Aşağıdaki konuşmayı, asistanın sonraki cevaplarda hatırlaması gereken bilgileri
+(kullanıcının istekleri, tercihleri, açılan uygulamalar, yarım kalan konular)
+koruyarak kısa bir Türkçe özet halinde yaz. Sadece özeti yaz.
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding():
+    """
+    The gpt-4o family encoding, loaded on first use (it takes a while).
+    """
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Token count for text; uses tiktoken when installed, else a ~4 chars/token estimate.
+    """
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return len(text) // 4 + 1
+
+
+def message_tokens(message: dict) -> int:
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD
+
+
+class ConversationHistory:
+    """
+    Token-budgeted chat history.
+
+    Messages are kept as whole user/assistant pairs. Once the turns exceed the
+    budget, the oldest ones are folded into a rolling summary by a background
+    task; until that swap happens the request prefix (system prompt, summary,
+    earlier turns) stays byte-identical, so provider prompt caching keeps hitting.
+    Compaction removes enough turns to get back to half the budget, so it runs
+    rarely and each prefix lives for many turns.
+    """
+    def __init__(
+        self,
+        system_prompt: str,
+        budget: int,
+        summarize: Optional[Callable[[str], Awaitable[str]]] = None,
+        hard_limit_factor: float = 2.0,
+    ):
+        self.system = {"role": "system", "content": system_prompt}
+        self.budget = budget
+        self.hard_limit = int(budget * hard_limit_factor)
+        self.summarize = summarize
+
+        self.summary: Optional[dict] = None
+        self.turns: List[Tuple[dict, dict]] = []
+        self._turn_tokens: List[int] = []
+        self._compaction_task = None
+        self.compactions = 0
+
+    @property
+    def turn_tokens(self) -> int:
+        return sum(self._turn_tokens)
+
+    def messages(self) -> List[dict]:
+        messages = [self.system]
+        if self.summary:
+            messages.append(self.summary)
+        for user, assistant in self.turns:
+            messages.append(user)
+            messages.append(assistant)
+        return messages
+
+    def prompt_tokens(self, extra: Optional[List[dict]] = None) -> int:
+        """
+        Local estimate of the prompt size for the next request.
+        """
+        total = message_tokens(self.system) + self.turn_tokens
+        if self.summary:
+            total += message_tokens(self.summary)
+        for message in extra or []:
+            total += message_tokens(message)
+        return total
+
+    def add_turn(self, user_text: str, reply: str):
+        user = {"role": "user", "content": user_text}
+        assistant = {"role": "assistant", "content": reply}
+        self.turns.append((user, assistant))
+        self._turn_tokens.append(message_tokens(user) + message_tokens(assistant))
+
+        if self.turn_tokens > self.hard_limit:
+            # Compaction is failing or lagging far behind: drop whole turns now
+            while len(self.turns) > 1 and self.turn_tokens > self.budget:
+                self.turns.pop(0)
+                self._turn_tokens.pop(0)
+            logger.warning("History over hard limit, dropped oldest turns without summarizing.")
+        elif self.turn_tokens > self.budget:
+            self._schedule_compaction()
+
+    def replace_last_reply(self, reply: str):
+        """
+        Rewrites the newest assistant message (e.g. cut short by barge-in).
+        Only the tail of the prompt changes, so the cached prefix survives.
+        """
+        if not self.turns:
+            return
+        user, _ = self.turns[-1]
+        assistant = {"role": "assistant", "content": reply}
+        self.turns[-1] = (user, assistant)
+        self._turn_tokens[-1] = message_tokens(user) + message_tokens(assistant)
+
+    def clear(self):
+        self.summary = None
+        self.turns = []
+        self._turn_tokens = []
+
+    def _schedule_compaction(self):
+        if self.summarize is None:
+            while len(self.turns) > 1 and self.turn_tokens > self.budget:
+                self.turns.pop(0)
+                self._turn_tokens.pop(0)
+            return
+        if self._compaction_task and not self._compaction_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._compaction_task = loop.create_task(self._compact())
+
+    async def _compact(self):
+        # Fold the oldest turns until what is left fits in half the budget
+        target = self.budget // 2
+        remaining = self.turn_tokens
+        count = 0
+        while count < len(self.turns) - 1 and remaining > target:
+            remaining -= self._turn_tokens[count]
+            count += 1
+        if count == 0:
+            return
+
+        folded = self.turns[:count]
+        transcript = []
+        if self.summary:
+            transcript.append(self.summary["content"])
+        for user, assistant in folded:
+            transcript.append(f"Kullanıcı: {user['content']}")
+            transcript.append(f"Asistan: {assistant['content']}")
+
+        try:
+            summary = await self.summarize(SUMMARIZE_PROMPT + "\n\n" + "\n".join(transcript))
+        except Exception as e:
+            logger.error(f"History compaction failed: {e}")
+            return
+        if not summary:
+            return
+
+        # The hard limit or clear() may have dropped turns while we waited; the
+        # summary is only valid if the folded turns are still the oldest ones
+        if len(self.turns) < count or any(turn is not old for turn, old in zip(self.turns, folded)):
+            logger.info("History changed during compaction, discarding the summary.")
+            return
+        self.summary = {"role": "system", "content": SUMMARY_PREFIX + summary.strip()}
+        del self.turns[:count]
+        del self._turn_tokens[:count]
+        self.compactions += 1
+        logger.info(f"Compacted {count} turns into summary; history now ~{self.prompt_tokens()} tokens.")
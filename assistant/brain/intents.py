@@ -0,0 +1,239 @@
+import difflib
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Entity slots usable in intent patterns, e.g. "{app} aç"
+SLOT_PATTERNS = {
+    "app": r"(?P<app>[\w .+-]{1,40}?)",
+    "site": r"(?P<site>[\w.-]{1,60}?)",
+    "number": r"(?P<number>\d{1,3})",
+    "text": r"(?P<text>.{1,60}?)",
+}
+
+KNOWN_APPS = [
+    "Spotify", "Safari", "Google Chrome", "Firefox", "Finder", "Mail", "Notes",
+    "Music", "Messages", "Calendar", "Photos", "Preview", "Terminal", "Discord",
+    "Slack", "WhatsApp", "Telegram", "Zoom", "Visual Studio Code", "Xcode",
+    "VTube Studio", "Steam", "System Settings", "App Store", "Calculator",
+]
+
+# Spoken aliases for apps whose Turkish name differs from the bundle name
+APP_ALIASES = {
+    "notlar": "Notes", "müzik": "Music", "mesajlar": "Messages", "takvim": "Calendar",
+    "fotoğraflar": "Photos", "hesap makinesi": "Calculator", "chrome": "Google Chrome",
+    "vs code": "Visual Studio Code", "vscode": "Visual Studio Code", "ayarlar": "System Settings",
+    "sistem ayarları": "System Settings", "whatsapp": "WhatsApp",
+}
+
+KNOWN_SITES = {
+    "youtube": "youtube.com", "google": "google.com", "twitter": "twitter.com",
+    "x": "x.com", "instagram": "instagram.com", "github": "github.com",
+    "reddit": "reddit.com", "netflix": "netflix.com", "twitch": "twitch.tv",
+    "wikipedia": "wikipedia.org", "gmail": "mail.google.com", "chatgpt": "chatgpt.com",
+}
+
+# Words that carry no meaning for command matching
+FILLER_WORDS = {
+    "lütfen", "hadi", "bi", "bir", "şu", "şunu", "bana", "karien", "kariyer",
+    "mısın", "misin", "musun", "müsün", "artık", "hemen", "şimdi", "bakalım",
+}
+
+# Words around a free-text slot (e.g. a shortcut name) that address the assistant
+# rather than belong to the name; other filler words are kept ("Bir Şey")
+SLOT_EDGE_WORDS = {"lütfen", "hadi", "karien", "kariyer"}
+
+_APOSTROPHE_SUFFIX = re.compile(r"(\w)['’`]\w*")
+_PUNCTUATION = re.compile(r"[^\w\s.%-]")
+_URL = re.compile(r"^[\w-]+(\.[\w-]+)+$")
+
+
+def normalize(text: str) -> str:
+    """
+    Turkish-aware lowercasing; drops case suffixes after apostrophes
+    ("Spotify'ı" -> "spotify"), punctuation and filler words.
+    """
+    return " ".join(word for word, _ in _words(text))
+
+
+def _words(text: str) -> List[Tuple[str, int]]:
+    """
+    Normalized words of text, each with the index of the whitespace-separated
+    token of the original text it came from.
+    """
+    return [
+        (word, index)
+        for index, token in enumerate(text.split())
+        for word in _token_words(token)
+        if word not in FILLER_WORDS
+    ]
+
+
+def _token_words(token: str) -> List[str]:
+    token = token.replace("I", "ı").replace("İ", "i").lower()
+    token = _APOSTROPHE_SUFFIX.sub(r"\1", token)
+    token = _PUNCTUATION.sub(" ", token).replace("%", " ")
+    return [word for word in (w.strip(".") for w in token.split()) if word]
+
+
+def _original_slot(text: str, words: List[Tuple[str, int]], first: int, last: int) -> str:
+    """
+    The part of the original text a free-text slot matched (normalized words
+    first..last), with its case and filler words: everything between the
+    pattern's neighbouring words, minus SLOT_EDGE_WORDS at the edges and the
+    apostrophe suffix of the last word ("Günaydın'ı" -> "Günaydın").
+    """
+    tokens = text.split()
+    start = words[first - 1][1] + 1 if first > 0 else 0
+    end = words[last + 1][1] - 1 if last + 1 < len(words) else len(tokens) - 1
+    span = tokens[min(start, words[first][1]):max(end, words[last][1]) + 1]
+    while len(span) > 1 and set(_token_words(span[0])) <= SLOT_EDGE_WORDS:
+        span.pop(0)
+    while len(span) > 1 and set(_token_words(span[-1])) <= SLOT_EDGE_WORDS:
+        span.pop()
+    span[-1] = _APOSTROPHE_SUFFIX.sub(r"\1", span[-1])
+    return " ".join(span).strip(" ,.;:!?\"'“”")
+
+
+@dataclass
+class IntentMatch:
+    command: str
+    params: List[str]
+    confidence: float
+    acknowledgement: str = ""
+
+
+@dataclass
+class _Pattern:
+    command: str
+    regex: re.Pattern
+    slot: Optional[str]
+    acknowledge: object = None
+
+
+class IntentMatcher:
+    """
+    Local fast path for simple commands.
+
+    Patterns come from each skill manifest's `intents` (plus any extra core commands)
+    and are matched against the normalized transcript. Free-form slots are
+    resolved fuzzily against known apps/sites, and the slot similarity is the
+    match confidence. Anything below the threshold, or where two commands
+    match about equally well, is left to the LLM.
+    """
+    def __init__(self, threshold: float = 0.85, ambiguity_margin: float = 0.05, max_words: int = 8):
+        self.threshold = threshold
+        self.ambiguity_margin = ambiguity_margin
+        self.max_words = max_words
+        self.patterns: List[_Pattern] = []
+
+        # Spoken (lowercase) app name -> name to launch
+        self.apps: Dict[str, str] = {name.lower(): name for name in KNOWN_APPS + installed_apps()}
+        self.apps.update(APP_ALIASES)
+        self._app_keys = list(self.apps)
+
+    @classmethod
+    def from_skills(cls, skills: Iterable, extra: Optional[Dict[str, List[str]]] = None, **kwargs) -> "IntentMatcher":
+        matcher = cls(**kwargs)
+        for skill in skills:
+            for command, templates in skill.intents.items():
+                matcher.add(command, templates, skill.acknowledgement)
+        for command, templates in (extra or {}).items():
+            matcher.add(command, templates)
+        return matcher
+
+    def add(self, command: str, templates: List[str], acknowledge=None):
+        """
+        Templates are written in normalized form, e.g. "sesi {number} yap".
+        """
+        for template in templates:
+            slot = None
+            parts = []
+            for piece in re.split(r"(\{\w+\})", template):
+                slot_match = re.fullmatch(r"\{(\w+)\}", piece)
+                if slot_match:
+                    slot = slot_match.group(1)
+                    parts.append(SLOT_PATTERNS[slot])
+                else:
+                    parts.extend(re.escape(word) for word in normalize(piece).split())
+            self.patterns.append(_Pattern(command, re.compile(" ".join(parts)), slot, acknowledge))
+
+    def _resolve(self, slot: Optional[str], value: str):
+        """
+        Returns (param, confidence) for a slot value.
+        """
+        value = value.strip()
+        if slot is None:
+            return "nan", 1.0
+        if slot == "number":
+            return (value, 1.0) if 0 <= int(value) <= 100 else (value, 0.0)
+        if slot == "text":
+            return value, 0.9 if value else 0.0
+        if slot == "site":
+            if _URL.match(value):
+                return value, 1.0
+            if value in KNOWN_SITES:
+                return KNOWN_SITES[value], 1.0
+            close = difflib.get_close_matches(value, KNOWN_SITES, n=1, cutoff=0.8)
+            if close:
+                return KNOWN_SITES[close[0]], difflib.SequenceMatcher(None, value, close[0]).ratio()
+            return value, 0.0
+        if slot == "app":
+            if value in self.apps:
+                return self.apps[value], 1.0
+            close = difflib.get_close_matches(value, self._app_keys, n=1, cutoff=0.75)
+            if close:
+                return self.apps[close[0]], difflib.SequenceMatcher(None, value, close[0]).ratio()
+            return value, 0.0
+        return value, 0.0
+
+    def match(self, text: str) -> Optional[IntentMatch]:
+        """
+        Returns a confident match, or None if the LLM should handle the input.
+        """
+        words = _words(text)
+        normalized = " ".join(word for word, _ in words)
+        if not normalized or normalized.count(" ") >= self.max_words:
+            return None
+
+        # Best (pattern, param, confidence) per command
+        best_by_command = {}
+        for pattern in self.patterns:
+            m = pattern.regex.fullmatch(normalized)
+            if not m:
+                continue
+            value = m.group(pattern.slot) if pattern.slot else ""
+            if pattern.slot == "text":
+                # Matched on normalized words, but names (e.g. of a shortcut) are taken as spoken
+                first = normalized[:m.start("text")].count(" ")
+                value = _original_slot(text, words, first, first + value.count(" "))
+            param, confidence = self._resolve(pattern.slot, value)
+            current = best_by_command.get(pattern.command)
+            if current is None or confidence > current[2]:
+                best_by_command[pattern.command] = (pattern, param, confidence)
+
+        if not best_by_command:
+            return None
+        ranked = sorted(best_by_command.values(), key=lambda b: b[2], reverse=True)
+        pattern, param, confidence = ranked[0]
+        runner_up = ranked[1][2] if len(ranked) > 1 else 0.0
+        if confidence < self.threshold or confidence - runner_up < self.ambiguity_margin:
+            return None
+
+        params = [param]
+        ack = pattern.acknowledge(pattern.command, params) if pattern.acknowledge else "Tamam."
+        return IntentMatch(pattern.command, params, confidence, ack)
+
+
+def installed_apps() -> List[str]:
+    """
+    App names from /Applications on macOS (empty elsewhere).
+    """
+    names = []
+    for directory in ("/Applications", "/System/Applications"):
+        try:
+            names.extend(entry[:-4] for entry in os.listdir(directory) if entry.endswith(".app"))
+        except OSError:
+            pass
+    return names
@@ -1,7 +1,15 @@
-from openai import OpenAI
+import asyncio
+import json
+import re
+import time
 from assistant.core.config import config
 from assistant.core.logging_config import logger
+from assistant.core.registry import registry
+from assistant.core.tracing import JsonlWriter, tracer
+from assistant.brain.history import ConversationHistory
+from assistant.skills.registry import skills
 
+# {commands} is filled in from the skill manifests (SkillRegistry.prompt_section)
 SYSTEM_PROMPT = """
 Sen Karien'sin, anime kızı kişiliğine sahip kişisel bir asistansın.
 macOS sisteminde çalışıyorsun.
@@ -24,32 +32,79 @@ TARZIN:
     - Duygunu kelimelere dök ("Off...", "Hahaha", "Hmm").
 
 Komutlar (Cümlenin EN SONUNA ekle):
-- [CMD: open_app, Spotify]
-- [CMD: open_url, youtube.com]
-- [CMD: take_screenshot, nan]
-- [CMD: set_volume, 50]
-- [CMD: run_shortcut, Shortcut Name]
+{commands}
 - [CMD: stop_listening, nan] (Sadece kullanıcı AÇIKÇA "Görüşürüz", "Kapat", "Uyu" diyerek vedalaştığında. Hikaye anlatırken veya sohbet ederken ASLA kullanma.)
-- [CMD: close_app, <Uygulama Adı>] (Bir uygulamayı veya sekmeyi kapatmak için.)
+Geçmişte cevabının sonunda [RESULT: ...] görürsen o komutun sonucudur (örn. hata). Sen ASLA [RESULT: ...] yazma.
 
 Örnek:
 Kullanıcı: Spotify'ı aç.
 Karien: [neutral] Açıyorum bakalım, ne dinleyeceğiz? [CMD: open_app, Spotify]
 """
 
+# Core command offered as a tool next to the skills' (LLM_TOOL_CALLS)
+STOP_LISTENING_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "stop_listening",
+        "description": "Sadece kullanıcı AÇIKÇA vedalaştığında konuşmayı bitirir.",
+        "parameters": {"type": "object", "properties": {}},
+    },
+}
+
+# Marks the end of a completion in the token queue
+_END = object()
+
+_NON_WORD = re.compile(r"[^\w\s]")
+
 
 class Brain:
     def __init__(self):
         self.client = None
+        self.async_client = None
         if config.OPENAI_API_KEY:
+            # Imported here: the SDK is slow to import and only needed once the brain is built
+            from openai import AsyncOpenAI, OpenAI
             self.client = OpenAI(api_key=config.OPENAI_API_KEY)
+            self.async_client = AsyncOpenAI(api_key=config.OPENAI_API_KEY)
             logger.info("Brain initialized with OpenAI.")
         else:
             logger.warning("OPENAI_API_KEY not found. Brain will be lobotomized (dummy mode).")
 
-        self.history = [
-            {"role": "system", "content": SYSTEM_PROMPT}
-        ]
+        self.last_prompt_tokens = 0
+        self.last_cached_tokens = 0
+
+        # In-flight speculative completion (see speculate) and its running totals
+        self.speculation = None
+        self.speculation_stats = {"started": 0, "hits": 0, "misses": 0, "wasted_tokens": 0, "wasted_prompt_tokens": 0}
+
+        # Commands as native tools; completed calls are streamed back as [CMD: ...] tags
+        self.tools = skills.tool_schemas() + [STOP_LISTENING_TOOL] if config.LLM_TOOL_CALLS else None
+
+        # Timed deltas of every finished completion, for replaying real streams in benchmarks
+        self.stream_log = JsonlWriter(config.LLM_STREAM_LOG) if config.LLM_STREAM_LOG else None
+
+        self.memory = ConversationHistory(
+            SYSTEM_PROMPT.format(commands=skills.prompt_section()),
+            budget=config.LLM_HISTORY_TOKEN_BUDGET,
+            summarize=self._summarize if self.async_client else None,
+        )
+
+    @property
+    def history(self) -> list:
+        """
+        Messages sent ahead of the next user message (system, summary, past turns).
+        """
+        return self.memory.messages()
+
+    async def _summarize(self, prompt: str) -> str:
+        """
+        Used by the history compactor in the background; never on a turn's critical path.
+        """
+        response = await self.async_client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[{"role": "user", "content": prompt}],
+        )
+        return response.choices[0].message.content
 
     def chat(self, user_text: str) -> str:
         """
@@ -58,63 +113,309 @@ class Brain:
         if not self.client:
             return "[NEUTRAL] I have no brain (API Key missing). I can't think!"
 
-        self.history.append({"role": "user", "content": user_text})
-        
         try:
             response = self.client.chat.completions.create(
                 model="gpt-4o-mini", # Fast and cost effective
-                messages=self.history,
+                messages=self.history + [{"role": "user", "content": user_text}],
             )
             
             reply = response.choices[0].message.content
-            self.history.append({"role": "assistant", "content": reply})
-            
-            # Keep history manageable
-            if len(self.history) > 20:
-                self.history = [self.history[0]] + self.history[-10:]
-                
+            self.record_turn(user_text, reply)
             return reply
             
         except Exception as e:
             logger.error(f"LLM Error: {e}")
             return "[SAD] Something went wrong in my head..."
 
-    def chat_stream(self, user_text: str):
+    def record_turn(self, user_text: str, reply: str, interrupted: bool = False):
+        """
+        Appends a finished (or aborted) exchange to history as a user/assistant pair.
+        An exchange that produced no reply is dropped so history never ends on a dangling user message.
+        """
+        if not reply:
+            return
+        if interrupted:
+            logger.info("Storing interrupted reply in history.")
+        self.memory.add_turn(user_text, reply)
+
+    def truncate_last_reply(self, reply: str):
+        """
+        Replaces the last recorded reply with the part the user actually heard.
+        """
+        logger.info("Truncating interrupted reply in history.")
+        self.memory.replace_last_reply(reply)
+
+    def record_command_result(self, result):
+        """
+        Appends a command's outcome (failure or output) to the last recorded
+        reply, so the next reply knows whether it worked. Only for a command
+        of the newest turn; results that finish earlier go into the reply
+        passed to record_turn.
+        """
+        note = result.describe()
+        if not note or not self.memory.turns:
+            return
+        reply = self.memory.turns[-1][1]["content"]
+        self.memory.replace_last_reply(f"{reply} {note}")
+
+    def _report_usage(self, usage, estimated_tokens: int):
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", 0) or 0
+        self.last_prompt_tokens = usage.prompt_tokens
+        self.last_cached_tokens = cached
+        tracer.annotate(prompt_tokens=usage.prompt_tokens, cached_tokens=cached)
+        logger.info(
+            f"Prompt tokens: {usage.prompt_tokens} (cached {cached}, local estimate {estimated_tokens}), "
+            f"completion tokens: {usage.completion_tokens}"
+        )
+
+    def speculate(self, user_text: str):
+        """
+        Starts the completion for a transcript that is probably final (a stable
+        interim) so the request and first tokens overlap the end of STT.
+        chat_stream() adopts it if the final transcript matches; otherwise it
+        is cancelled and never reaches history.
+        """
+        if not (config.SPECULATIVE_LLM and self.async_client):
+            return
+        key = _speculation_key(user_text)
+        if not key or (self.speculation is not None and self.speculation.key == key):
+            return
+        self.cancel_speculation()
+
+        user_message = {"role": "user", "content": user_text}
+        self.speculation = _Completion(
+            self.async_client,
+            self.history + [user_message],
+            self.memory.prompt_tokens([user_message]),
+            key=key,
+            tools=self.tools,
+        )
+        self.speculation_stats["started"] += 1
+        logger.debug(f"Speculative LLM request for: {user_text!r}")
+
+    def cancel_speculation(self):
+        """
+        Drops the in-flight speculative completion, if any, counting it as wasted.
+        """
+        completion, self.speculation = self.speculation, None
+        if completion is None:
+            return
+        completion.cancel()
+        stats = self.speculation_stats
+        stats["misses"] += 1
+        # Tokens read so far; a few more may have been generated before the cancel landed
+        stats["wasted_tokens"] += completion.completion_tokens
+        stats["wasted_prompt_tokens"] += completion.estimated_tokens
+        tracer.annotate(speculation="miss")
+        logger.info(
+            f"Speculation discarded after {completion.completion_tokens} tokens "
+            f"({stats['hits']}/{stats['started']} hits, {stats['wasted_tokens']} tokens wasted so far)"
+        )
+
+    def _take_speculation(self, user_text: str, messages: list):
+        """
+        Returns the speculative completion if it was made for this transcript
+        and this history; otherwise cancels it and returns None.
+        """
+        completion = self.speculation
+        if completion is None:
+            return None
+        if completion.failed or completion.key != _speculation_key(user_text) or completion.messages[:-1] != messages[:-1]:
+            self.cancel_speculation()
+            return None
+
+        self.speculation = None
+        stats = self.speculation_stats
+        stats["hits"] += 1
+        tracer.annotate(speculation="hit")
+        logger.info(
+            f"Speculation hit, {completion.completion_tokens} tokens already read "
+            f"({stats['hits']}/{stats['started']} hits, {stats['wasted_tokens']} tokens wasted so far)"
+        )
+        return completion
+
+    async def chat_stream(self, user_text: str, record: bool = True):
         """
         Sends user text to LLM and yields chunks of response.
+        A producer task reads the HTTP stream into a bounded queue, so a slow
+        consumer pauses the read instead of buffering without limit.
+        Closing the generator (or cancelling its consumer) closes the HTTP
+        stream and records whatever reply was yielded so far. Pass
+        record=False when the caller records the turn itself.
+        A matching speculative completion (see speculate()) is picked up
+        where it is instead of sending a new request.
         """
-        if not self.client:
+        if not self.async_client:
             yield "[NEUTRAL] I have no brain (API Key missing). I can't think!"
             return
 
-        self.history.append({"role": "user", "content": user_text})
-        
-        full_response = ""
-        
+        user_message = {"role": "user", "content": user_text}
+        messages = self.history + [user_message]
+        completion = self._take_speculation(user_text, messages)
+        if completion is None:
+            completion = _Completion(
+                self.async_client, messages, self.memory.prompt_tokens([user_message]), tools=self.tools
+            )
+        tracer.mark("llm_request", at=completion.requested_at)
+        parts = []
+        completed = False
+
+        try:
+            while True:
+                item = await completion.queue.get()
+                if item is _END:
+                    completed = True
+                    tracer.mark("llm_done", at=completion.done_at)
+                    if completion.usage is not None:
+                        self._report_usage(completion.usage, completion.estimated_tokens)
+                    if self.stream_log is not None:
+                        self.stream_log.write({"user": user_text, "deltas": completion.deltas})
+                    break
+                if isinstance(item, Exception):
+                    logger.error(f"LLM Stream Error: {item}")
+                    yield "[SAD] Something went wrong in my head..."
+                    return
+                if not parts:
+                    tracer.mark("llm_first_token", at=completion.first_token_at)
+                parts.append(item)
+                yield item
+        finally:
+            if not completion.task.done():
+                logger.info("LLM stream aborted, closing HTTP stream.")
+                await completion.close()
+            if record:
+                self.record_turn(user_text, "".join(parts), interrupted=not completed)
+
+
+def _speculation_key(text: str) -> str:
+    """
+    What a transcript must match for a speculative reply to be reused:
+    Turkish-aware lowercase, no punctuation, single spaces.
+    """
+    text = text.replace("I", "ı").replace("İ", "i").lower()
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+class _Completion:
+    """
+    One streaming completion, read into a bounded queue by a background task.
+    Timestamps and usage are kept here and put on the trace by whoever
+    consumes it, so a discarded speculative request leaves no marks.
+    With tools, each tool call is queued as a "[CMD: name, param]" tag the
+    moment its arguments are complete, so the reply parser dispatches it
+    like a written tag.
+    """
+    def __init__(self, client, messages: list, estimated_tokens: int, key: str = None, tools: list = None):
+        self.messages = messages
+        self.tools = tools
+        # index -> [name, argument JSON so far, queued]
+        self.tool_calls = {}
+        self.estimated_tokens = estimated_tokens
+        self.key = key
+        self.queue = asyncio.Queue(maxsize=config.LLM_TOKEN_QUEUE_SIZE)
+        self.requested_at = time.perf_counter()
+        self.first_token_at = None
+        self.done_at = None
+        self.usage = None
+        self.tokens = 0
+        # (ms since the request, text) per content delta
+        self.deltas = []
+        self.failed = False
+        self.task = asyncio.create_task(self._produce(client))
+
+    @property
+    def completion_tokens(self) -> int:
+        return self.usage.completion_tokens if self.usage is not None else self.tokens
+
+    async def _produce(self, client):
+        stream = None
         try:
-            stream = self.client.chat.completions.create(
+            extra = {"tools": self.tools} if self.tools else {}
+            stream = await client.chat.completions.create(
                 model="gpt-4o-mini",
-                messages=self.history,
-                stream=True
+                messages=self.messages,
+                stream=True,
+                stream_options={"include_usage": True},
+                **extra,
             )
-            
-            for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
-                    content = chunk.choices[0].delta.content
+            async for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    self.usage = chunk.usage
+                delta = chunk.choices[0].delta if chunk.choices else None
+                if delta is not None and delta.tool_calls:
+                    for call in delta.tool_calls:
+                        await self._tool_call_delta(call)
+                if delta is not None and delta.content is not None:
+                    content = delta.content
+                    self.tokens += 1
                     logger.debug(f"Chunk received: {content!r}")
-                    full_response += content
-                    yield content
-                else:
+                    await self._put(content)
+                elif delta is None or not delta.tool_calls:
                     logger.debug(f"Empty chunk or no content: {chunk}")
-            
-            self.history.append({"role": "assistant", "content": full_response})
-            
-            # Keep history manageable
-            if len(self.history) > 20:
-                self.history = [self.history[0]] + self.history[-10:]
-                
+                if chunk.choices and chunk.choices[0].finish_reason:
+                    # Arguments that never parsed (or no arguments at all) still dispatch at the end
+                    for index in list(self.tool_calls):
+                        await self._queue_tool_call(index, final=True)
+            self.done_at = time.perf_counter()
+            await self.queue.put(_END)
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            logger.error(f"LLM Stream Error: {e}")
-            yield "[SAD] Something went wrong in my head..."
+            self.failed = True
+            await self.queue.put(e)
+        finally:
+            if stream is not None:
+                await stream.close()
+
+    async def _put(self, content: str):
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        self.deltas.append((round((now - self.requested_at) * 1000, 1), content))
+        await self.queue.put(content)
+
+    async def _tool_call_delta(self, call):
+        state = self.tool_calls.setdefault(call.index, ["", "", False])
+        function = call.function
+        if function is not None:
+            state[0] += function.name or ""
+            state[1] += function.arguments or ""
+        await self._queue_tool_call(call.index)
+
+    async def _queue_tool_call(self, index: int, final: bool = False):
+        """
+        Queues the call's tag once its arguments are a complete JSON object (or at the end).
+        Only a buffer that ends in "}" is worth parsing before then.
+        """
+        name, arguments, queued = self.tool_calls[index]
+        if queued or not name:
+            return
+        if not final and not arguments.rstrip().endswith("}"):
+            return
+        try:
+            args = json.loads(arguments or "{}")
+        except ValueError:
+            args = None
+        if not isinstance(args, dict):
+            if not final:
+                return
+            args = {}
+        self.tool_calls[index][2] = True
+        param = str(args.get("param") or "nan")
+        logger.debug(f"Tool call complete: {name}({arguments})")
+        await self._put(f" [CMD: {name}, {param}]")
+
+    def cancel(self):
+        if not self.task.done():
+            self.task.cancel()
+
+    async def close(self):
+        self.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+
 
-brain = Brain()
+brain = registry.register("brain", Brain)
@@ -21,18 +21,110 @@ class Config:
     ASSETS_DIR = BASE_DIR / "assets"
     
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    # Max LLM tokens buffered ahead of the consumer before the HTTP read pauses
+    LLM_TOKEN_QUEUE_SIZE = int(os.getenv("LLM_TOKEN_QUEUE_SIZE", 64))
+    # Token budget for past turns; older turns are summarized in the background
+    LLM_HISTORY_TOKEN_BUDGET = int(os.getenv("LLM_HISTORY_TOKEN_BUDGET", 3000))
+    # Speculative LLM: once a Deepgram interim has not changed for
+    # SPECULATIVE_STABLE_MS (or local VAD ends the speech), the request starts on
+    # it; a matching final transcript reuses the stream, anything else cancels it
+    SPECULATIVE_LLM = os.getenv("SPECULATIVE_LLM", "1") == "1"
+    SPECULATIVE_STABLE_MS = int(os.getenv("SPECULATIVE_STABLE_MS", 600))
+    # Offer skill commands to the LLM as native tools as well as [CMD: ...] tags;
+    # a call is dispatched as soon as its arguments have streamed in
+    LLM_TOOL_CALLS = os.getenv("LLM_TOOL_CALLS", "0") == "1"
+    # Optional JSONL file that every finished completion's timed deltas are
+    # appended to (replayed by benchmarks/bench_segmenter.py); off when empty
+    LLM_STREAM_LOG = os.getenv("LLM_STREAM_LOG", "")
+    # Depth of the sentence/playback/effects queues between turn pipeline stages;
+    # also how many sentences TTS may synthesize ahead of playback
+    PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 4))
+    # Reply chunking for TTS (see benchmarks/bench_segmenter.py): the first chunk
+    # may end at a clause boundary once SEGMENT_FIRST_MIN_CHARS long, later ones
+    # are merged up to SEGMENT_TARGET_CHARS at sentence ends, none exceeds SEGMENT_MAX_CHARS
+    SEGMENT_FIRST_MIN_CHARS = int(os.getenv("SEGMENT_FIRST_MIN_CHARS", 30))
+    SEGMENT_TARGET_CHARS = int(os.getenv("SEGMENT_TARGET_CHARS", 120))
+    SEGMENT_MAX_CHARS = int(os.getenv("SEGMENT_MAX_CHARS", 250))
+    # Skill commands run on the event loop; one that takes longer than its skill's
+    # timeout (SKILL_TIMEOUT when the skill sets none) is cancelled and its process
+    # killed. SKILL_RESULTS_TO_HISTORY appends failures and command output to the
+    # reply in history ("[RESULT: ...]"), so the next reply can refer to them.
+    SKILL_TIMEOUT = float(os.getenv("SKILL_TIMEOUT", 10))
+    # Run a command as soon as its [CMD] tag (or tool call) is complete in the
+    # stream, while the reply is still being spoken, instead of after the whole
+    # reply has streamed. Commands marked "after_speech" in their manifest, and
+    # stop_listening, still wait for the reply to be spoken.
+    EARLY_COMMAND_DISPATCH = os.getenv("EARLY_COMMAND_DISPATCH", "1") == "1"
+    # Skill manifests (commands, intents, prompt examples); see assistant/skills/registry.py
+    SKILLS_DIR = Path(os.getenv("SKILLS_DIR", CONFIG_DIR / "skills"))
+    SKILL_RESULTS_TO_HISTORY = os.getenv("SKILL_RESULTS_TO_HISTORY", "1") == "1"
+    # Local intent fast path: simple commands skip the LLM above this confidence
+    INTENT_FAST_PATH = os.getenv("INTENT_FAST_PATH", "1") == "1"
+    INTENT_CONFIDENCE = float(os.getenv("INTENT_CONFIDENCE", 0.85))
+    # Per-turn latency timeline (wake, STT, LLM, TTS, playback marks), one JSON
+    # object per turn; summarize with `python -m assistant.core.tracing`
+    TRACE = os.getenv("TRACE", "1") == "1"
+    TRACE_FILE = Path(os.getenv("TRACE_FILE", BASE_DIR / "logs" / "turns.jsonl"))
     ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
     ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
     # Default to a generic female anime voice if not specified.
     # Users should ideally set a specific voice ID in .env
     ELEVENLABS_VOICE_ID = os.getenv("ELEVENLABS_VOICE_ID", "fUjY9K2nAIwlALOwSiwc") # Example: Yui (default) - Replace with Animation Voice ID
     ELEVENLABS_MODEL_ID = os.getenv("ELEVENLABS_MODEL_ID", "eleven_turbo_v2_5")
+    # API endpoint override (local fakes); OpenAI reads OPENAI_BASE_URL itself
+    ELEVENLABS_BASE_URL = os.getenv("ELEVENLABS_BASE_URL") or None
     
     DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
+    # Live STT session: endpoint (overridable for local fakes), KeepAlive cadence
+    # during silence, and how much unfinalized audio is kept for replay on reconnect.
+    DEEPGRAM_URL = os.getenv("DEEPGRAM_URL", "wss://api.deepgram.com/v1/listen")
+    DEEPGRAM_KEEPALIVE_SECONDS = float(os.getenv("DEEPGRAM_KEEPALIVE_SECONDS", 4))
+    DEEPGRAM_REPLAY_SECONDS = float(os.getenv("DEEPGRAM_REPLAY_SECONDS", 10))
+    # Local VAD endpointing (see benchmarks/eval_vad.py for how these were tuned):
+    # the turn ends after VAD_HANGOVER_MS of non-speech, silence before speech is
+    # not uploaded except for the last VAD_PRESPEECH_MS, and Deepgram gets
+    # VAD_FINALIZE_TIMEOUT seconds to answer the Finalize.
+    LOCAL_VAD = os.getenv("LOCAL_VAD", "1") == "1"
+    VAD_HANGOVER_MS = int(os.getenv("VAD_HANGOVER_MS", 700))
+    VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", 100))
+    VAD_SPEECH_MARGIN_DB = float(os.getenv("VAD_SPEECH_MARGIN_DB", 10))
+    VAD_PRESPEECH_MS = int(os.getenv("VAD_PRESPEECH_MS", 300))
+    VAD_FINALIZE_TIMEOUT = float(os.getenv("VAD_FINALIZE_TIMEOUT", 1.5))
+
+    # TTS streaming: play provider audio from memory as it arrives. Playback
+    # starts once TTS_PREBUFFER_MS of audio is buffered (without streaming, once
+    # the whole sentence is generated).
+    TTS_STREAMING = os.getenv("TTS_STREAMING", "1") == "1"
+    TTS_PREBUFFER_MS = int(os.getenv("TTS_PREBUFFER_MS", 300))
+    # Audio output: "pyaudio" (sound card), "null" (discarded at real time, for
+    # headless runs) or "file:<path.wav>" (records what would have played).
+    # One stream stays open; TTS_OUTPUT_BLOCK_MS is its callback block size.
+    TTS_OUTPUT = os.getenv("TTS_OUTPUT", "pyaudio")
+    TTS_OUTPUT_BLOCK_MS = int(os.getenv("TTS_OUTPUT_BLOCK_MS", 20))
+    # Concurrent TTS generations (one pooled HTTP connection each)
+    TTS_WORKERS = int(os.getenv("TTS_WORKERS", 3))
+    # On-disk cache of synthesized phrases (LRU, size-bounded). Only replies up to
+    # TTS_CACHE_MAX_CHARS are cached; longer ones are rarely repeated verbatim.
+    TTS_CACHE = os.getenv("TTS_CACHE", "1") == "1"
+    TTS_CACHE_DIR = Path(os.getenv("TTS_CACHE_DIR", BASE_DIR / ".cache" / "tts"))
+    TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", 100))
+    TTS_CACHE_MAX_CHARS = int(os.getenv("TTS_CACHE_MAX_CHARS", 200))
+    TTS_WARMUP_PHRASES = CONFIG_DIR / "tts_phrases.txt"
 
 
     # VTube Studio
-    VTS_URL = "ws://127.0.0.1:8001"
+    VTS_URL = os.getenv("VTS_URL", "ws://127.0.0.1:8001")
+    VTS_REQUEST_TIMEOUT = float(os.getenv("VTS_REQUEST_TIMEOUT", 5))
+
+    # Native lip-sync: drive the mouth from the audio being played by injecting
+    # parameter values at VTS_LIPSYNC_HZ (VTS accepts 30-60 Hz well). The ids are
+    # VTS input parameters; in the default models MouthOpen drives ParamMouthOpenY
+    # and MouthSmile drives ParamMouthForm. Set VTS_LIPSYNC=0 to use the
+    # microphone-based routing in docs/setup_lip_sync.md instead.
+    VTS_LIPSYNC = os.getenv("VTS_LIPSYNC", "1") == "1"
+    VTS_LIPSYNC_HZ = float(os.getenv("VTS_LIPSYNC_HZ", 50))
+    VTS_MOUTH_OPEN_PARAM = os.getenv("VTS_MOUTH_OPEN_PARAM", "MouthOpen")
+    VTS_MOUTH_FORM_PARAM = os.getenv("VTS_MOUTH_FORM_PARAM", "MouthSmile")
     
     # Load token from JSON file
     _token_path = SECRETS_DIR / "vts_token.json"
@@ -50,6 +142,22 @@ class Config:
     
     # Audio
     MIC_INDEX = int(os.getenv("MIC_INDEX", 0))
+    # Shared microphone capture: ring size, device block size, and how much audio
+    # before the wake word the STT session replays.
+    CAPTURE_BUFFER_SECONDS = float(os.getenv("CAPTURE_BUFFER_SECONDS", 10))
+    CAPTURE_FRAMES_PER_BUFFER = int(os.getenv("CAPTURE_FRAMES_PER_BUFFER", 512))
+    CAPTURE_PREROLL_SECONDS = float(os.getenv("CAPTURE_PREROLL_SECONDS", 1.0))
+    # Standby wake word: Kaldi hop size, and how far above the room noise audio
+    # must be to reach Kaldi at all (see benchmarks/bench_wakeword.py)
+    WAKE_HOP_MS = int(os.getenv("WAKE_HOP_MS", 60))
+    WAKE_GATE_MARGIN_DB = float(os.getenv("WAKE_GATE_MARGIN_DB", 6))
+    # Barge-in: keep listening while the assistant talks. User speech must be
+    # BARGE_IN_ECHO_MARGIN_DB above our own echo (or BARGE_IN_SPEECH_MARGIN_DB
+    # above room noise when silent) for BARGE_IN_MIN_SPEECH_MS to interrupt.
+    BARGE_IN = os.getenv("BARGE_IN", "1") == "1"
+    BARGE_IN_MIN_SPEECH_MS = int(os.getenv("BARGE_IN_MIN_SPEECH_MS", 300))
+    BARGE_IN_ECHO_MARGIN_DB = float(os.getenv("BARGE_IN_ECHO_MARGIN_DB", 9))
+    BARGE_IN_SPEECH_MARGIN_DB = float(os.getenv("BARGE_IN_SPEECH_MARGIN_DB", 12))
     
     @classmethod
     def validate(cls):
@@ -1,60 +1,62 @@
 import asyncio
-import re
+import threading
+import time
+from typing import Optional
+from assistant.core.config import config
 from assistant.core.logging_config import logger
+from assistant.core.pipeline import TurnPipeline, canned_reply
+from assistant.core.registry import registry
+from assistant.core.tracing import tracer
+from assistant.input.barge_in import BargeInMonitor
+from assistant.input.capture import capture
 from assistant.input.stt import stt
 from assistant.input.vosk_stt import vosk_stt
-from assistant.output.tts import tts
+from assistant.input.wakeword import WAKE_KEYWORDS, strip_wake_phrase
+from assistant.output.lipsync import LipSync
+from assistant.output.tts import ECHO_TAIL_SECONDS, tts
 from assistant.output.vts import vts
 from assistant.brain.llm import brain
+from assistant.brain.intents import IntentMatcher
+from assistant.skills.base import SkillResult
+from assistant.skills.registry import skills
+from assistant.skills.runner import SkillRunner
+
+# Audio kept before a detected barge-in onset, for soft word starts
+BARGE_IN_PREROLL_SECONDS = 0.1
+
 
 class Orchestrator:
     def __init__(self):
         self.running = False
         self.is_active = False # Start in Standby
+        self.intents = None
+        self.pipeline: Optional[TurnPipeline] = None
+        self.barge_in = BargeInMonitor(is_playing=lambda: tts.is_echoing)
+        self.lipsync: Optional[LipSync] = None
+        self.skill_runner: Optional[SkillRunner] = None
+        # Detection time of the last barge-in, until the next STT turn starts
+        self.interrupted_at = None
+        self.last_interrupt_latency = None
 
-    def parse_response(self, text: str):
-        """
-        Extracts mood tag and command tag.
-        Returns (mood, clean_text, (cmd, params))
-        """
-        mood = "neutral"
-        cmd_tuple = None
-        
-        # Extract Mood
-        mood_match = re.search(r"^\s*\[([a-zA-Z_]+)\]\s*", text)
-        if mood_match:
-            mood = mood_match.group(1).lower()
-            text = text[mood_match.end():]
-
-        # Extract Command
-        cmd_match = re.search(r"\s*\[CMD:\s*(\w+),\s*(.*?)\]\s*$", text)
-        if cmd_match:
-            cmd = cmd_match.group(1)
-            param = cmd_match.group(2)
-            cmd_tuple = (cmd, [param])
-            text = text[:cmd_match.start()]
-            
-        return mood, text.strip(), cmd_tuple
-
-    def play_startup_sound(self):
-        from assistant.core.config import config
-        import subprocess
-        startup_file = config.ASSETS_DIR / "startup.mp3"
+    def play_startup_sound(self) -> bool:
+        """Plays the greeting and returns once it has finished; True if it actually played."""
+        startup_file = config.ASSETS_DIR / "startup.wav"
         
         if startup_file.exists():
             logger.info(f"Playing startup audio: {startup_file}")
-            subprocess.run(["afplay", str(startup_file)])
+            played = tts.play_file(startup_file)
         else:
-            tts.speak("Selam! Ben Karien! Sana nasıl yardımcı olabilirim?")
+            played = tts.speak_async("Selam! Ben Karien! Sana nasıl yardımcı olabilirim?")
+        tts.wait_for_idle()
+        return played.result()
 
     def play_goodbye_sound(self):
-        from assistant.core.config import config
-        import subprocess
-        goodbye_file = config.ASSETS_DIR / "goodbye.mp3"
+        goodbye_file = config.ASSETS_DIR / "goodbye.wav"
         
         if goodbye_file.exists():
             logger.info(f"Playing goodbye audio: {goodbye_file}")
-            subprocess.run(["afplay", str(goodbye_file)])
+            tts.play_file(goodbye_file)
+            tts.wait_for_idle()
         else:
             tts.speak("Görüşürüz.")
 
@@ -79,18 +81,147 @@ class Orchestrator:
         except Exception as e:
             logger.warning(f"Failed to hide VTS: {e}")
 
+    def start_components(self, warm_tts_cache: bool = True):
+        """
+        Builds the components concurrently on background threads, the wake word
+        listener (microphone, Vosk model) first. Whatever needs one before it
+        is ready waits for it. warm_tts_cache=False skips pre-synthesizing the
+        stock phrases, which calls the paid TTS provider for uncached ones.
+        """
+        registry.warm_up(["capture", "vosk_stt"])
+        # One thread: both import the OpenAI SDK / httpx, and concurrent first
+        # imports of the same package can see it half-initialized
+        registry.warm_up(["brain", "tts"])
+        registry.warm_up(["stt", "vts"])
+        if warm_tts_cache:
+            threading.Thread(target=self.warm_tts_cache, name="tts-cache-warm-up", daemon=True).start()
+
+    def warm_tts_cache(self):
+        """
+        Pre-synthesizes stock phrases (greeting, acknowledgements); already-cached ones cost nothing.
+        """
+        # Built by its warm-up group, not here (see start_components)
+        registry.wait(["tts"])
+        if tts.cache is not None:
+            from assistant.output.tts_cache import load_phrases
+            tts.warm_up(load_phrases())
+
+    async def run_lipsync(self):
+        """
+        Feeds the avatar's mouth from TTS playback for the whole session.
+        """
+        await asyncio.to_thread(registry.wait, ["tts"])
+        try:
+            player = tts.player
+        except RuntimeError:
+            return
+        self.lipsync = LipSync(vts, player, rate_hz=config.VTS_LIPSYNC_HZ)
+        await self.lipsync.run()
+
+    def speculate(self, interim_text: str):
+        """
+        Starts the LLM on a stable interim transcript, unless the fast path will answer it.
+        """
+        if self.intents and self.intents.match(interim_text):
+            brain.cancel_speculation()
+            return
+        brain.speculate(interim_text)
+
+    def make_pipeline(self, user_text: str) -> TurnPipeline:
+        """
+        Builds the reply pipeline; simple commands get a canned reply instead of the LLM.
+        """
+        match = self.intents.match(user_text) if self.intents else None
+        if match:
+            logger.info(f"Intent fast path: {match.command} {match.params} (confidence {match.confidence:.2f})")
+            # Recorded in history like an LLM reply so the LLM knows what just happened
+            reply = f"[neutral] {match.acknowledgement} [CMD: {match.command}, {', '.join(match.params)}]"
+            source = canned_reply(reply)
+            tracer.annotate(fast_path=True)
+            brain.cancel_speculation()
+        else:
+            logger.info("Thinking...")
+            source = brain.chat_stream(user_text, record=False)
+        return TurnPipeline(user_text, source, self.execute)
+
+    async def respond(self, user_text: str):
+        """
+        Runs one reply through the pipeline until it has been spoken.
+        Returns its (cmd, params); stop_listening is left to the caller.
+        """
+        self.pipeline = self.make_pipeline(user_text)
+        return await self.pipeline.run()
+
+    async def respond_or_interrupt(self, user_text: str):
+        """
+        Runs respond() while watching the microphone for barge-in.
+        Returns (cmd_tuple, None), or (None, capture position where the user
+        started talking) if they interrupted.
+        """
+        turn_task = asyncio.create_task(self.respond(user_text))
+        watch_task = asyncio.create_task(self.barge_in.watch())
+        try:
+            done, _ = await asyncio.wait({turn_task, watch_task}, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            turn_task.cancel()
+            watch_task.cancel()
+            raise
+
+        detection = watch_task.result() if watch_task in done else None
+        if detection is None:
+            watch_task.cancel()
+            await asyncio.gather(watch_task, return_exceptions=True)
+            return await turn_task, None
+
+        onset, detected_at = detection
+        tracer.mark("barge_in", at=detected_at)
+        logger.info("Barge-in detected, interrupting.")
+        tts.interrupt()
+        turn_task.cancel()
+        await asyncio.gather(turn_task, return_exceptions=True)
+
+        turn = self.pipeline.turn if self.pipeline else None
+        if turn is not None:
+            reply = turn.spoken_reply()
+            if turn.recorded:
+                brain.truncate_last_reply(reply)
+            else:
+                brain.record_turn(turn.user_text, reply, interrupted=True)
+        self.pipeline = None
+        self.interrupted_at = detected_at
+        return None, onset
+
+    async def execute(self, cmd: str, params: list) -> SkillResult:
+        """
+        Runs a command from the reply through the skill runner and reports how it went.
+        """
+        logger.info(f"Executing command: {cmd} with params: {params}")
+        with tracer.span("command"):
+            result = await self.skill_runner.run(cmd, params)
+        tracer.annotate(command_ok=result.success)
+        if result.success:
+            logger.info(f"Command {cmd} done in {result.duration * 1000:.0f} ms" + (f": {result.output}" if result.output else ""))
+        else:
+            logger.warning(f"Command {cmd} failed after {result.duration * 1000:.0f} ms: {result.error}")
+        return result
+
     async def run(self):
-        # Register Skills
-        from assistant.skills.launcher import LauncherSkill
-        from assistant.skills.system import SystemSkill
-        from assistant.skills.shortcuts import ShortcutsSkill
-        
-        self.skills = [LauncherSkill(), SystemSkill(), ShortcutsSkill()]
+        # Skills are imported on their first command; only their manifests are read here
+        self.skill_runner = SkillRunner(skills, default_timeout=config.SKILL_TIMEOUT)
+
+        self.intents = None
+        if config.INTENT_FAST_PATH:
+            self.intents = IntentMatcher.from_skills(skills.skills.values(), threshold=config.INTENT_CONFIDENCE)
         
         self.running = True
-        
-        # Connect to VTS
-        await vts.connect()
+        self.start_components()
+
+        # Connect to VTS in the background; the first mood trigger is seconds away
+        vts_connect = asyncio.create_task(vts.connect())
+        lipsync_task = asyncio.create_task(self.run_lipsync()) if config.VTS_LIPSYNC else None
+
+        # Open the microphone once for the whole session
+        await asyncio.to_thread(capture.start)
         
         # NOTE: We don't play startup sound at very beginning anymore, 
         # we wait for "Hey Karien".
@@ -100,7 +231,15 @@ class Orchestrator:
         logger.info("Karien started. (Standby)")
         
         # Ensure VTS is hidden at startup
-        self.hide_vts()
+        await asyncio.to_thread(self.hide_vts)
+
+        # Where the next STT turn should start reading (set by the wake word or a barge-in)
+        listen_from = None
+        listen_preroll = 0.0
+        # Capture range of the startup greeting, left out of the wake replay
+        listen_skip = None
+        # The wake replay includes the wake phrase; it is cut from the transcript
+        after_wake = False
 
         while self.running:
             if not self.is_active:
@@ -108,14 +247,22 @@ class Orchestrator:
                 # Listen locally for wake word
                 logger.info("Status: Standby. Listening for 'Hey Karien'...")
                 # Run blocking vosk listener in thread to avoid freezing asyncio loop
-                # Turkish model keywords candidates - using "kariyer" as proxy for "karien"
-                detected = await asyncio.to_thread(vosk_stt.listen_for_wakeword, ["hey kariyer", "merhaba kariyer"])
+                detected = await asyncio.to_thread(vosk_stt.listen_for_wakeword, WAKE_KEYWORDS)
                 
                 if detected:
+                    tracer.begin_turn()
+                    tracer.mark("wake_detected")
                     logger.info("Wake Word Detected! Switching to Active Mode.")
                     self.is_active = True
-                    self.bring_vts_to_front()
-                    self.play_startup_sound()
+                    listen_from = vosk_stt.detected_at
+                    listen_preroll = config.CAPTURE_PREROLL_SECONDS
+                    after_wake = True
+                    await asyncio.to_thread(self.bring_vts_to_front)
+                    greeting_from = capture.position
+                    if await asyncio.to_thread(self.play_startup_sound):
+                        # Replay wake -> greeting, then resume once its echo has died down
+                        greeting_to = capture.position + capture.seconds_to_bytes(ECHO_TAIL_SECONDS)
+                        listen_skip = (greeting_from, greeting_to)
                 else:
                     # If listen returned False (e.g. error), sleep briefly to avoid spin loop
                     await asyncio.sleep(1)
@@ -123,126 +270,74 @@ class Orchestrator:
             else:
                 # --- ACTIVE MODE ---
                 # 1. Listen (Deepgram)
-                user_text = await stt.listen()
+                if tracer.current is None:
+                    tracer.begin_turn()
+                if self.interrupted_at is not None:
+                    self.last_interrupt_latency = time.perf_counter() - self.interrupted_at
+                    self.interrupted_at = None
+                    tracer.annotate(interrupt_to_listen_ms=round(self.last_interrupt_latency * 1000, 1))
+                    logger.info(f"Interrupt-to-listening: {self.last_interrupt_latency * 1000:.0f} ms")
+                on_stable = self.speculate if config.SPECULATIVE_LLM else None
+                if after_wake and on_stable:
+                    on_stable = lambda text: self.speculate(strip_wake_phrase(text))
+                if listen_from is not None:
+                    # Replay audio from just before the wake word (or barge-in) so nothing said after it is lost
+                    user_text = await stt.listen(
+                        start=listen_from, preroll=listen_preroll, skip=listen_skip, on_stable=on_stable
+                    )
+                    listen_from = None
+                    listen_skip = None
+                else:
+                    user_text = await stt.listen(on_stable=on_stable)
+                if after_wake:
+                    user_text = strip_wake_phrase(user_text)
+                    after_wake = False
                 
                 if not user_text:
+                    brain.cancel_speculation()
+                    tracer.discard_turn()
                     continue
                 
                 # Legacy keyword checks REMOVED to solve "Close YouTube" issue.
                 # Now handled by LLM via [CMD: stop_listening, nan].
                 
-                # 2. Think & Act (Streaming)
-                logger.info("Thinking...")
-                
-                # Reset state for new turn
-                full_response_buffer = ""
-                sentence_buffer = ""
-                mood_detected = False
-                
-                # Start streaming
-                stream = brain.chat_stream(user_text)
-                
-                for token in stream:
-                    full_response_buffer += token
-                    sentence_buffer += token
-                    
-                    # Check for Mood at the start (if not yet found)
-                    if not mood_detected:
-                        mood_match = re.search(r"^\s*\[([a-zA-Z_]+)\]", full_response_buffer)
-                        if mood_match:
-                            mood = mood_match.group(1).lower()
-                            logger.info(f"Detected Mood: {mood}")
-                            await vts.trigger_mood(mood)
-                            mood_detected = True
-                            
-                            # Remove mood tag from sentence buffer so we don't speak it
-                            sentence_buffer = sentence_buffer.replace(mood_match.group(0), "", 1)
-
-                    # Check for sentence delimiters
-                    if re.search(r"[.!?]\s", sentence_buffer):
-                        parts = re.split(r"([.!?]\s)", sentence_buffer, 1)
-                        if len(parts) >= 2:
-                            sentence = parts[0] + parts[1] 
-                            remainder = "".join(parts[2:]) 
-                            
-                            if "[" not in sentence:
-                                # Double check and clean any remaining mood tags
-                                clean_sentence = re.sub(r"\[[a-zA-Z_]+\]", "", sentence).strip()
-                                if clean_sentence:
-                                    tts.speak_async(clean_sentence)
-                                sentence_buffer = remainder
-                            else:
-                                # If sentence contains a bracket, it might be a split tag. 
-                                # But we also want to catch tags inside the sentence.
-                                # Let's clean it aggressively.
-                                clean_sentence = re.sub(r"\[[a-zA-Z_]+\]", "", sentence).strip()
-                                if clean_sentence and "[" not in clean_sentence: # confirm no partial tags
-                                    tts.speak_async(clean_sentence)
-                                    sentence_buffer = remainder
-                                else:
-                                    # wait for more data if partial tag
-                                    pass
-
-                # End of stream.
-                remaining_text = sentence_buffer.strip()
-                cmd_match = re.search(r"\[CMD:.*?\]", remaining_text)
-                if cmd_match:
-                    remaining_speakable = remaining_text[:cmd_match.start()].strip()
-                    if remaining_speakable:
-                        clean_remaining = re.sub(r"\[[a-zA-Z_]+\]", "", remaining_speakable).strip()
-                        if clean_remaining:
-                            tts.speak_async(clean_remaining)
+                # 2. Think & Act, unless the user talks over the reply
+                if config.BARGE_IN:
+                    cmd_tuple, listen_from = await self.respond_or_interrupt(user_text)
+                    # The barge-in onset is already the start of speech; earlier audio is our own echo
+                    listen_preroll = BARGE_IN_PREROLL_SECONDS
                 else:
-                    if remaining_text:
-                        clean_remaining = re.sub(r"\[[a-zA-Z_]+\]", "", remaining_text).strip()
-                        if clean_remaining:
-                            tts.speak_async(clean_remaining)
+                    cmd_tuple = await self.respond(user_text)
+                tracer.end_turn(
+                    interrupted=config.BARGE_IN and listen_from is not None,
+                    command=cmd_tuple[0] if cmd_tuple else None,
+                )
 
-                # 3. Parse & Execute Command
-                _, _, cmd_tuple = self.parse_response(full_response_buffer)
-                
-                if cmd_tuple:
-                    cmd, params = cmd_tuple
-                    logger.info(f"Executing command: {cmd} with params: {params}")
-                    
-                    # 1. Handle Core Orchestrator Commands (Termination)
-                    if cmd == "stop_listening":
-                        logger.info("LLM requested stop_listening. Switching to Standby.")
-                        tts.wait_for_idle() # Let her say any pending response first
-                        self.play_goodbye_sound()
-                        self.hide_vts()
-                        self.is_active = False
-                        # No continue needed here as loop ends after TTS
-                    
-                    elif cmd == "close_app":
-                         # Quick implementation for close app
-                         # params is a list, e.g. ['YouTube']
-                         app_name = params[0] if params else ""
-                         if app_name:
-                             import subprocess
-                             logger.info(f"Closing app: {app_name}")
-                             try:
-                                 # AppleScript to quit app
-                                 script = f'tell application "{app_name}" to quit'
-                                 subprocess.run(["osascript", "-e", script])
-                             except Exception as e:
-                                 logger.error(f"Failed to close app {app_name}: {e}")
-
-                    # 2. Handle Skill Commands
-                    else:
-                        executed = False
-                        for skill in self.skills:
-                            if cmd in skill.commands:
-                                skill.execute(cmd, params)
-                                executed = True
-                                break
-                        if not executed:
-                            logger.warning(f"Unknown command: {cmd}")
-                
-                logger.debug("Waiting for TTS to finish...")
-                tts.wait_for_idle()
+                # 3. Terminate on request (speech has already finished)
+                if cmd_tuple and cmd_tuple[0] == "stop_listening":
+                    logger.info("LLM requested stop_listening. Switching to Standby.")
+                    await asyncio.to_thread(self.play_goodbye_sound)
+                    await asyncio.to_thread(self.hide_vts)
+                    await stt.close()
+                    self.is_active = False
 
+        await stt.close()
+        await self.skill_runner.cancel_all()
+        if self.skill_runner.timings.samples:
+            logger.info(f"Skill timings:\n{self.skill_runner.timings.report()}")
+        if lipsync_task is not None:
+            lipsync_task.cancel()
+            try:
+                await lipsync_task
+            except asyncio.CancelledError:
+                pass
+            if self.lipsync is not None:
+                logger.info(f"Lip-sync stats: {self.lipsync.summary()}")
+        await vts_connect
         await vts.close()
+        capture.stop()
+        tts.stop()
+        tracer.close()
         logger.info("Karien stopped.")
 
 orchestrator = Orchestrator()
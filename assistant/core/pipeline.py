@@ -0,0 +1,254 @@
+import asyncio
+from concurrent.futures import Future
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from assistant.brain.llm import brain
+from assistant.core.config import config
+from assistant.core.logging_config import logger
+from assistant.core.response_parser import CommandReady, MoodTag, ResponseParser, TextDelta
+from assistant.core.segmenter import SpeechSegmenter
+from assistant.core.tracing import tracer
+from assistant.output.tts import tts
+from assistant.output.vts import vts
+from assistant.skills.registry import skills
+
+# End-of-stream marker passed down every stage queue
+_END = object()
+
+
+class StageQueue(asyncio.Queue):
+    """
+    Bounded queue between two pipeline stages that remembers its high-water mark.
+    """
+    def __init__(self, name: str, maxsize: int):
+        super().__init__(maxsize)
+        self.name = name
+        self.high_water = 0
+
+    def put_nowait(self, item):
+        super().put_nowait(item)
+        self.high_water = max(self.high_water, self.qsize())
+
+
+@dataclass
+class Turn:
+    """
+    What the current reply has produced so far, so it can be cut down to
+    what the user actually heard if they interrupt.
+    """
+    user_text: str
+    mood: str = "neutral"
+    reply: List[str] = field(default_factory=list)
+    sentences: List[Tuple[str, Future]] = field(default_factory=list)
+    # Commands handed to a skill (appended before they run), in stream order
+    executed: List[Tuple[str, List[str]]] = field(default_factory=list)
+    # Their outcome notes for history (see SKILL_RESULTS_TO_HISTORY)
+    results: List[str] = field(default_factory=list)
+    recorded: bool = False
+
+    def recorded_reply(self) -> str:
+        return " ".join(["".join(self.reply)] + self.results)
+
+    def spoken_reply(self) -> str:
+        spoken = []
+        for text, future in self.sentences:
+            if not (future.done() and future.result()):
+                break
+            spoken.append(text)
+        reply = f"[{self.mood}] " + " ".join(spoken + ["…"])
+        for cmd, params in self.executed:
+            # The command ran even though its announcement was cut off
+            reply += f" [CMD: {cmd}, {', '.join(params) or 'nan'}]"
+        return " ".join([reply] + self.results)
+
+
+async def canned_reply(text: str):
+    """
+    A fixed reply shaped like an LLM stream (used by the intent fast path).
+    """
+    yield text
+
+
+class TurnPipeline:
+    """
+    One assistant reply as explicit async stages joined by bounded queues:
+
+        reply source -> parser/segmenter -> TTS synth -> playback
+                                  \\-> effects (mood, command)
+
+    All stages run in one TaskGroup, so cancelling run() (barge-in, shutdown)
+    cancels every stage; closing the source closes the LLM request. Bounded
+    queues give backpressure: synthesis never runs more than a few sentences
+    ahead of playback. Commands are awaited (see SkillRunner), never run on
+    a thread; with EARLY_COMMAND_DISPATCH each goes to the effects stage the
+    moment its tag is parsed, so it runs while the reply is still being
+    synthesized and spoken.
+    """
+    def __init__(
+        self,
+        user_text: str,
+        source: AsyncIterator[str],
+        execute: Callable[[str, List[str]], Awaitable],
+        queue_size: int = None,
+    ):
+        size = queue_size or config.PIPELINE_QUEUE_SIZE
+        self.turn = Turn(user_text)
+        self.source = source
+        self.execute = execute
+        self.command: Optional[Tuple[str, List[str]]] = None
+        # Commands already handed to the effects stage, in stream order
+        self.dispatched: List[Tuple[str, List[str]]] = []
+        # Commands waiting for the end of the reply
+        self.deferred: List[Tuple[str, List[str]]] = []
+        self.spoken = asyncio.Event()
+        self._mood_seen = False
+        self.segmenter = SpeechSegmenter(
+            first_min_chars=config.SEGMENT_FIRST_MIN_CHARS,
+            target_chars=config.SEGMENT_TARGET_CHARS,
+            max_chars=config.SEGMENT_MAX_CHARS,
+        )
+
+        self.tokens = StageQueue("tokens", config.LLM_TOKEN_QUEUE_SIZE)
+        self.sentences = StageQueue("sentences", size)
+        self.playback = StageQueue("playback", size)
+        self.effects = StageQueue("effects", size)
+        self.queues = [self.tokens, self.sentences, self.playback, self.effects]
+
+    def depths(self) -> Dict[str, Tuple[int, int]]:
+        """
+        (current, high-water) depth per stage queue, plus the TTS engine's own queues.
+        """
+        depths = {q.name: (q.qsize(), q.high_water) for q in self.queues}
+        depths["tts_jobs"] = (tts.jobs.qsize(), None)
+        depths["tts_playback"] = (tts.queue.qsize(), None)
+        return depths
+
+    async def run(self) -> Optional[Tuple[str, List[str]]]:
+        """
+        Runs every stage to completion (everything spoken) and returns the
+        (cmd, params) from the reply, if any. stop_listening is returned, not executed.
+        """
+        try:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(self._source_stage())
+                group.create_task(self._segmenter_stage())
+                group.create_task(self._synth_stage())
+                group.create_task(self._playback_stage())
+                group.create_task(self._effects_stage())
+        finally:
+            depths = ", ".join(
+                f"{name} {now}/{'-' if high is None else high}" for name, (now, high) in self.depths().items()
+            )
+            logger.debug(f"Stage queues (depth/high-water): {depths}")
+        return self.command
+
+    async def _source_stage(self):
+        async with aclosing(self.source) as stream:
+            async for token in stream:
+                self.turn.reply.append(token)
+                await self.tokens.put(token)
+        await self.tokens.put(_END)
+
+    async def _segmenter_stage(self):
+        parser = ResponseParser()
+        while (token := await self.tokens.get()) is not _END:
+            await self._route(parser.feed(token))
+        await self._route(parser.finish())
+        await self._speak(self.segmenter.finish())
+
+        # Recorded here, not by the source, so barge-in can truncate it later
+        brain.record_turn(self.turn.user_text, self.turn.recorded_reply())
+        self.turn.recorded = True
+
+        if not config.EARLY_COMMAND_DISPATCH and self.command and self.command[0] != "stop_listening":
+            # Only the reply's last command runs, once the whole reply has streamed
+            self.deferred = [self.command]
+        for command in self.deferred:
+            await self._dispatch(command)
+        await self.sentences.put(_END)
+        await self.effects.put(_END)
+
+    async def _route(self, events):
+        for event in events:
+            if isinstance(event, MoodTag):
+                if not self._mood_seen:
+                    self._mood_seen = True
+                    self.turn.mood = event.mood
+                    await self.effects.put(("mood", event.mood))
+            elif isinstance(event, TextDelta):
+                await self._speak(self.segmenter.feed(event.text))
+            elif isinstance(event, CommandReady):
+                self.command = (event.command, event.params)
+                if config.EARLY_COMMAND_DISPATCH:
+                    await self._dispatch_early(self.command)
+
+    async def _dispatch_early(self, command: Tuple[str, List[str]]):
+        """
+        Runs a command as soon as its tag is complete, unless its manifest
+        says it must wait for the reply to be spoken. stop_listening is
+        returned to the orchestrator, which acts on it once speech has
+        drained. A repeated command runs once.
+        """
+        if command[0] == "stop_listening" or command in self.dispatched or command in self.deferred:
+            return
+        spec = skills.commands.get(command[0])
+        if spec is not None and spec.after_speech:
+            self.deferred.append(command)
+        else:
+            await self._dispatch(command)
+
+    async def _dispatch(self, command: Tuple[str, List[str]]):
+        self.dispatched.append(command)
+        tracer.mark("command_ready")
+        spec = skills.commands.get(command[0])
+        await self.effects.put(("command", (command, spec is not None and spec.after_speech)))
+
+    def _record_result(self, result):
+        """
+        Keeps a command's outcome with its own turn: it goes into the reply
+        recorded at the end of the stream, or, for a command that finishes
+        later, onto that reply, which is then the newest in history.
+        """
+        note = result.describe() if config.SKILL_RESULTS_TO_HISTORY else ""
+        if not note:
+            return
+        self.turn.results.append(note)
+        if self.turn.recorded:
+            brain.record_command_result(result)
+
+    async def _speak(self, chunks):
+        for chunk in chunks:
+            tracer.mark("first_sentence")
+            await self.sentences.put(chunk)
+
+    async def _synth_stage(self):
+        while (text := await self.sentences.get()) is not _END:
+            future = tts.speak_async(text)
+            self.turn.sentences.append((text, future))
+            await self.playback.put((text, future))
+        await self.playback.put(_END)
+
+    async def _playback_stage(self):
+        # Audio plays on the TTS thread; this stage follows it in order
+        while (item := await self.playback.get()) is not _END:
+            _, future = item
+            # Shielded: cancelling this stage must not cancel the TTS-owned future
+            await asyncio.shield(asyncio.wrap_future(future))
+        self.spoken.set()
+
+    async def _effects_stage(self):
+        while (item := await self.effects.get()) is not _END:
+            kind, value = item
+            if kind == "mood":
+                logger.info(f"Detected Mood: {value}")
+                await vts.trigger_mood(value)
+            elif kind == "command":
+                # Commands run one at a time in stream order, next to synthesis and playback
+                command, after_speech = value
+                if after_speech:
+                    await self.spoken.wait()
+                self.turn.executed.append(command)
+                result = await self.execute(*command)
+                self._record_result(result)
@@ -0,0 +1,140 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from assistant.core.logging_config import logger
+
+
+class Component:
+    """
+    One lazily built singleton and its build timing.
+    """
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name = name
+        self.factory = factory
+        self.instance = None
+        self.error: Optional[BaseException] = None
+        self.thread_name = None
+        self.started = None
+        self.init_seconds = None
+        # Time callers spent blocked waiting for the build
+        self.waited_seconds = 0.0
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+
+
+class Registry:
+    """
+    Builds the assistant's singletons (STT, TTS, LLM, VTS, wake word) on first
+    use instead of at import. warm_up() builds them on background threads;
+    anything that needs a component before it is ready just waits.
+    """
+    def __init__(self):
+        self.components: Dict[str, Component] = {}
+        self.created = time.perf_counter()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> "Lazy":
+        self.components[name] = Component(name, factory)
+        return Lazy(self, name)
+
+    def get(self, name: str):
+        component = self.components[name]
+        if component.ready.is_set():
+            return self._result(component)
+
+        waited = time.perf_counter()
+        with component.lock:
+            if not component.ready.is_set():
+                self._build(component)
+            else:
+                component.waited_seconds += time.perf_counter() - waited
+        return self._result(component)
+
+    def _build(self, component: Component):
+        component.thread_name = threading.current_thread().name
+        component.started = time.perf_counter()
+        try:
+            component.instance = component.factory()
+        except Exception as e:
+            component.error = e
+            logger.error(f"Failed to initialize {component.name}: {e}")
+        component.init_seconds = time.perf_counter() - component.started
+        component.ready.set()
+        logger.debug(f"Initialized {component.name} in {component.init_seconds * 1000:.0f} ms")
+
+    def _result(self, component: Component):
+        if component.error is not None:
+            raise RuntimeError(f"{component.name} failed to initialize") from component.error
+        return component.instance
+
+    def is_ready(self, name: str) -> bool:
+        return self.components[name].ready.is_set()
+
+    def warm_up(self, names: List[str]) -> Optional[threading.Thread]:
+        """
+        Builds the named components in order on one background thread. Call it
+        once per group to build groups concurrently.
+        """
+        names = [name for name in names if not self.is_ready(name)]
+        if not names:
+            return None
+        thread = threading.Thread(target=self._warm, args=(names,), name=f"init-{names[0]}", daemon=True)
+        thread.start()
+        return thread
+
+    def _warm(self, names: List[str]):
+        for name in names:
+            try:
+                self.get(name)
+            except RuntimeError:
+                # Already logged; whoever uses it will see the error
+                pass
+
+    def wait(self, names: List[str] = None, timeout: float = None) -> bool:
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        for name in names or list(self.components):
+            remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            if not self.components[name].ready.wait(remaining):
+                return False
+        return True
+
+    def profile(self) -> List[dict]:
+        """
+        Build timing per component, in build start order (offsets from registry creation).
+        """
+        rows = []
+        for c in self.components.values():
+            rows.append({
+                "name": c.name,
+                "thread": c.thread_name,
+                "start_ms": None if c.started is None else (c.started - self.created) * 1000,
+                "init_ms": None if c.init_seconds is None else c.init_seconds * 1000,
+                "waited_ms": c.waited_seconds * 1000,
+                "error": None if c.error is None else repr(c.error),
+            })
+        return sorted(rows, key=lambda r: (r["start_ms"] is None, r["start_ms"] or 0))
+
+
+class Lazy:
+    """
+    Stand-in for a registered singleton: the first attribute access builds it
+    (or waits for a warm-up thread that is building it), then forwards.
+    """
+    __slots__ = ("_registry", "_name")
+
+    def __init__(self, registry: Registry, name: str):
+        object.__setattr__(self, "_registry", registry)
+        object.__setattr__(self, "_name", name)
+
+    def __getattr__(self, attr: str):
+        return getattr(self._registry.get(self._name), attr)
+
+    def __setattr__(self, attr: str, value):
+        setattr(self._registry.get(self._name), attr, value)
+
+    def __repr__(self) -> str:
+        state = "ready" if self._registry.is_ready(self._name) else "not built"
+        return f"<lazy {self._name} ({state})>"
+
+
+registry = Registry()
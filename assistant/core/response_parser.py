@@ -0,0 +1,171 @@
+import re
+from dataclasses import dataclass, field
+from typing import List
+
+# Longest bracketed text still treated as a tag; anything longer is spoken as-is
+MAX_TAG_LENGTH = 200
+
+_TEXT_STOP = re.compile(r"[\[.!?]")
+_TAG_STOP = re.compile(r"[\[\]\n]")
+
+_MOOD_RE = re.compile(r"[a-zA-Z_]+")
+_CMD_RE = re.compile(r"CMD:\s*(\w+)(?:\s*,\s*(.*))?", re.DOTALL)
+
+
+@dataclass
+class TextDelta:
+    """Speakable text in stream order, with tags removed."""
+    text: str
+
+
+@dataclass
+class MoodTag:
+    mood: str
+
+
+@dataclass
+class SentenceReady:
+    text: str
+
+
+@dataclass
+class CommandReady:
+    command: str
+    params: List[str] = field(default_factory=list)
+
+
+class ResponseParser:
+    """
+    Single-pass tokenizer for streamed LLM replies.
+
+    Each character is scanned exactly once (runs of plain text are sliced in
+    bulk up to the next "[", "." "!" or "?"), so a whole turn costs O(n) no
+    matter how the stream is chunked. A "[" split across chunks simply leaves
+    the parser in tag state until the "]" arrives.
+    """
+    def __init__(self):
+        self._sentence = []
+        self._tag = None
+        self._tag_len = 0
+        self._pending_terminal = False
+        self._delta = []
+
+    def feed(self, chunk: str) -> list:
+        # Fast path: plain text with nothing to look at
+        if self._tag is None and not self._pending_terminal and not _TEXT_STOP.search(chunk):
+            if not chunk:
+                return []
+            self._sentence.append(chunk)
+            return [TextDelta(chunk)]
+
+        events = []
+        self._scan(chunk, events)
+        self._flush_delta(events)
+        return events
+
+    def finish(self) -> list:
+        """
+        Flushes whatever is left at the end of the stream.
+        """
+        events = []
+        if self._tag is not None:
+            tag = "".join(self._tag)
+            self._tag = None
+            # A truncated command is dropped rather than spoken
+            if not tag.startswith("CMD"):
+                self._add_text("[")
+                self._scan(tag, events)
+        self._emit_sentence(events)
+        self._flush_delta(events)
+        return events
+
+    def _scan(self, chunk: str, events: list):
+        i = 0
+        n = len(chunk)
+        while i < n:
+            if self._pending_terminal:
+                self._pending_terminal = False
+                if chunk[i].isspace():
+                    self._emit_sentence(events)
+                    # Not part of either sentence, but kept in the delta stream
+                    self._delta.append(chunk[i])
+                    i += 1
+                    continue
+
+            if self._tag is not None:
+                m = _TAG_STOP.search(chunk, i)
+                end = m.start() if m else n
+                self._tag.append(chunk[i:end])
+                self._tag_len += end - i
+                if self._tag_len > MAX_TAG_LENGTH:
+                    self._abandon_tag(events)
+                    i = end
+                    continue
+                if m is None:
+                    return
+                i = m.end()
+                if m.group() == "]":
+                    self._close_tag(events)
+                else:
+                    # "[" or newline inside a tag: it was not a tag after all
+                    self._abandon_tag(events)
+                    i = m.start()
+            else:
+                m = _TEXT_STOP.search(chunk, i)
+                if m is None:
+                    self._add_text(chunk[i:])
+                    return
+                if m.start() > i:
+                    self._add_text(chunk[i:m.start()])
+                i = m.end()
+                if m.group() == "[":
+                    self._tag = []
+                    self._tag_len = 0
+                else:
+                    self._add_text(m.group())
+                    self._pending_terminal = True
+
+    def _abandon_tag(self, events: list):
+        # Speak the bracket and its contents as plain text
+        tag = "".join(self._tag)
+        self._tag = None
+        self._add_text("[")
+        self._scan(tag, events)
+
+    def _add_text(self, text: str):
+        self._sentence.append(text)
+        self._delta.append(text)
+
+    def _flush_delta(self, events: list):
+        if self._delta:
+            events.append(TextDelta("".join(self._delta)))
+            self._delta = []
+
+    def _push(self, events: list, event):
+        # Keep TextDelta ordered relative to the other events
+        self._flush_delta(events)
+        events.append(event)
+
+    def _emit_sentence(self, events: list):
+        sentence = "".join(self._sentence).strip()
+        self._sentence = []
+        if sentence:
+            self._push(events, SentenceReady(sentence))
+
+    def _close_tag(self, events: list):
+        tag = "".join(self._tag)
+        self._tag = None
+
+        cmd_match = _CMD_RE.fullmatch(tag.strip())
+        if cmd_match:
+            param = cmd_match.group(2)
+            params = [param.strip()] if param is not None else []
+            self._push(events, CommandReady(cmd_match.group(1), params))
+        elif _MOOD_RE.fullmatch(tag):
+            self._push(events, MoodTag(tag.lower()))
+        else:
+            # Ordinary bracketed text, keep it
+            self._add_text("[")
+            self._scan(tag, events)
+            self._add_text("]")
+
@@ -0,0 +1,152 @@
+import re
+from typing import List
+
+# Lowercased words that end in a period without ending the sentence ("Dr. Ayşe", "vb. şeyler")
+ABBREVIATIONS = {
+    "dr", "prof", "doç", "yrd", "uzm", "av", "op", "müh", "öğr", "gör", "sn", "bkz", "bknz",
+    "örn", "ör", "vb", "vs", "vd", "yy", "yak", "no", "tel", "cad", "sok", "mah", "apt", "blv",
+    "şti", "ltd", "a.ş", "st", "mr", "mrs", "ms", "etc", "inc", "vol", "min", "maks",
+}
+
+# Conjunctions that start a new clause; the first chunk may be cut just before them
+CLAUSE_CONJUNCTIONS = ["ama", "fakat", "ancak", "lakin", "çünkü", "oysa", "halbuki", "yoksa", "zira"]
+
+# Sentence ends need the following whitespace to be seen, so "3.5", "youtube.com"
+# and "?v=" inside URLs never match. Clause boundaries are ", ; :" before a space
+# or the space before a conjunction.
+_BOUNDARY = re.compile(
+    r"(?P<sentence>[.!?…]+[\"'”’»)]*(?=\s)|\n+)"
+    r"|(?P<clause>[,;:](?=\s))"
+    r"|(?P<conjunction>\s(?=(?:" + "|".join(CLAUSE_CONJUNCTIONS) + r")\s))"
+)
+_LAST_WORD = re.compile(r"[(\"'“‘«]*(\S+)$")
+_NEXT_CHAR = re.compile(r"\S")
+# A boundary match never spans more than this, so rescanning this much tail
+# after each feed catches matches split across chunks
+_RESCAN = 12
+
+
+class SpeechSegmenter:
+    """
+    Cuts speakable reply text into TTS requests.
+
+    The first chunk goes out at its first sentence end, or at a clause
+    boundary (comma, semicolon, colon, or before a conjunction like "ama"
+    or "çünkü") once it is first_min_chars long, so a long opening sentence
+    does not hold back the first audio. Later chunks merge sentences, growing
+    up to target_chars, since they are synthesized while earlier ones play
+    and every extra request costs a provider round trip. No chunk grows past
+    max_chars. Periods after abbreviations, initials and Turkish
+    ordinals ("15. yüzyıl") do not end a sentence.
+    """
+    def __init__(self, first_min_chars: int = 30, target_chars: int = 120, max_chars: int = 250):
+        self.first_min_chars = first_min_chars
+        self.target_chars = target_chars
+        self.max_chars = max_chars
+        self.buffer = ""
+        self.chunks = 0
+        self.emitted_chars = 0
+        self._pos = 0
+        self._sentence_ends: List[int] = []
+        self._clause_ends: List[int] = []
+
+    def feed(self, text: str) -> List[str]:
+        """
+        Adds streamed text; returns the chunks that are ready to synthesize.
+        """
+        self.buffer += text
+        self._scan(final=False)
+        return self._cut(final=False)
+
+    def finish(self) -> List[str]:
+        """
+        Returns whatever is left at the end of the reply.
+        """
+        self._scan(final=True)
+        return self._cut(final=True)
+
+    def _scan(self, final: bool):
+        buffer = self.buffer
+        end = self._pos
+        for m in _BOUNDARY.finditer(buffer, self._pos):
+            if m.lastgroup == "sentence":
+                decided = self._ends_sentence(m, final)
+                if decided is None:
+                    # Ordinal or sentence end depends on text that has not arrived yet
+                    self._pos = m.start()
+                    return
+                if decided:
+                    self._sentence_ends.append(m.end())
+            elif m.lastgroup == "clause":
+                self._clause_ends.append(m.end())
+            else:
+                self._clause_ends.append(m.start())
+            end = m.end()
+        self._pos = max(end, len(buffer) - _RESCAN)
+
+    def _ends_sentence(self, m: re.Match, final: bool):
+        """
+        True/False for a "." that does/does not end the sentence, None if undecided.
+        """
+        if not m.group().startswith(".") or m.group().startswith(".."):
+            return True
+        word = _LAST_WORD.search(self.buffer, 0, m.start())
+        if word is None:
+            return True
+        word = word.group(1)
+        if word.lower() in ABBREVIATIONS or (len(word) == 1 and word.isalpha() and word.isupper()):
+            return False
+        if word.isdigit():
+            # "15. yüzyıl" is an ordinal, "saat 5. Sonra" ends the sentence
+            following = _NEXT_CHAR.search(self.buffer, m.end())
+            if following is None:
+                return True if final else None
+            return not following.group().islower()
+        return True
+
+    def _cut(self, final: bool) -> List[str]:
+        chunks = []
+        while True:
+            at = self._next_cut()
+            if at is None:
+                break
+            chunks.extend(self._take(at))
+        if final:
+            chunks.extend(self._take(len(self.buffer)))
+        return chunks
+
+    def _next_cut(self):
+        if self.chunks == 0:
+            if self._sentence_ends:
+                return self._sentence_ends[0]
+            clause = next((c for c in self._clause_ends if c >= self.first_min_chars), None)
+            if clause is not None:
+                return clause
+        else:
+            # Grow towards target_chars: a chunk at most twice what is already
+            # queued can be synthesized before the speaker runs out of audio
+            target = min(self.target_chars, 2 * self.emitted_chars)
+            sentence = next((s for s in self._sentence_ends if s >= target), None)
+            if sentence is not None and sentence <= self.max_chars:
+                return sentence
+        if len(self.buffer) <= self.max_chars:
+            return None
+        # Too long to wait for: the last sentence end, clause boundary or space that fits
+        for boundaries in (self._sentence_ends, self._clause_ends):
+            fitting = [b for b in boundaries if b <= self.max_chars]
+            if fitting:
+                return fitting[-1]
+        space = self.buffer.rfind(" ", 0, self.max_chars)
+        return space if space > 0 else self.max_chars
+
+    def _take(self, at: int) -> List[str]:
+        chunk = self.buffer[:at].strip()
+        self.buffer = self.buffer[at:]
+        self._pos = max(0, self._pos - at)
+        self._sentence_ends = [b - at for b in self._sentence_ends if b > at]
+        self._clause_ends = [b - at for b in self._clause_ends if b > at]
+        if not chunk:
+            return []
+        self.chunks += 1
+        self.emitted_chars += len(chunk)
+        return [chunk]
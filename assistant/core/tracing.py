@@ -0,0 +1,251 @@
+import argparse
+import json
+import math
+import queue
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from assistant.core.config import config
+from assistant.core.logging_config import logger
+
+# Segments reported by the summary CLI: name -> (from event, to event)
+SEGMENTS = {
+    "wake_to_listen": ("wake_detected", "stt_listen_start"),
+    "stt_first_interim": ("stt_speech_start", "stt_first_interim"),
+    "stt_endpoint": ("stt_speech_end", "stt_final"),
+    "stt_to_llm": ("stt_final", "llm_request"),
+    "llm_first_token": ("llm_request", "llm_first_token"),
+    "first_sentence": ("llm_first_token", "first_sentence"),
+    "sentence_to_tts": ("first_sentence", "tts_request"),
+    "tts_first_byte": ("tts_request", "tts_first_byte"),
+    "tts_to_playback": ("tts_first_byte", "playback_start"),
+    "llm_total": ("llm_request", "llm_done"),
+    "final_to_audio": ("stt_final", "playback_start"),
+    "speech_end_to_audio": ("stt_speech_end", "playback_start"),
+    "final_to_command": ("stt_final", "command_ready"),
+}
+
+
+class TurnTrace:
+    """
+    Timestamped events and spans for one turn, relative to its start (ms).
+    Events keep their first occurrence only.
+    """
+    def __init__(self, session: str, number: int):
+        self.session = session
+        self.number = number
+        self.started = time.perf_counter()
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.events: Dict[str, float] = {}
+        self.spans: Dict[str, List[List[float]]] = defaultdict(list)
+        self.attrs: Dict[str, object] = {}
+
+    def offset(self, at: float = None) -> float:
+        return round(((at or time.perf_counter()) - self.started) * 1000, 1)
+
+    def to_dict(self) -> dict:
+        return {
+            "session": self.session,
+            "turn": self.number,
+            "started_at": self.started_at,
+            "events": self.events,
+            "spans": dict(self.spans),
+            "attrs": self.attrs,
+        }
+
+
+class JsonlWriter:
+    """
+    Appends records to a JSONL file from a background thread, so callers
+    on the event loop never wait for disk.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+        self.thread.start()
+
+    def write(self, record: dict):
+        self.queue.put_nowait(record)
+
+    def _run(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            f = open(self.path, "a", encoding="utf-8")
+        except OSError as e:
+            logger.error(f"Tracing disabled, cannot open {self.path}: {e}")
+            return
+        with f:
+            while True:
+                record = self.queue.get()
+                if record is None:
+                    return
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                if self.queue.empty():
+                    f.flush()
+
+    def close(self, timeout: float = 2.0):
+        self.queue.put(None)
+        self.thread.join(timeout)
+
+
+class Tracer:
+    """
+    Per-turn latency timeline. Hooks call mark()/span()/annotate() on the
+    module-level `tracer`; they are no-ops when tracing is off or no turn is open.
+    Safe to call from TTS and executor threads.
+    """
+    def __init__(self, path=None, enabled: bool = True):
+        self.enabled = enabled
+        self.path = path
+        self.session = uuid.uuid4().hex[:8]
+        self.turns = 0
+        self.current: Optional[TurnTrace] = None
+        self.lock = threading.Lock()
+        self._writer = None
+
+    def begin_turn(self) -> Optional[TurnTrace]:
+        """
+        Opens a new turn, dropping one that was never finished.
+        """
+        if not self.enabled:
+            return None
+        with self.lock:
+            self.turns += 1
+            self.current = TurnTrace(self.session, self.turns)
+            return self.current
+
+    def mark(self, name: str, at: float = None):
+        with self.lock:
+            if self.current is not None and name not in self.current.events:
+                self.current.events[name] = self.current.offset(at)
+
+    def annotate(self, **attrs):
+        with self.lock:
+            if self.current is not None:
+                self.current.attrs.update(attrs)
+
+    @contextmanager
+    def span(self, name: str):
+        turn = self.current
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if turn is not None:
+                with self.lock:
+                    turn.spans[name].append([turn.offset(start), round((time.perf_counter() - start) * 1000, 1)])
+
+    def end_turn(self, **attrs):
+        """
+        Closes the current turn and queues it for the JSONL file.
+        """
+        with self.lock:
+            turn, self.current = self.current, None
+        if turn is None:
+            return
+        turn.attrs.update(attrs)
+        turn.events["turn_end"] = turn.offset()
+        if self._writer is None:
+            self._writer = JsonlWriter(self.path or config.TRACE_FILE)
+        self._writer.write(turn.to_dict())
+
+    def discard_turn(self):
+        with self.lock:
+            self.current = None
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def percentile(values: List[float], p: float) -> float:
+    """
+    Nearest-rank percentile.
+    """
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(records: List[dict], segments: Dict[str, tuple] = None) -> Dict[str, List[float]]:
+    """
+    Samples (ms) per segment and per span name across turns. A segment
+    whose end came first counts as 0: on a speculation hit the LLM request
+    (and maybe its first token) precedes stt_final. speculative_turns()
+    says how many turns that applies to.
+    """
+    samples: Dict[str, List[float]] = defaultdict(list)
+    for record in records:
+        events = record.get("events", {})
+        for name, (start, end) in (segments or SEGMENTS).items():
+            if start in events and end in events:
+                samples[name].append(max(0.0, events[end] - events[start]))
+        for name, spans in record.get("spans", {}).items():
+            samples[f"span:{name}"].extend(duration for _, duration in spans)
+    return samples
+
+
+def speculative_turns(records: List[dict]) -> Dict[str, int]:
+    """
+    Turns per speculation outcome ("hit", "miss"), from the `speculation` attr.
+    """
+    counts: Dict[str, int] = defaultdict(int)
+    for record in records:
+        outcome = record.get("attrs", {}).get("speculation")
+        if outcome:
+            counts[outcome] += 1
+    return dict(counts)
+
+
+def main(argv=None):
+    """
+    python -m assistant.core.tracing [FILE] [--session ID | --all]
+    """
+    ap = argparse.ArgumentParser(prog="python -m assistant.core.tracing", description="Turn latency summary")
+    ap.add_argument("file", nargs="?", default=str(config.TRACE_FILE))
+    group = ap.add_mutually_exclusive_group()
+    group.add_argument("--session", help="session id (default: the last session in the file)")
+    group.add_argument("--all", action="store_true", help="every session in the file")
+    args = ap.parse_args(argv)
+
+    with open(args.file, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if not records:
+        print("No turns recorded.")
+        return
+    if not args.all:
+        session = args.session or records[-1]["session"]
+        records = [r for r in records if r["session"] == session]
+        print(f"Session {session}: {len(records)} turns")
+    else:
+        print(f"{len(records)} turns")
+
+    samples = summarize(records)
+    print(f"{'segment':<24} {'n':>4} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+    names = [name for name in SEGMENTS if name in samples] + sorted(n for n in samples if n.startswith("span:"))
+    for name in names:
+        values = samples[name]
+        print(
+            f"{name:<24} {len(values):>4} {percentile(values, 50):>8.0f} "
+            f"{percentile(values, 90):>8.0f} {percentile(values, 99):>8.0f}"
+        )
+    speculative = speculative_turns(records)
+    if speculative:
+        print(
+            f"Speculative turns: {speculative.get('hit', 0)} hit, {speculative.get('miss', 0)} miss "
+            "(on a hit, segments ending before stt_final count as 0 ms)"
+        )
+
+
+tracer = Tracer(enabled=config.TRACE)
+
+if __name__ == "__main__":
+    main()
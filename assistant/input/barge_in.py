@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+from assistant.core.config import config
+from assistant.core.logging_config import logger
+from assistant.input.capture import capture
+from assistant.input.vad import frame_level_db
+
+# Quietest level treated as barge-in speech (int16 RMS in dB)
+MIN_SPEECH_DB = 50.0
+
+
+class EchoGate:
+    """
+    Separates user speech from the assistant's own voice leaking into the mic.
+
+    The playback signal is used as the echo reference: while it is active the
+    gate learns how loud the echo is (a peak-following envelope, frozen while
+    a frame looks like speech) and only frames clearly above it count. The
+    first frames of every playback are calibration only. Outside playback the
+    reference is the room noise floor. A run of min_speech_frames loud frames
+    is reported as speech.
+    """
+    def __init__(
+        self,
+        speech_margin_db: float = 12.0,
+        echo_margin_db: float = 9.0,
+        min_speech_frames: int = 15,
+        calibration_frames: int = 10,
+    ):
+        self.speech_margin_db = speech_margin_db
+        self.echo_margin_db = echo_margin_db
+        self.min_speech_frames = min_speech_frames
+        self.calibration_frames = calibration_frames
+
+        self.noise_db: Optional[float] = None
+        self.echo_db: Optional[float] = None
+        self.run = 0
+        self._playing = False
+        self._calibrating = 0
+
+    def threshold(self) -> float:
+        threshold = max(MIN_SPEECH_DB, (self.noise_db or 0.0) + self.speech_margin_db)
+        if self._playing and self.echo_db is not None:
+            threshold = max(threshold, self.echo_db + self.echo_margin_db)
+        return threshold
+
+    @staticmethod
+    def _follow(current: Optional[float], level: float, rise: float, fall: float) -> float:
+        if current is None:
+            return level
+        alpha = rise if level > current else fall
+        return current + alpha * (level - current)
+
+    def process(self, level_db: float, playing: bool) -> bool:
+        """
+        Feeds one frame. Returns True once a run of speech frames is complete.
+        """
+        if playing and not self._playing:
+            self._calibrating = self.calibration_frames
+        self._playing = playing
+
+        if playing and self._calibrating > 0:
+            self._calibrating -= 1
+            self.echo_db = self._follow(self.echo_db, level_db, rise=0.5, fall=0.05)
+            self.run = 0
+            return False
+
+        if level_db > self.threshold():
+            self.run += 1
+            if self.run >= self.min_speech_frames:
+                self.run = 0
+                return True
+            return False
+
+        self.run = 0
+        if playing:
+            self.echo_db = self._follow(self.echo_db, level_db, rise=0.3, fall=0.02)
+        else:
+            # Noise floor drops quickly and creeps up slowly
+            self.noise_db = self._follow(self.noise_db, level_db, rise=0.01, fall=0.3)
+        return False
+
+
+class BargeInMonitor:
+    """
+    Watches the shared capture while the assistant is thinking or speaking and
+    reports when the user starts talking over it.
+    """
+    def __init__(self, is_playing: Callable[[], bool], frame_ms: int = 20):
+        self.is_playing = is_playing
+        self.frame_bytes = capture.seconds_to_bytes(frame_ms / 1000)
+        self.min_speech_frames = max(1, config.BARGE_IN_MIN_SPEECH_MS // frame_ms)
+        self.detections = 0
+
+    def _detect(self, reader, stop: threading.Event) -> Optional[Tuple[int, float]]:
+        gate = EchoGate(
+            speech_margin_db=config.BARGE_IN_SPEECH_MARGIN_DB,
+            echo_margin_db=config.BARGE_IN_ECHO_MARGIN_DB,
+            min_speech_frames=self.min_speech_frames,
+        )
+        while not stop.is_set():
+            frame = reader.read(self.frame_bytes, timeout=0.2)
+            if frame is None:
+                if reader.closed:
+                    return None
+                continue
+            if gate.process(frame_level_db(frame), self.is_playing()):
+                # Start of the speech run, so the next STT turn hears all of it
+                onset = reader.pos - self.min_speech_frames * self.frame_bytes
+                return onset, time.perf_counter()
+        return None
+
+    async def watch(self) -> Optional[Tuple[int, float]]:
+        """
+        Returns (capture position where the user's speech began, detection time)
+        once barge-in speech is detected. Cancel the task to stop watching.
+        """
+        reader = capture.reader()
+        if reader is None:
+            # No microphone: never interrupt, just wait to be cancelled
+            logger.warning("Barge-in disabled for this turn (no microphone).")
+            await asyncio.Event().wait()
+        stop = threading.Event()
+        try:
+            result = await asyncio.to_thread(self._detect, reader, stop)
+        finally:
+            stop.set()
+            reader.close()
+        if result is not None:
+            self.detections += 1
+        return result
@@ -0,0 +1,216 @@
+import threading
+from typing import Optional, Tuple
+import pyaudio
+from assistant.core.config import config
+from assistant.core.logging_config import logger
+from assistant.core.registry import registry
+
+
+class RingBuffer:
+    """
+    Fixed-size byte ring shared by one writer and any number of readers.
+    Positions are absolute byte offsets since capture started, so readers can
+    tell how far behind they are and whether their data was overwritten.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self.write_pos = 0
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def write(self, data: bytes):
+        n = len(data)
+        if n > self.capacity:
+            data = data[-self.capacity:]
+            n = self.capacity
+
+        start = self.write_pos % self.capacity
+        first = min(n, self.capacity - start)
+        self._view[start:start + first] = data[:first]
+        if first < n:
+            self._view[:n - first] = data[first:]
+
+        with self.cond:
+            self.write_pos += n
+            self.cond.notify_all()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def oldest_pos(self) -> int:
+        return max(0, self.write_pos - self.capacity)
+
+    def view(self, pos: int, nbytes: int):
+        """
+        Returns nbytes starting at pos. This is a zero-copy memoryview unless the
+        range wraps around the end of the ring, in which case it is copied.
+        The view is only valid until the writer laps it, so consume it promptly.
+        """
+        start = pos % self.capacity
+        end = start + nbytes
+        if end <= self.capacity:
+            return self._view[start:end]
+        return bytes(self._view[start:]) + bytes(self._view[:end - self.capacity])
+
+
+class CaptureReader:
+    """
+    Independent cursor into the capture ring. `skip` is a (from, to) byte
+    range the reader jumps over, e.g. while our own greeting played.
+    """
+    def __init__(self, ring: RingBuffer, start_pos: int, skip: Optional[Tuple[int, int]] = None):
+        self.ring = ring
+        self.pos = start_pos
+        self.skip = skip
+        self.overruns = 0
+        self.closed = False
+
+    @property
+    def available(self) -> int:
+        return self.ring.write_pos - self.pos
+
+    def read(self, nbytes: int, timeout: Optional[float] = None):
+        """
+        Blocks until nbytes are available and returns them.
+        Returns None on timeout or when the capture (or this reader) is closed.
+        """
+        if self.skip is not None and self.pos + nbytes > self.skip[0]:
+            skip_from, skip_to = self.skip
+            head = b""
+            if self.pos < skip_from:
+                head = self.read(skip_from - self.pos, timeout)
+                if head is None:
+                    return None
+                head = bytes(head)
+            self.skip = None
+            self.pos = max(self.pos, skip_to)
+            rest = self.read(nbytes - len(head), timeout)
+            return None if rest is None else head + bytes(rest)
+
+        with self.ring.cond:
+            ready = self.ring.cond.wait_for(
+                lambda: self.ring.write_pos - self.pos >= nbytes or self.ring.closed or self.closed,
+                timeout=timeout,
+            )
+        if not ready or self.closed or self.ring.write_pos - self.pos < nbytes:
+            return None
+
+        oldest = self.ring.oldest_pos()
+        if self.pos < oldest:
+            self.overruns += 1
+            logger.warning(f"Capture reader fell behind by {oldest - self.pos} bytes, skipping ahead.")
+            self.pos = oldest
+
+        data = self.ring.view(self.pos, nbytes)
+        self.pos += nbytes
+        return data
+
+    def close(self):
+        with self.ring.cond:
+            self.closed = True
+            self.ring.cond.notify_all()
+
+
+class AudioCapture:
+    """
+    Owns the microphone for the whole process and writes every frame into a
+    ring buffer. Wake word, STT, VAD and level meters each read through their
+    own CaptureReader, so switching consumers never drops audio.
+    """
+    def __init__(self):
+        self.rate = 16000
+        self.channels = 1
+        self.sample_width = 2  # paInt16
+        self.frames_per_buffer = config.CAPTURE_FRAMES_PER_BUFFER
+        self.bytes_per_second = self.rate * self.channels * self.sample_width
+
+        # Keep the ring a whole number of device blocks so blocks never wrap
+        block = self.frames_per_buffer * self.channels * self.sample_width
+        blocks = max(1, int(config.CAPTURE_BUFFER_SECONDS * self.bytes_per_second) // block)
+        self.ring = RingBuffer(blocks * block)
+
+        self.audio = None
+        self.stream = None
+        self.lock = threading.Lock()
+
+    @property
+    def position(self) -> int:
+        return self.ring.write_pos
+
+    def seconds_to_bytes(self, seconds: float) -> int:
+        frame = self.channels * self.sample_width
+        return int(seconds * self.rate) * frame
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        self.ring.write(in_data)
+        return (None, pyaudio.paContinue)
+
+    def start(self) -> bool:
+        with self.lock:
+            if self.stream:
+                return True
+            try:
+                if self.audio is None:
+                    self.audio = pyaudio.PyAudio()
+                self.stream = self.audio.open(
+                    format=pyaudio.paInt16,
+                    channels=self.channels,
+                    rate=self.rate,
+                    input=True,
+                    frames_per_buffer=self.frames_per_buffer,
+                    stream_callback=self._callback,
+                )
+                self.stream.start_stream()
+                logger.info(
+                    f"Microphone capture started ({self.frames_per_buffer} frames/block, "
+                    f"{self.ring.capacity / self.bytes_per_second:.1f}s ring)."
+                )
+                return True
+            except Exception as e:
+                logger.error(f"Failed to open audio stream: {e}")
+                self.stream = None
+                return False
+
+    def reader(
+        self, start: Optional[int] = None, preroll: float = 0.0, skip: Optional[Tuple[int, int]] = None
+    ) -> Optional[CaptureReader]:
+        """
+        Returns a reader positioned at `start` (default: now) minus `preroll` seconds.
+        The start is clamped to the oldest audio still held by the ring; audio in
+        the `skip` byte range is left out.
+        """
+        if not self.start():
+            return None
+        pos = self.position if start is None else start
+        pos -= self.seconds_to_bytes(preroll)
+        frame = self.channels * self.sample_width
+        pos = max(self.ring.oldest_pos(), pos - pos % frame)
+        if skip is not None:
+            skip = (skip[0] - skip[0] % frame, skip[1] - skip[1] % frame)
+        return CaptureReader(self.ring, pos, skip)
+
+    def latest(self, nbytes: int):
+        """
+        Returns the most recent nbytes without a cursor (for level meters).
+        """
+        pos = self.position
+        nbytes = min(nbytes, pos - self.ring.oldest_pos())
+        return self.ring.view(pos - nbytes, nbytes)
+
+    def stop(self):
+        with self.lock:
+            if self.stream:
+                self.stream.stop_stream()
+                self.stream.close()
+                self.stream = None
+            self.ring.close()
+            if self.audio:
+                self.audio.terminate()
+                self.audio = None
+
+
+capture = registry.register("capture", AudioCapture)
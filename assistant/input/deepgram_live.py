@@ -0,0 +1,262 @@
+import asyncio
+import json
+from collections import deque
+from typing import Callable, Dict, Optional
+from urllib.parse import urlencode
+
+import websockets
+
+from assistant.core.config import config
+from assistant.core.logging_config import logger
+
+
+class DeepgramLiveConnection:
+    """
+    Keeps one Deepgram live session open across turns.
+
+    Audio is sent with send_audio(); per-turn transcripts are split on
+    speech_final / UtteranceEnd and handed out by next_transcript(). During
+    silence the session is kept open with KeepAlive messages. If the socket
+    drops, it reconnects and replays every chunk Deepgram has not yet
+    finalized, so nothing said during the outage is lost.
+    """
+    def __init__(
+        self,
+        api_key: Optional[str],
+        url: str = None,
+        params: Optional[Dict[str, str]] = None,
+        keepalive_interval: float = None,
+        replay_seconds: float = None,
+        bytes_per_second: int = 32000,
+    ):
+        self.api_key = api_key
+        self.url = url or config.DEEPGRAM_URL
+        self.params = params or {}
+        self.keepalive_interval = keepalive_interval or config.DEEPGRAM_KEEPALIVE_SECONDS
+        self.bytes_per_second = bytes_per_second
+        self.max_replay_bytes = int((replay_seconds or config.DEEPGRAM_REPLAY_SECONDS) * bytes_per_second)
+
+        self.transcripts: asyncio.Queue = asyncio.Queue()
+        self.on_interim: Optional[Callable[[str], None]] = None
+
+        self.ws = None
+        self.reconnects = 0
+        self._connected = asyncio.Event()
+        self._closing = False
+        self._task = None
+
+        # Unfinalized audio as (absolute offset, chunk), for replay after a reconnect
+        self._replay = deque()
+        self._replay_bytes = 0
+        self._sent_bytes = 0
+        # Absolute offset that the current socket's audio time 0 corresponds to
+        self._stream_base = 0
+        self._segments = []
+        self._last_send = 0.0
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    def _full_url(self) -> str:
+        if not self.params:
+            return self.url
+        query = urlencode({k: str(v).lower() if isinstance(v, bool) else v for k, v in self.params.items()})
+        return f"{self.url}?{query}"
+
+    async def start(self):
+        """
+        Starts the connection loop if it is not already running.
+        """
+        if self._task and not self._task.done():
+            return
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+
+    async def wait_connected(self, timeout: float = None) -> bool:
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _run(self):
+        backoff = 0.5
+        headers = {"Authorization": f"Token {self.api_key}"}
+        while not self._closing:
+            try:
+                async with websockets.connect(self._full_url(), additional_headers=headers, open_timeout=5) as ws:
+                    self.ws = ws
+                    self._stream_base = self._replay[0][0] if self._replay else self._sent_bytes
+                    replayed = await self._replay_pending(ws)
+                    if replayed:
+                        logger.info(f"Deepgram reconnected, replayed {replayed} bytes of audio.")
+                    else:
+                        logger.info("Deepgram live session opened.")
+                    self._last_send = asyncio.get_running_loop().time()
+                    self._connected.set()
+                    backoff = 0.5
+
+                    keepalive_task = asyncio.create_task(self._keepalive(ws))
+                    try:
+                        await self._receive(ws)
+                    finally:
+                        keepalive_task.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Deepgram connection error: {e}")
+            finally:
+                self._connected.clear()
+                self.ws = None
+
+            if self._closing:
+                break
+            self.reconnects += 1
+            logger.info(f"Reconnecting to Deepgram in {backoff:.1f}s...")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 8)
+
+    async def _replay_pending(self, ws) -> int:
+        """
+        Sends all buffered, unfinalized audio. Loops until no new chunks arrived
+        while awaiting, so the caller can mark the socket live without a gap.
+        """
+        replayed = 0
+        next_offset = self._stream_base
+        while True:
+            pending = [(off, chunk) for off, chunk in self._replay if off >= next_offset]
+            if not pending:
+                return replayed
+            for off, chunk in pending:
+                await ws.send(chunk)
+                replayed += len(chunk)
+                next_offset = off + len(chunk)
+
+    async def _keepalive(self, ws):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(min(1.0, self.keepalive_interval))
+            if loop.time() - self._last_send >= self.keepalive_interval:
+                await ws.send(json.dumps({"type": "KeepAlive"}))
+                self._last_send = loop.time()
+                logger.debug("Deepgram KeepAlive sent.")
+
+    async def _receive(self, ws):
+        async for raw in ws:
+            if isinstance(raw, bytes):
+                continue
+            try:
+                message = json.loads(raw)
+            except ValueError:
+                logger.warning(f"Unparseable Deepgram message: {raw!r}")
+                continue
+
+            msg_type = message.get("type")
+            if msg_type == "Results":
+                self._handle_results(message)
+            elif msg_type == "UtteranceEnd":
+                self._end_turn()
+
+    def _handle_results(self, message: dict):
+        alternatives = message.get("channel", {}).get("alternatives") or [{}]
+        transcript = alternatives[0].get("transcript", "")
+
+        if not message.get("is_final"):
+            if transcript and self.on_interim:
+                self.on_interim(" ".join(self._segments + [transcript]))
+            return
+
+        # Finalized audio no longer needs to be kept for replay
+        end = message.get("start", 0.0) + message.get("duration", 0.0)
+        self._ack(self._stream_base + int(end * self.bytes_per_second))
+
+        if transcript:
+            self._segments.append(transcript)
+        if message.get("from_finalize"):
+            # Answer to our Finalize: the turn is over even if nothing was recognized
+            self._end_turn(force=True)
+        elif message.get("speech_final"):
+            self._end_turn()
+
+    def _ack(self, offset: int):
+        while self._replay and self._replay[0][0] + len(self._replay[0][1]) <= offset:
+            _, chunk = self._replay.popleft()
+            self._replay_bytes -= len(chunk)
+
+    def _end_turn(self, force: bool = False):
+        if self._segments or force:
+            self.transcripts.put_nowait(" ".join(self._segments))
+            self._segments = []
+
+    def begin_turn(self):
+        """
+        Drops transcripts left over from a previous turn.
+        """
+        while not self.transcripts.empty():
+            self.transcripts.get_nowait()
+        self._segments = []
+
+    async def send_audio(self, data):
+        chunk = bytes(data)
+        self._replay.append((self._sent_bytes, chunk))
+        self._replay_bytes += len(chunk)
+        self._sent_bytes += len(chunk)
+        while self._replay_bytes > self.max_replay_bytes:
+            _, old = self._replay.popleft()
+            self._replay_bytes -= len(old)
+
+        if self.ws is not None and self.connected:
+            try:
+                await self.ws.send(chunk)
+                self._last_send = asyncio.get_running_loop().time()
+            except websockets.ConnectionClosed:
+                # The reconnect loop replays it
+                pass
+
+    async def send_control(self, msg_type: str):
+        if self.ws is not None and self.connected:
+            try:
+                await self.ws.send(json.dumps({"type": msg_type}))
+            except websockets.ConnectionClosed:
+                pass
+
+    async def finalize(self):
+        """
+        Asks Deepgram to flush everything sent so far as final results
+        (used when the local VAD has already seen the end of speech).
+        """
+        await self.send_control("Finalize")
+
+    async def next_transcript(self, timeout: float = None) -> str:
+        """
+        Waits for the next complete utterance. On timeout, returns whatever
+        finals were collected so far (possibly "").
+        """
+        try:
+            return await asyncio.wait_for(self.transcripts.get(), timeout)
+        except asyncio.TimeoutError:
+            return self.take_partial()
+
+    def take_partial(self) -> str:
+        """
+        Returns (and clears) the finals collected for the current turn so far.
+        """
+        text = " ".join(self._segments)
+        self._segments = []
+        return text
+
+    async def close(self):
+        self._closing = True
+        await self.send_control("CloseStream")
+        if self._task:
+            # Give Deepgram a moment to flush and close its side cleanly
+            try:
+                await asyncio.wait_for(self._task, timeout=2)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                pass
+            self._task = None
+        self._replay.clear()
+        self._replay_bytes = 0
+        self._segments = []
+        logger.info("Deepgram live session closed.")
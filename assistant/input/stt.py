@@ -1,136 +1,212 @@
 import asyncio
-import os
-import json
-from typing import Optional
+import math
+import time
+from collections import deque
+from typing import Callable, Optional, Tuple
 from assistant.core.logging_config import logger
 from assistant.core.config import config
-import pyaudio
-
-try:
-    from deepgram import AsyncDeepgramClient
-except ImportError:
-    import deepgram
-    AsyncDeepgramClient = deepgram.AsyncDeepgramClient
+from assistant.core.registry import registry
+from assistant.core.tracing import tracer
+from assistant.input.capture import capture
+from assistant.input.deepgram_live import DeepgramLiveConnection
+from assistant.input.vad import SPEECH_END, SPEECH_START, VoiceActivityDetector
 
 class DeepgramSTT:
     def __init__(self):
         self.api_key = config.DEEPGRAM_API_KEY
         if not self.api_key:
             logger.error("DEEPGRAM_API_KEY is missing. STT will not work.")
-        
+
         # Audio config
         self.rate = 16000
         self.channels = 1
         self.chunk = 1024
-        
-        self.audio = pyaudio.PyAudio()
-        self.client = AsyncDeepgramClient(api_key=self.api_key) if self.api_key else None
 
-    async def listen(self, timeout: int = 15) -> str:
+        # One live session, reused across turns while the assistant is active
+        self.connection = DeepgramLiveConnection(
+            self.api_key,
+            params={
+                "model": "nova-2",
+                "language": "tr",
+                "smart_format": True,
+                "encoding": "linear16",
+                "sample_rate": self.rate,
+                "channels": self.channels,
+                "interim_results": True,
+                "vad_events": True,
+                "endpointing": 600,
+                "utterance_end_ms": 1000,
+            },
+            bytes_per_second=self.rate * self.channels * 2,
+        ) if self.api_key else None
+
+        # Local endpointing: only speech (plus a short lead-in) goes up the wire,
+        # and the turn ends as soon as the VAD hangover elapses
+        self.vad = VoiceActivityDetector(
+            sample_rate=self.rate,
+            hangover_ms=config.VAD_HANGOVER_MS,
+            min_speech_ms=config.VAD_MIN_SPEECH_MS,
+            speech_margin_db=config.VAD_SPEECH_MARGIN_DB,
+        ) if config.LOCAL_VAD else None
+        chunk_ms = 1000 * self.chunk / self.rate
+        self.prespeech_chunks = max(1, math.ceil(config.VAD_PRESPEECH_MS / chunk_ms))
+        self.last_endpoint_latency = None
+
+    async def listen(
+        self,
+        timeout: int = 15,
+        start: Optional[int] = None,
+        preroll: float = 0.0,
+        skip: Optional[Tuple[int, int]] = None,
+        on_stable: Optional[Callable[[str], None]] = None,
+    ) -> str:
         """
-        Connects to Deepgram Live, streams microphone audio, and returns the transcript.
+        Streams microphone audio over the live Deepgram session and returns the transcript.
+        start/preroll select where in the capture ring streaming begins
+        (e.g. just before the wake word fired); default is "now". skip is a
+        capture byte range left out of the stream (our own greeting).
+        on_stable is called with an interim transcript once it has not changed
+        for SPECULATIVE_STABLE_MS, and with the last one when local VAD ends the speech.
         """
-        if not self.client:
+        if not self.connection:
             logger.error("Cannot listen: No API Key or Client")
             return ""
 
+        await self.connection.start()
+        self.connection.begin_turn()
+        tracer.mark("stt_listen_start")
+
         # Print listening status for user visibility
         print("Listening...", end="", flush=True)
-        
-        # Open Microphone Stream
-        stream = self.audio.open(
-            format=pyaudio.paInt16,
-            channels=self.channels,
-            rate=self.rate,
-            input=True,
-            frames_per_buffer=self.chunk
-        )
-        
-        transcript_result = ""
+
+        # Attach to the shared microphone capture
+        reader = capture.reader(start=start, preroll=preroll, skip=skip)
+        if reader is None:
+            print("")
+            return ""
+
         stop_event = asyncio.Event()
+        speech_ended = asyncio.Event()
 
-        # Connect to Deepgram
-        async with self.client.listen.v1.connect(
-            model="nova-2", 
-            language="tr",
-            smart_format=True, 
-            encoding="linear16", 
-            sample_rate=self.rate,
-            channels=self.channels,
-            interim_results=True,
-            vad_events=True,
-            endpointing=600
-        ) as socket:
-            
-            async def sender():
-                try:
-                    while not stop_event.is_set():
-                        data = await asyncio.to_thread(stream.read, self.chunk, exception_on_overflow=False)
-                        await socket.send_media(data)
-                        await asyncio.sleep(0.001)
-                except Exception as e:
-                    logger.error(f"Sender error: {e}")
-
-            async def receiver():
-                nonlocal transcript_result
-                try:
-                    async for message in socket:
-                        # Process Transcript/Metadata
-                        if hasattr(message, 'channel'):
-                             # message.channel seems to be a list in this SDK version
-                             ch = message.channel
-                             if isinstance(ch, list):
-                                 ch = ch[0]
-                             
-                             if hasattr(ch, 'alternatives'):
-                                 alternatives = ch.alternatives
-                                 if alternatives:
-                                     transcript = alternatives[0].transcript
-                                     if transcript:
-                                         if message.is_final:
-                                             transcript_result += f" {transcript}"
-                                             # Print final part of this utterance
-                                             print(f"\rUser: {transcript_result.strip()}", end="", flush=True)
-                                             stop_event.set()
-                                             return
-                                         else:
-                                             # Print interim
-                                             print(f"\rUser: {transcript_result.strip()} {transcript}...", end="", flush=True)
-                        
-                        # Process UtteranceEnd
-                        msg_type = getattr(message, 'type', '')
-                        if msg_type == 'UtteranceEnd':
-                            stop_event.set()
-                            return
-
-                        if stop_event.is_set():
-                            return
-
-                except Exception as e:
-                    logger.error(f"Receiver error: {e}")
-
-            # Run both
-            sender_task = asyncio.create_task(sender())
-            receiver_task = asyncio.create_task(receiver())
-            
+        loop = asyncio.get_running_loop()
+        stable = {"text": "", "reported": "", "timer": None}
+
+        def report_stable(text):
+            if on_stable and text and text != stable["reported"]:
+                stable["reported"] = text
+                on_stable(text)
+
+        def on_interim(text):
+            tracer.mark("stt_first_interim")
+            print(f"\rUser: {text}...", end="", flush=True)
+            if on_stable and text != stable["text"]:
+                stable["text"] = text
+                if stable["timer"]:
+                    stable["timer"].cancel()
+                stable["timer"] = loop.call_later(config.SPECULATIVE_STABLE_MS / 1000, report_stable, text)
+
+        self.connection.on_interim = on_interim
+
+        vad = self.vad
+        if vad is not None:
+            vad.reset()
+        pre_speech = deque()
+        stats = {"read": 0, "sent": 0}
+        ended_at = None
+
+        async def send(data):
+            stats["sent"] += len(data)
+            await self.connection.send_audio(data)
+
+        async def sender():
+            nonlocal ended_at
             try:
-                await asyncio.wait_for(receiver_task, timeout=timeout)
-            except asyncio.TimeoutError:
-                pass
+                while not stop_event.is_set():
+                    data = await asyncio.to_thread(reader.read, self.chunk * 2, 0.5)
+                    if data is None:
+                        continue
+                    stats["read"] += len(data)
+                    if vad is None:
+                        await send(data)
+                        continue
+
+                    data = bytes(data)
+                    events = vad.process(data)
+                    if SPEECH_START in events:
+                        tracer.mark("stt_speech_start")
+                        # Lead-in so the first phoneme is not clipped
+                        while pre_speech:
+                            await send(pre_speech.popleft())
+                    if vad.in_speech or events:
+                        await send(data)
+                    else:
+                        # Silence is not sent; the connection covers it with KeepAlive
+                        pre_speech.append(data)
+                        if len(pre_speech) > self.prespeech_chunks:
+                            pre_speech.popleft()
+
+                    if SPEECH_END in events:
+                        ended_at = time.perf_counter()
+                        tracer.mark("stt_speech_end", at=ended_at)
+                        await self.connection.finalize()
+                        # Nothing more is coming; the last interim is the best guess at the final
+                        report_stable(stable["text"])
+                        speech_ended.set()
+                        return
             except Exception as e:
-                logger.error(f"Listen loop error: {e}")
-            
+                logger.error(f"Sender error: {e}")
+
+        sender_task = asyncio.create_task(sender())
+        transcript_task = asyncio.create_task(self.connection.next_transcript(timeout))
+        ended_task = asyncio.create_task(speech_ended.wait())
+        try:
+            await asyncio.wait({transcript_task, ended_task}, return_when=asyncio.FIRST_COMPLETED)
+            if not transcript_task.done():
+                # Speech is over locally; Deepgram only has to finalize what it has
+                await asyncio.wait({transcript_task}, timeout=config.VAD_FINALIZE_TIMEOUT)
+            if transcript_task.done():
+                transcript_result = transcript_task.result()
+            else:
+                transcript_task.cancel()
+                transcript_result = self.connection.take_partial()
+        except Exception as e:
+            logger.error(f"Listen loop error: {e}")
+            transcript_result = ""
+        finally:
             stop_event.set()
+            ended_task.cancel()
+            if not transcript_task.done():
+                transcript_task.cancel()
+            self.connection.on_interim = None
+            if stable["timer"]:
+                stable["timer"].cancel()
             try:
                 await sender_task
-            except:
+            except Exception:
                 pass
+            # Detach from capture
+            reader.close()
+
+        if ended_at is not None:
+            self.last_endpoint_latency = time.perf_counter() - ended_at
+            logger.info(f"End of speech to transcript: {self.last_endpoint_latency * 1000:.0f} ms")
+        if stats["read"]:
+            logger.debug(
+                f"Uplink: sent {stats['sent'] / 1024:.0f} of {stats['read'] / 1024:.0f} KiB "
+                f"({100 * (1 - stats['sent'] / stats['read']):.0f}% silence suppressed)"
+            )
 
-        # Cleanup Stream
-        stream.stop_stream()
-        stream.close()
-        
+        if transcript_result:
+            tracer.mark("stt_final")
+            print(f"\rUser: {transcript_result.strip()}", end="", flush=True)
         print("") # Newline after listening is done
         return transcript_result.strip()
 
-stt = DeepgramSTT()
+    async def close(self):
+        """
+        Closes the live session (e.g. when going back to standby).
+        """
+        if self.connection:
+            await self.connection.close()
+
+stt = registry.register("stt", DeepgramSTT)
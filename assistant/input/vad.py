@@ -0,0 +1,129 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Nothing quieter than this (int16 RMS in dB) counts as speech, however quiet the room
+MIN_SPEECH_DB = 45.0
+
+SPEECH_START = "start"
+SPEECH_END = "end"
+
+
+def frame_level_db(frame) -> float:
+    """
+    RMS level of a 16-bit mono PCM frame in dB (0 for digital silence, ~90 at full scale).
+    """
+    samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+    if not len(samples):
+        return 0.0
+    return float(10 * np.log10(np.mean(samples * samples) + 1.0))
+
+
+def frame_features(pcm, frame_samples: int) -> Tuple[List[float], List[float]]:
+    """
+    Per-frame (level dB, zero-crossing rate) for whole frames of 16-bit mono PCM.
+    """
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    count = len(samples) // frame_samples
+    if not count:
+        return [], []
+    frames = samples[:count * frame_samples].reshape(count, frame_samples).astype(np.float32)
+    levels = 10 * np.log10(np.mean(frames * frames, axis=1) + 1.0)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_samples - 1)
+    return levels.tolist(), zcr.tolist()
+
+
+class VoiceActivityDetector:
+    """
+    Model-free energy / zero-crossing VAD for the local end of turn.
+
+    A frame is speech when it is speech_margin_db above the adaptive noise
+    floor and either voiced (low zero-crossing rate) or loud enough to be a
+    fricative rather than hiss. min_speech_ms of speech starts an utterance;
+    hangover_ms of non-speech ends it. The noise floor persists across turns,
+    so call reset() (not a new instance) between utterances.
+    """
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = 20,
+        hangover_ms: int = 700,
+        min_speech_ms: int = 100,
+        speech_margin_db: float = 10.0,
+        voiced_zcr: float = 0.25,
+        unvoiced_extra_db: float = 6.0,
+    ):
+        self.frame_ms = frame_ms
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.frame_bytes = self.frame_samples * 2
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.speech_margin_db = speech_margin_db
+        self.voiced_zcr = voiced_zcr
+        self.unvoiced_extra_db = unvoiced_extra_db
+
+        self.noise_db: Optional[float] = None
+        self.frames = 0
+        self._partial = b""
+        self.reset()
+
+    def reset(self):
+        """
+        Starts a new utterance; keeps the noise floor.
+        """
+        self.in_speech = False
+        self._speech_run = 0
+        self._silence_run = 0
+        self.speech_started_frame = None
+        self.speech_ended_frame = None
+
+    def threshold(self) -> float:
+        return max(MIN_SPEECH_DB, (self.noise_db if self.noise_db is not None else 0.0) + self.speech_margin_db)
+
+    def is_speech(self, level_db: float, zcr: float) -> bool:
+        threshold = self.threshold()
+        if level_db <= threshold:
+            return False
+        return zcr < self.voiced_zcr or level_db > threshold + self.unvoiced_extra_db
+
+    def _update_noise(self, level_db: float):
+        if self.noise_db is None:
+            self.noise_db = level_db
+            return
+        # Drops quickly to the quietest level, creeps up slowly
+        alpha = 0.3 if level_db < self.noise_db else 0.01
+        self.noise_db += alpha * (level_db - self.noise_db)
+
+    def process(self, pcm: bytes) -> List[str]:
+        """
+        Feeds 16-bit mono PCM of any length. Returns SPEECH_START / SPEECH_END
+        events completed by this chunk, in order.
+        """
+        data = self._partial + bytes(pcm)
+        whole = len(data) - len(data) % self.frame_bytes
+        self._partial = data[whole:]
+
+        events = []
+        levels, zcrs = frame_features(data[:whole], self.frame_samples)
+        for level_db, zcr in zip(levels, zcrs):
+            self.frames += 1
+            speech = self.is_speech(level_db, zcr)
+            if not speech and not self.in_speech:
+                self._update_noise(level_db)
+
+            if not self.in_speech:
+                self._speech_run = self._speech_run + 1 if speech else 0
+                if self._speech_run >= self.min_speech_frames:
+                    self.in_speech = True
+                    self._silence_run = 0
+                    self.speech_started_frame = self.frames - self._speech_run
+                    events.append(SPEECH_START)
+            else:
+                self._silence_run = 0 if speech else self._silence_run + 1
+                if self._silence_run >= self.hangover_frames:
+                    self.in_speech = False
+                    self._speech_run = 0
+                    self.speech_ended_frame = self.frames - self._silence_run
+                    events.append(SPEECH_END)
+        return events
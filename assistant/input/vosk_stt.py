@@ -1,32 +1,29 @@
-import json
 import os
-import pyaudio
-import sys
+import time
+from assistant.core.config import config
 from assistant.core.logging_config import logger
-from vosk import Model, KaldiRecognizer
+from assistant.core.registry import registry
+from assistant.input.capture import capture
+from assistant.input.wakeword import WakeWordEngine
 
 class VoskSTT:
     def __init__(self, model_path="assistant/input/model"):
         self.model_path = model_path
         self.model = None
-        self.recognizer = None
-        self.audio = pyaudio.PyAudio()
-        self.stream = None
+        # Resident wake word engines, by keyword list
+        self.engines = {}
+        # Capture position right after the chunk that triggered the last detection
+        self.detected_at = None
         
         if not os.path.exists(self.model_path):
             logger.error(f"Vosk model not found at {self.model_path}. Please download it.")
         else:
             try:
-                # Suppress Vosk logs (they are very verbose)
-                null_fd = os.open(os.devnull, os.O_RDWR)
-                save_stderr = os.dup(2)
-                os.dup2(null_fd, 2)
-                
+                from vosk import Model, SetLogLevel
+                # Suppress Vosk logs (they are very verbose). Not by redirecting
+                # stderr: the model loads on a background thread while others log.
+                SetLogLevel(-1)
                 self.model = Model(self.model_path)
-                
-                # Restore stderr
-                os.dup2(save_stderr, 2)
-                os.close(null_fd)
             except Exception as e:
                 logger.error(f"Failed to load Vosk model: {e}")
 
@@ -40,61 +37,49 @@ class VoskSTT:
             logger.error("Vosk model not loaded. Cannot listen.")
             return False
 
-        # Construct grammar from keywords to force detection
-        # Format: '["word one", "word two", "[unk]"]'
-        # We append [unk] to handle background noise/other speech
-        import json
-        grammar_list = keywords + ["[unk]"]
-        grammar_str = json.dumps(grammar_list)
-        
-        try:
-            self.recognizer = KaldiRecognizer(self.model, 16000, grammar_str)
-        except Exception as e:
-            logger.error(f"Failed to initialize recognizer with grammar: {e}")
-            # Fallback to standard recognizer if grammar fails (though unlikely)
-            self.recognizer = KaldiRecognizer(self.model, 16000)
+        # The engine (recognizer, grammar, VAD noise floor) is kept across standby periods
+        engine = self.engines.get(tuple(keywords))
+        if engine is None:
+            engine = WakeWordEngine(
+                self.model,
+                keywords,
+                hop_ms=config.WAKE_HOP_MS,
+                gate_margin_db=config.WAKE_GATE_MARGIN_DB,
+            )
+            self.engines[tuple(keywords)] = engine
+        engine.reset()
 
-        # Open stream
-        try:
-            self.stream = self.audio.open(format=pyaudio.paInt16, channels=1, rate=16000, input=True, frames_per_buffer=4096)
-            self.stream.start_stream()
-        except Exception as e:
-            logger.error(f"Failed to open audio stream: {e}")
+        # Read from the shared capture service
+        reader = capture.reader()
+        if reader is None:
             return False
 
         logger.info(f"Listening for wake word: {keywords} (Local)")
-        
+        deadline = time.monotonic() + timeout if timeout else None
+        cpu_started = time.thread_time()
         try:
-            while True:
-                data = self.stream.read(4096, exception_on_overflow=False)
-                if self.recognizer.AcceptWaveform(data):
-                    result = json.loads(self.recognizer.Result())
-                    text = result.get("text", "")
-                    if text:
-                        # Check keywords
-                        for keyword in keywords:
-                            if keyword in text:
-                                logger.info(f"Wake word detected: '{keyword}' in '{text}'")
-                                return True
-                else:
-                    # Partial result (faster detection)
-                    partial = json.loads(self.recognizer.PartialResult())
-                    partial_text = partial.get("partial", "")
-                    if partial_text:
-                         for keyword in keywords:
-                            if keyword in partial_text:
-                                logger.info(f"Wake word detected (partial): '{keyword}'")
-                                return True
-                                
+            while deadline is None or time.monotonic() < deadline:
+                data = reader.read(engine.hop_bytes, 0.5)
+                if data is None:
+                    if reader.ring.closed:
+                        return False
+                    continue
+                keyword = engine.process(data)
+                if keyword:
+                    self.detected_at = reader.pos
+                    # How far behind live audio the detection ran
+                    lag = (capture.position - reader.pos) / capture.bytes_per_second
+                    logger.info(f"Wake word detected: '{keyword}' (processing lag {lag * 1000:.0f} ms)")
+                    return True
+            return False
+
         except KeyboardInterrupt:
             return False
         except Exception as e:
             logger.error(f"Error in Vosk listen: {e}")
             return False
         finally:
-            if self.stream:
-                self.stream.stop_stream()
-                self.stream.close()
-                self.stream = None
+            reader.close()
+            logger.info(f"Wake word standby: {engine.summary(time.thread_time() - cpu_started)}")
 
-vosk_stt = VoskSTT()
+vosk_stt = registry.register("vosk_stt", VoskSTT)
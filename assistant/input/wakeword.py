@@ -0,0 +1,132 @@
+import difflib
+import json
+import time
+from collections import deque
+from typing import List, Optional
+
+from assistant.input.vad import SPEECH_END, VoiceActivityDetector
+
+# Turkish model keyword candidates - "kariyer" is the in-vocabulary proxy for "karien"
+WAKE_KEYWORDS = ["hey kariyer", "merhaba kariyer"]
+
+
+def strip_wake_phrase(text: str, keywords: List[str] = WAKE_KEYWORDS) -> str:
+    """
+    Removes a leading wake phrase from the first transcript after waking (the
+    replay starts before the wake word, so STT hears it too). Words match
+    loosely, since STT spells the name its own way ("Karien", "Kariyer,").
+    """
+    tokens = text.split()
+    for keyword in keywords:
+        words = keyword.split()
+        if len(tokens) >= len(words) and all(_same_word(t, w) for t, w in zip(tokens, words)):
+            return " ".join(tokens[len(words):]).lstrip(" ,.!?;:")
+    return text
+
+
+def _same_word(token: str, word: str) -> bool:
+    token = token.replace("I", "ı").replace("İ", "i").lower().strip(",.!?;:")
+    return difflib.SequenceMatcher(None, token, word).ratio() >= 0.75
+
+
+class WakeWordEngine:
+    """
+    Resident keyword spotter for standby mode.
+
+    One grammar-restricted recognizer lives for the whole session. A local VAD
+    gates the audio: hops that are not speech never reach Kaldi (the last
+    preroll_ms of them are fed when speech starts, so the onset is intact),
+    and when a speech burst ends the recognizer is flushed with FinalResult(),
+    leaving it clean for the next one. Partial results are only parsed when
+    they change.
+
+    Feed hops of 16-bit mono PCM to process(); it returns the keyword heard, if any.
+    """
+    def __init__(
+        self,
+        model,
+        keywords: List[str],
+        sample_rate: int = 16000,
+        hop_ms: int = 60,
+        gate_margin_db: float = 6.0,
+        hangover_ms: int = 500,
+        preroll_ms: int = 300,
+    ):
+        self.keywords = keywords
+        self.sample_rate = sample_rate
+        self.hop_bytes = sample_rate * hop_ms // 1000 * 2
+        # Format: '["word one", "word two", "[unk]"]'; [unk] absorbs other speech and noise
+        grammar = json.dumps(keywords + ["[unk]"])
+        from vosk import KaldiRecognizer
+        try:
+            self.recognizer = KaldiRecognizer(model, sample_rate, grammar)
+        except Exception:
+            # Fall back to the full vocabulary if the grammar is rejected (unlikely)
+            self.recognizer = KaldiRecognizer(model, sample_rate)
+        self.vad = VoiceActivityDetector(
+            sample_rate=sample_rate,
+            hangover_ms=hangover_ms,
+            min_speech_ms=40,
+            speech_margin_db=gate_margin_db,
+        )
+        self._preroll = deque(maxlen=max(1, preroll_ms // hop_ms))
+        self._last_partial = ""
+        self.stats = {}
+        self.reset()
+
+    def reset(self):
+        """
+        Starts a new standby period: clears the recognizer, VAD state and counters.
+        """
+        self.recognizer.Reset()
+        self.vad.reset()
+        self._preroll.clear()
+        self._last_partial = ""
+        self.stats = {"hops": 0, "gated": 0, "parses": 0, "started": time.perf_counter()}
+
+    def _match(self, text: str) -> Optional[str]:
+        for keyword in self.keywords:
+            if keyword in text:
+                return keyword
+        return None
+
+    def _parse(self, raw: str, field: str) -> Optional[str]:
+        self.stats["parses"] += 1
+        return self._match(json.loads(raw).get(field, ""))
+
+    def process(self, pcm) -> Optional[str]:
+        self.stats["hops"] += 1
+        data = bytes(pcm)
+        events = self.vad.process(data)
+        if not (self.vad.in_speech or events):
+            self._preroll.append(data)
+            self.stats["gated"] += 1
+            return None
+
+        while self._preroll:
+            self.recognizer.AcceptWaveform(self._preroll.popleft())
+
+        if SPEECH_END in events:
+            # Burst over: flush what Kaldi holds (this also resets it)
+            self.recognizer.AcceptWaveform(data)
+            self._last_partial = ""
+            return self._parse(self.recognizer.FinalResult(), "text")
+
+        if self.recognizer.AcceptWaveform(data):
+            self._last_partial = ""
+            return self._parse(self.recognizer.Result(), "text")
+
+        raw = self.recognizer.PartialResult()
+        if raw == self._last_partial:
+            return None
+        self._last_partial = raw
+        return self._parse(raw, "partial")
+
+    def summary(self, cpu_seconds: float) -> str:
+        wall = time.perf_counter() - self.stats["started"]
+        hops = self.stats["hops"] or 1
+        return (
+            f"{100 * cpu_seconds / wall if wall else 0.0:.1f}% CPU over {wall:.0f}s, "
+            f"{100 * self.stats['gated'] / hops:.0f}% of audio gated, "
+            f"{self.stats['parses']} result parses"
+        )
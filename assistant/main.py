@@ -1,9 +1,70 @@
+import argparse
 import asyncio
+import importlib
 import sys
-from assistant.core.orchestrator import orchestrator
+import time
 from assistant.core.logging_config import logger
 
+# Imported in this order by --startup-profile (each row pays only for what is new)
+PROFILED_MODULES = [
+    "assistant.core.config",
+    "assistant.core.registry",
+    "assistant.input.capture",
+    "assistant.input.vosk_stt",
+    "assistant.input.stt",
+    "assistant.output.tts",
+    "assistant.output.vts",
+    "assistant.skills.registry",
+    "assistant.brain.llm",
+    "assistant.core.pipeline",
+    "assistant.core.orchestrator",
+]
+
+
+def startup_profile(timeout: float = 120):
+    """
+    Prints import time per module and background init time per component,
+    then exits without starting the assistant.
+    """
+    started = time.perf_counter()
+    print(f"{'module':<32} {'import ms':>10}")
+    for name in PROFILED_MODULES:
+        t = time.perf_counter()
+        importlib.import_module(name)
+        print(f"{name:<32} {(time.perf_counter() - t) * 1000:>10.1f}")
+    imported = time.perf_counter()
+
+    from assistant.core.orchestrator import orchestrator
+    from assistant.core.registry import registry
+    # Profiling must not spend TTS credits on cache warm-up
+    orchestrator.start_components(warm_tts_cache=False)
+    registry.wait(["capture", "vosk_stt"], timeout)
+    wake_ready = time.perf_counter()
+    registry.wait(timeout=timeout)
+    all_ready = time.perf_counter()
+
+    print(f"\n{'component':<12} {'thread':<16} {'start ms':>9} {'init ms':>9} {'waited ms':>10}")
+    for row in registry.profile():
+        start = "-" if row["start_ms"] is None else f"{row['start_ms']:.0f}"
+        init = "-" if row["init_ms"] is None else f"{row['init_ms']:.0f}"
+        print(f"{row['name']:<12} {row['thread'] or '-':<16} {start:>9} {init:>9} {row['waited_ms']:>10.0f}"
+              + (f"  {row['error']}" if row["error"] else ""))
+    print(
+        f"\nImports {(imported - started) * 1000:.0f} ms, wake word ready after "
+        f"{(wake_ready - started) * 1000:.0f} ms, everything after {(all_ready - started) * 1000:.0f} ms"
+    )
+
+
 def main():
+    parser = argparse.ArgumentParser(prog="python -m assistant.main")
+    parser.add_argument("--startup-profile", action="store_true", help="report import and init times, then exit")
+    args = parser.parse_args()
+
+    if args.startup_profile:
+        startup_profile()
+        return
+
+    from assistant.core.orchestrator import orchestrator
     try:
         asyncio.run(orchestrator.run())
     except KeyboardInterrupt:
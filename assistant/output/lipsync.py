@@ -0,0 +1,198 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from assistant.core.config import config
+from assistant.core.logging_config import logger
+from assistant.core.tracing import percentile
+from assistant.output.player import PCM_RATE
+
+# Level (dB of int16 RMS) mapped to a closed and a fully open mouth
+CLOSED_DB = 45.0
+OPEN_DB = 75.0
+# Zero-crossing rate mapped to a rounded ("o", "u") and a wide ("i", "e", "s") mouth
+ROUND_ZCR = 0.03
+WIDE_ZCR = 0.25
+# How long the mouth keeps being driven after playback stops, so it closes
+# smoothly before face tracking takes over again
+RELEASE_SECONDS = 0.5
+
+
+class MouthEnvelope:
+    """
+    Mouth shape per analysis window of the audio actually rendered, stamped
+    with when it will be heard. push() runs on the audio thread (a few
+    vectorized NumPy ops per block); at() is read by the sender.
+    """
+    def __init__(self, window_ms: int = 10, history_seconds: float = 2.0):
+        self.window = PCM_RATE * window_ms // 1000
+        self.window_seconds = self.window / PCM_RATE
+        self.values = deque(maxlen=int(history_seconds / self.window_seconds))
+        self.lock = threading.Lock()
+
+    def push(self, pcm: bytes, heard_at: float, silent: bool = False):
+        """
+        Analyses one rendered block; heard_at is when its first sample reaches the speaker.
+        """
+        if silent:
+            with self.lock:
+                self.values.append((heard_at, 0.0, 0.5))
+            return
+
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        n = len(samples) // self.window
+        if n == 0:
+            return
+        frames = samples[:n * self.window].reshape(n, self.window).astype(np.float32)
+        rms_db = 10 * np.log10(np.mean(frames * frames, axis=1) + 1.0)
+        zcr = np.mean(np.signbit(frames[:, 1:]) != np.signbit(frames[:, :-1]), axis=1)
+        opened = np.clip((rms_db - CLOSED_DB) / (OPEN_DB - CLOSED_DB), 0.0, 1.0)
+        form = np.clip((zcr - ROUND_ZCR) / (WIDE_ZCR - ROUND_ZCR), 0.0, 1.0)
+
+        with self.lock:
+            for i in range(n):
+                self.values.append((heard_at + i * self.window_seconds, float(opened[i]), float(form[i])))
+
+    def at(self, now: float):
+        """
+        (heard_at, open, form) of the latest window already audible at `now`, or None.
+        """
+        with self.lock:
+            for value in reversed(self.values):
+                if value[0] <= now:
+                    return value
+        return None
+
+
+class LipSync:
+    """
+    Drives the avatar's mouth from Karien's own audio: at `rate_hz` it injects
+    MouthOpen/MouthForm values for what the speaker is playing right now into
+    VTube Studio over the existing connection. A tick whose previous inject
+    is still in flight (or that comes a whole period late) is dropped rather
+    than queued, so the mouth never lags behind the audio.
+    """
+    def __init__(self, client, player, rate_hz: float = 50):
+        self.client = client
+        self.player = player
+        self.period = 1.0 / rate_hz
+        self.envelope = MouthEnvelope()
+        player.meter = self.envelope
+        self.open_param = config.VTS_MOUTH_OPEN_PARAM
+        self.form_param = config.VTS_MOUTH_FORM_PARAM
+        self.smoothed = 0.0
+        self.stats = {"sent": 0, "dropped": 0, "failed": 0, "speaking_seconds": 0.0}
+        # Audio-to-mouth offsets (ms) of recent injects
+        self.offsets = deque(maxlen=5000)
+        self._in_flight = None
+        self._burst_started = None
+        self._burst_sent = 0
+        self._burst_dropped = 0
+        self._burst_offsets = []
+
+    async def run(self):
+        next_tick = time.perf_counter()
+        try:
+            while True:
+                next_tick += self.period
+                delay = next_tick - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                elif -delay > self.period:
+                    # The loop was busy for a whole period; skip ahead instead of bursting
+                    missed = int(-delay / self.period)
+                    next_tick += missed * self.period
+                    if self._burst_started is not None:
+                        self.stats["dropped"] += missed
+                        self._burst_dropped += missed
+                self._tick()
+        finally:
+            if self._in_flight is not None:
+                self._in_flight.cancel()
+            self._end_burst(time.perf_counter())
+
+    def _tick(self):
+        now = time.perf_counter()
+        speaking = self.player.is_playing or now - self.player.stopped_at < RELEASE_SECONDS
+        if not speaking or not self.client.connected:
+            self._end_burst(now)
+            return
+        if self._burst_started is None:
+            self._burst_started = now
+            self._burst_sent = 0
+            self._burst_dropped = 0
+            self._burst_offsets = []
+
+        if self._in_flight is not None and not self._in_flight.done():
+            self.stats["dropped"] += 1
+            self._burst_dropped += 1
+            return
+
+        value = self.envelope.at(now)
+        heard_at, opened, form = value if value is not None else (now, 0.0, 0.5)
+        if not self.player.is_playing:
+            opened = 0.0
+        # Open fast, close a little slower, like a real jaw
+        alpha = 0.7 if opened > self.smoothed else 0.35
+        self.smoothed += alpha * (opened - self.smoothed)
+
+        self._in_flight = asyncio.ensure_future(self._inject(self.smoothed, form, heard_at))
+
+    async def _inject(self, opened: float, form: float, heard_at: float):
+        try:
+            resp = await self.client.request("InjectParameterDataRequest", {
+                "faceFound": False,
+                "mode": "set",
+                "parameterValues": [
+                    {"id": self.open_param, "value": round(opened, 3)},
+                    {"id": self.form_param, "value": round(form, 3)},
+                ],
+            })
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.debug(f"Lip-sync inject failed: {e!r}")
+            return
+        if resp.get("messageType") == "APIError":
+            self.stats["failed"] += 1
+            if self.stats["failed"] == 1:
+                logger.warning(f"Lip-sync inject rejected: {resp.get('data', {}).get('message')}")
+            return
+        self.stats["sent"] += 1
+        self._burst_sent += 1
+        # Positive: the mouth moves after the audio it belongs to was heard
+        offset = (time.perf_counter() - heard_at) * 1000
+        self.offsets.append(offset)
+        self._burst_offsets.append(offset)
+
+    def _end_burst(self, now: float):
+        """
+        Logs rate, drops and offset for the speech that just finished.
+        """
+        if self._burst_started is None:
+            return
+        elapsed = now - self._burst_started
+        self._burst_started = None
+        self.stats["speaking_seconds"] += elapsed
+        offsets = self._burst_offsets
+        if not offsets or elapsed <= 0:
+            return
+        logger.info(
+            f"Lip-sync: {self._burst_sent / elapsed:.0f} Hz over {elapsed:.1f}s, {self._burst_dropped} dropped, "
+            f"audio-to-mouth offset p50 {percentile(offsets, 50):.0f} ms / p90 {percentile(offsets, 90):.0f} ms"
+        )
+
+    def summary(self) -> dict:
+        """
+        Session totals: achieved update rate while speaking, drops and offset percentiles.
+        """
+        seconds = self.stats["speaking_seconds"]
+        offsets = list(self.offsets)
+        return {
+            **self.stats,
+            "rate_hz": self.stats["sent"] / seconds if seconds else 0.0,
+            "offset_p50_ms": percentile(offsets, 50) if offsets else None,
+            "offset_p90_ms": percentile(offsets, 90) if offsets else None,
+        }
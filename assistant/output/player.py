@@ -0,0 +1,385 @@
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import wave
+from array import array
+from collections import deque
+from typing import Callable, Optional
+
+from assistant.core.logging_config import logger
+
+# Everything played goes through one output stream in this format. OpenAI
+# ("pcm") and ElevenLabs ("pcm_24000") both stream it natively.
+PCM_RATE = 24000
+PCM_FORMAT = "pcm_24000"
+FRAME_BYTES = 2  # 16-bit mono
+PCM_BYTES_PER_SECOND = PCM_RATE * FRAME_BYTES
+
+# Cancelling fades the current clip out over this long instead of clicking
+FADE_MS = 5
+
+
+class AudioStreamBuffer:
+    """
+    In-memory PCM pipe between a producer (TTS generation, file decoding)
+    and the audio thread. The producer writes chunks as they arrive; the
+    audio thread takes whatever is buffered without blocking.
+    """
+    def __init__(self):
+        self._chunks = deque()
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.first_chunk_at = None
+
+    def write(self, chunk: bytes):
+        if not chunk:
+            return
+        with self._cond:
+            if self.first_chunk_at is None:
+                self.first_chunk_at = time.perf_counter()
+            self._chunks.append(chunk)
+            self._size += len(chunk)
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def wait_for(self, nbytes: Optional[int]) -> bool:
+        """
+        Blocks until nbytes are buffered (None: until the writer is done).
+        Returns False if the stream closed without any audio.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._closed or (nbytes is not None and self._size >= nbytes))
+            return self._size >= FRAME_BYTES
+
+    @property
+    def exhausted(self) -> bool:
+        """
+        Closed and everything (up to a trailing partial frame) has been read.
+        """
+        return self._closed and self._size < FRAME_BYTES
+
+    def read(self, max_bytes: int) -> bytes:
+        """
+        Returns up to max_bytes of whole frames that are already buffered, without waiting.
+        """
+        with self._cond:
+            want = min(max_bytes, self._size)
+            want -= want % FRAME_BYTES
+            parts = []
+            got = 0
+            while got < want:
+                chunk = self._chunks[0]
+                take = min(len(chunk), want - got)
+                if take == len(chunk):
+                    self._chunks.popleft()
+                else:
+                    self._chunks[0] = chunk[take:]
+                    chunk = chunk[:take]
+                parts.append(chunk)
+                got += take
+            self._size -= got
+            return b"".join(parts)
+
+
+class Clip:
+    """
+    One utterance queued on the player. frames counts the samples actually
+    handed to the output, so a cancelled clip knows exactly how much was heard.
+    """
+    def __init__(self, buffer: AudioStreamBuffer, on_start: Callable = None, on_done: Callable = None):
+        self.buffer = buffer
+        self.on_start = on_start
+        self.on_done = on_done
+        self.frames = 0
+        self.underruns = 0
+        self.starving = False
+
+    @property
+    def seconds(self) -> float:
+        return self.frames / PCM_RATE
+
+
+class AudioPlayer:
+    """
+    Gapless in-process output: one persistent output stream that plays queued
+    clips back to back. The sink's audio thread pulls blocks through render(),
+    which never blocks or allocates much; clip callbacks run on a separate
+    notifier thread. A clip that runs dry mid-way gets silence and counts as
+    an underrun.
+    """
+    def __init__(self, output: str = "pyaudio", block_ms: int = 20):
+        self.block_frames = PCM_RATE * block_ms // 1000
+        self.clips = deque()
+        self.current: Optional[Clip] = None
+        self.lock = threading.Lock()
+        self._fade = b""
+        self.stopped_at = 0.0
+        # Optional analyser fed every rendered block (see lipsync.MouthEnvelope)
+        self.meter = None
+        self.stats = {"clips": 0, "cancelled": 0, "underruns": 0, "underrun_ms": 0.0, "device_underruns": 0}
+
+        self._events = queue.Queue()
+        self._notifier = threading.Thread(target=self._notify, name="player-events", daemon=True)
+        self._notifier.start()
+        self.sink = open_sink(output, self)
+        logger.info(f"Audio output: {output} ({PCM_RATE} Hz, {block_ms} ms blocks)")
+
+    @property
+    def is_playing(self) -> bool:
+        return self.current is not None
+
+    def play(self, buffer: AudioStreamBuffer, on_start: Callable = None, on_done: Callable = None) -> Clip:
+        """
+        Queues a clip after everything already queued. on_start() runs when its
+        first sample is rendered, on_done(played) after its last (played=False
+        if it was cancelled).
+        """
+        clip = Clip(buffer, on_start, on_done)
+        with self.lock:
+            self.clips.append(clip)
+        return clip
+
+    def cancel_all(self) -> int:
+        """
+        Stops the current clip at the next block (with a short fade) and drops
+        everything queued. Returns how many clips were cancelled.
+        """
+        with self.lock:
+            cancelled = list(self.clips)
+            self.clips.clear()
+            current, self.current = self.current, None
+            if current is not None:
+                self._fade = _fade_out(current.buffer.read(PCM_BYTES_PER_SECOND * FADE_MS // 1000))
+                current.frames += len(self._fade) // FRAME_BYTES
+                cancelled.insert(0, current)
+                self.stopped_at = time.perf_counter()
+        for clip in cancelled:
+            self._events.put((clip, "done", False))
+        self.stats["cancelled"] += len(cancelled)
+        return len(cancelled)
+
+    def render(self, frames: int, latency: float = 0.0) -> bytes:
+        """
+        Called by the sink for every block; always returns exactly `frames` frames.
+        latency is how long until the block is heard (device buffering).
+        """
+        need = frames * FRAME_BYTES
+        out = bytearray()
+        with self.lock:
+            if self._fade:
+                out += self._fade[:need]
+                self._fade = self._fade[need:]
+            while len(out) < need:
+                clip = self.current
+                if clip is None:
+                    if not self.clips:
+                        break
+                    clip = self.current = self.clips.popleft()
+
+                data = clip.buffer.read(need - len(out))
+                if data:
+                    if clip.frames == 0:
+                        self._events.put((clip, "start", None))
+                    clip.frames += len(data) // FRAME_BYTES
+                    clip.starving = False
+                    out += data
+                    continue
+                if clip.buffer.exhausted:
+                    self.current = None
+                    self.stats["clips"] += 1
+                    self._events.put((clip, "done", True))
+                    if not self.clips:
+                        self.stopped_at = time.perf_counter()
+                    continue
+
+                if clip.frames == 0:
+                    # Not started yet; silence until its first audio arrives
+                    break
+                # Mid-clip and the producer is behind: fill with silence
+                if not clip.starving:
+                    clip.starving = True
+                    clip.underruns += 1
+                    self.stats["underruns"] += 1
+                self.stats["underrun_ms"] += (need - len(out)) / PCM_BYTES_PER_SECOND * 1000
+                break
+
+        audible = len(out)
+        if audible < need:
+            out += bytes(need - audible)
+        out = bytes(out)
+        if self.meter is not None:
+            self.meter.push(out, time.perf_counter() + latency, silent=audible == 0)
+        return out
+
+    def _notify(self):
+        while True:
+            item = self._events.get()
+            if item is None:
+                return
+            clip, kind, played = item
+            try:
+                if kind == "start":
+                    if clip.on_start:
+                        clip.on_start()
+                else:
+                    if clip.underruns:
+                        logger.warning(f"Playback underran {clip.underruns} time(s) in a {clip.seconds:.1f}s clip.")
+                    if clip.on_done:
+                        clip.on_done(played)
+            except Exception as e:
+                logger.error(f"Playback callback error: {e}")
+
+    def close(self):
+        self.cancel_all()
+        self.sink.close()
+        self._events.put(None)
+        self._notifier.join(timeout=1)
+        logger.info(f"Audio output stats: {self.stats}")
+
+
+def _fade_out(pcm: bytes) -> bytes:
+    samples = array("h", pcm)
+    n = len(samples)
+    for i in range(n):
+        samples[i] = int(samples[i] * (n - i) / n)
+    return samples.tobytes()
+
+
+class PyAudioSink:
+    """
+    The sound card, through a PortAudio callback stream (macOS, Linux, Windows).
+    """
+    def __init__(self, player: AudioPlayer):
+        import pyaudio
+        self.player = player
+        self._underflow = pyaudio.paOutputUnderflow
+        self._continue = pyaudio.paContinue
+        self.output_latency = 0.0
+        self.audio = pyaudio.PyAudio()
+        self.stream = self.audio.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=PCM_RATE,
+            output=True,
+            frames_per_buffer=player.block_frames,
+            stream_callback=self._callback,
+        )
+        # Used when the host API does not timestamp callbacks
+        self.output_latency = self.stream.get_output_latency()
+        self.stream.start_stream()
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        if status & self._underflow:
+            self.player.stats["device_underruns"] += 1
+        latency = self.output_latency
+        if time_info and time_info.get("output_buffer_dac_time"):
+            latency = max(0.0, time_info["output_buffer_dac_time"] - time_info["current_time"])
+        return (self.player.render(frame_count, latency), self._continue)
+
+    def close(self):
+        self.stream.stop_stream()
+        self.stream.close()
+        self.audio.terminate()
+
+
+class ClockSink:
+    """
+    No device: a thread renders blocks at real time and hands them to write(),
+    so playback takes as long as it would on a speaker (headless runs, tests).
+    """
+    def __init__(self, player: AudioPlayer):
+        self.player = player
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="audio-out", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        block = self.player.block_frames / PCM_RATE
+        deadline = time.perf_counter()
+        while self.running:
+            self.write(self.player.render(self.player.block_frames))
+            deadline += block
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def write(self, pcm: bytes):
+        pass
+
+    def close(self):
+        self.running = False
+        self.thread.join(timeout=1)
+
+
+class WavSink(ClockSink):
+    """
+    Records exactly what the speaker would have played, silence included, to a WAV file.
+    """
+    def __init__(self, player: AudioPlayer, path: str):
+        self.wav = wave.open(path, "wb")
+        self.wav.setnchannels(1)
+        self.wav.setsampwidth(FRAME_BYTES)
+        self.wav.setframerate(PCM_RATE)
+        super().__init__(player)
+
+    def write(self, pcm: bytes):
+        self.wav.writeframes(pcm)
+
+    def close(self):
+        super().close()
+        self.wav.close()
+
+
+def open_sink(output: str, player: AudioPlayer):
+    """
+    "pyaudio" (sound card), "null" (discard at real time) or "file:<path.wav>".
+    """
+    if output == "pyaudio":
+        return PyAudioSink(player)
+    if output == "null":
+        return ClockSink(player)
+    if output.startswith("file:"):
+        return WavSink(player, output[len("file:"):])
+    raise ValueError(f"Unknown audio output {output!r}")
+
+
+def decode_file(path) -> bytes:
+    """
+    Decodes an audio file to the player's PCM format. 24 kHz mono 16-bit WAV
+    (the bundled sounds) is read directly; anything else goes through ffmpeg,
+    or afconvert on macOS.
+    """
+    path = str(path)
+    if path.endswith(".wav"):
+        with wave.open(path, "rb") as w:
+            if (w.getframerate(), w.getnchannels(), w.getsampwidth()) == (PCM_RATE, 1, FRAME_BYTES):
+                return w.readframes(w.getnframes())
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is not None:
+        result = subprocess.run(
+            [ffmpeg, "-v", "error", "-i", path, "-f", "s16le", "-ac", "1", "-ar", str(PCM_RATE), "-"],
+            capture_output=True,
+            check=True,
+        )
+        return result.stdout
+    afconvert = shutil.which("afconvert")
+    if afconvert is not None:
+        with tempfile.TemporaryDirectory() as directory:
+            converted = os.path.join(directory, "converted.wav")
+            subprocess.run(
+                [afconvert, "-f", "WAVE", "-d", f"LEI16@{PCM_RATE}", "-c", "1", path, converted],
+                capture_output=True,
+                check=True,
+            )
+            with wave.open(converted, "rb") as w:
+                return w.readframes(w.getnframes())
+    raise RuntimeError(f"Cannot decode {path}: use 24 kHz mono 16-bit WAV, or install ffmpeg")
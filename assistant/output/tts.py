@@ -1,24 +1,44 @@
-import pyttsx3
 from assistant.core.logging_config import logger
 from assistant.core.config import config
+from assistant.core.registry import registry
+from assistant.core.tracing import tracer
+from assistant.output.player import PCM_BYTES_PER_SECOND, PCM_FORMAT, AudioPlayer, AudioStreamBuffer, decode_file
+from assistant.output.tts_cache import TTSCache, cache_key
 
+import asyncio
+import itertools
 import queue
 import threading
 import time
-import os
-import tempfile
+from concurrent.futures import Future
+
+# How long the mic may still hear playback after the player stops (device buffers, room)
+ECHO_TAIL_SECONDS = 0.3
+
+# Generation priorities (lower runs first). The sentence that will play next
+# must not wait behind sentences queued after it.
+PRIORITY_FIRST = 0
+PRIORITY_NORMAL = 1
+_PRIORITY_STOP = 99
+
 
 class TextToSpeech:
     def __init__(self):
         logger.info("Initializing TTS...")
         self.client = None
+        self.http_clients = []
+        self.workers = max(1, config.TTS_WORKERS)
         self.provider = "openai"
 
         # Check for ElevenLabs first (as requested for better quality)
         if config.ELEVENLABS_API_KEY:
             try:
                 from elevenlabs.client import ElevenLabs
-                self.client = ElevenLabs(api_key=config.ELEVENLABS_API_KEY)
+                self.client = ElevenLabs(
+                    api_key=config.ELEVENLABS_API_KEY,
+                    base_url=config.ELEVENLABS_BASE_URL,
+                    httpx_client=self._http_client(),
+                )
                 self.provider = "elevenlabs"
                 logger.info("TTS Provider: ElevenLabs")
             except ImportError:
@@ -30,7 +50,7 @@ class TextToSpeech:
         if not self.client and config.OPENAI_API_KEY:
              try:
                  from openai import OpenAI
-                 self.client = OpenAI(api_key=config.OPENAI_API_KEY)
+                 self.client = OpenAI(api_key=config.OPENAI_API_KEY, http_client=self._http_client())
                  self.provider = "openai"
                  logger.info("TTS Provider: OpenAI")
              except Exception as e:
@@ -39,54 +59,168 @@ class TextToSpeech:
         if not self.client:
             logger.error("No TTS provider available (OpenAI or ElevenLabs).")
 
-            
+        if self.provider == "elevenlabs":
+            self.voice_id, self.model_id = config.ELEVENLABS_VOICE_ID, config.ELEVENLABS_MODEL_ID
+        else:
+            self.voice_id, self.model_id = "nova", "tts-1"
+
+        self.cache = None
+        if config.TTS_CACHE:
+            try:
+                self.cache = TTSCache(config.TTS_CACHE_DIR, config.TTS_CACHE_MAX_MB * 1024 * 1024)
+            except OSError as e:
+                logger.warning(f"TTS cache disabled: {e}")
+
+        self.streaming = config.TTS_STREAMING
+        # Without streaming a clip only starts once it is fully generated
+        self.prebuffer_bytes = PCM_BYTES_PER_SECOND * config.TTS_PREBUFFER_MS // 1000 if self.streaming else None
+        if self.streaming:
+            logger.info(f"TTS streaming enabled (prebuffer {config.TTS_PREBUFFER_MS} ms).")
+
+        # One persistent output stream; clips play back to back
+        self.player = AudioPlayer(config.TTS_OUTPUT, block_ms=config.TTS_OUTPUT_BLOCK_MS)
+        # Decoded sound files (startup/goodbye), by path
+        self.sounds = {}
+
+        # Playback order queue, and the generation jobs feeding it
         self.queue = queue.Queue()
+        self.jobs = queue.PriorityQueue()
+        self._job_seq = itertools.count()
         self.is_running = True
-        self.active_generations = 0
+
+        # Utterances queued but not finished playing; idle() waits for zero
+        self.pending = 0
         self.lock = threading.Lock()
-        
+        self.idle_cond = threading.Condition(self.lock)
+        self._idle_waiters = []
+
+        # Bumped by interrupt(); anything queued under an older epoch is dropped
+        self.epoch = 0
+
+        self.generation_threads = [
+            threading.Thread(target=self._generation_worker, name=f"tts-gen-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self.generation_threads:
+            thread.start()
+
         self.playback_thread = threading.Thread(target=self._playback_worker, daemon=True)
         self.playback_thread.start()
 
+    def _http_client(self):
+        """
+        One pooled keep-alive HTTP client per provider, sized to the worker pool,
+        so sentences reuse warm TLS connections.
+        """
+        import httpx
+        http = httpx.Client(
+            timeout=httpx.Timeout(60.0, connect=5.0),
+            limits=httpx.Limits(max_connections=self.workers * 2, max_keepalive_connections=self.workers),
+        )
+        self.http_clients.append(http)
+        return http
+
+    def _generation_worker(self):
+        while True:
+            priority, _, text, completion_event, result_container = self.jobs.get()
+            if priority == _PRIORITY_STOP:
+                return
+            if self._cancelled(result_container):
+                result_container['stream'].close()
+                completion_event.set()
+                continue
+            if result_container.get('file') is not None:
+                self._decode_sound(result_container['file'], completion_event, result_container)
+            else:
+                self._generate_stream(text, result_container['stream'], completion_event, result_container)
+
+    def _cancelled(self, result_container: dict) -> bool:
+        return result_container.get('epoch') != self.epoch
+
+    @property
+    def is_playing(self) -> bool:
+        return self.player.is_playing
+
+    @property
+    def is_echoing(self) -> bool:
+        """
+        True while our own audio may be reaching the microphone.
+        """
+        return self.is_playing or time.perf_counter() - self.player.stopped_at < ECHO_TAIL_SECONDS
+
+    def interrupt(self) -> int:
+        """
+        Barge-in: drops every queued utterance, aborts in-flight generations at
+        their next chunk and stops the current playback at the next audio
+        block. Returns how many utterances were cancelled; their futures
+        resolve to False.
+        """
+        with self.lock:
+            self.epoch += 1
+            cancelled = self.pending
+        self.player.cancel_all()
+        if cancelled:
+            logger.info(f"TTS interrupted, dropped {cancelled} utterance(s).")
+        return cancelled
+
+    def _finish(self, result_container: dict, played: bool):
+        """
+        Resolves the utterance's future and wakes idle waiters when nothing is left.
+        """
+        future = result_container.get('future')
+        if future is not None and not future.done():
+            future.set_result(played)
+        with self.lock:
+            self.pending -= 1
+            if self.pending > 0:
+                return
+            self.idle_cond.notify_all()
+            waiters, self._idle_waiters = self._idle_waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(lambda w=waiter: w.done() or w.set_result(None))
+
     def _playback_worker(self):
         """
-        Background thread that plays audio from the queue.
+        Hands clips to the player in queue order as soon as each has enough
+        audio buffered, so the next one is queued before the current one ends.
         """
-        import subprocess
-        from pathlib import Path
-        
         while self.is_running:
             try:
-                # Get item from queue (blocking)
-                # item is now a tuple: (event, result_container)
-                item = self.queue.get(timeout=1)
-                
-                if item is None:
-                    continue
-                    
-                completion_event, result_container = item
-                
-                # Wait for generation to complete
-                completion_event.wait()
-                
-                audio_file_path = result_container.get('path')
-                
-                if audio_file_path:
-                    logger.info(f"Playing audio: {audio_file_path}")
-                    subprocess.run(["afplay", str(audio_file_path)])
-                    try:
-                        Path(audio_file_path).unlink(missing_ok=True)
-                        logger.debug(f"Deleted temp audio: {audio_file_path}")
-                    except Exception as e:
-                        logger.warning(f"Failed to delete temp audio {audio_file_path}: {e}")
-                else:
-                    logger.warning("Skipping playback (generation failed).")
-
-                self.queue.task_done()
+                completion_event, result_container = self.queue.get(timeout=1)
             except queue.Empty:
                 continue
+
+            try:
+                if self._cancelled(result_container):
+                    self._finish(result_container, False)
+                    continue
+                stream = result_container['stream']
+                if not stream.wait_for(self.prebuffer_bytes) or self._cancelled(result_container):
+                    if not self._cancelled(result_container):
+                        logger.warning("Skipping playback (generation failed).")
+                    self._finish(result_container, False)
+                    continue
+                self.player.play(
+                    stream,
+                    on_start=lambda rc=result_container: self._on_playback_start(rc),
+                    on_done=lambda played, rc=result_container: self._finish(rc, played and not self._cancelled(rc)),
+                )
             except Exception as e:
                 logger.error(f"Playback Error: {e}")
+                self._finish(result_container, False)
+            finally:
+                self.queue.task_done()
+
+    def _on_playback_start(self, result_container: dict):
+        started = time.perf_counter()
+        queued_at = result_container['queued_at']
+        first_chunk_at = result_container['stream'].first_chunk_at or started
+        logger.info(
+            f"Time-to-first-audio: {(started - queued_at) * 1000:.0f} ms "
+            f"(first byte after {(first_chunk_at - queued_at) * 1000:.0f} ms)"
+        )
+        result_container['ttfa'] = started - queued_at
+        tracer.mark("playback_start")
 
     def speak(self, text: str):
         """
@@ -95,100 +229,235 @@ class TextToSpeech:
         self.speak_async(text)
         self.wait_for_idle()
 
-    def speak_async(self, text: str):
+    def speak_async(self, text: str, priority: int = None) -> Future:
         """
-        Generates audio and puts it in the playback queue.
-        Returns immediately (mostly).
+        Queues text for generation on the worker pool and playback in order.
+        Returns a Future that resolves to True once it has played (False if
+        generation failed). Without an explicit priority, an utterance with
+        nothing ahead of it in the playback queue (the first sentence of a
+        turn) is generated before everything else.
         """
         logger.info(f"Queueing to speak: {text}")
+        future = Future()
         if not text:
-            return
-        
+            future.set_result(False)
+            return future
+
+        completion_event, result_container = self._placeholder(future)
+
+        with self.lock:
+            first = self.pending == 0
+            self.pending += 1
+        if priority is None:
+            priority = PRIORITY_FIRST if first else PRIORITY_NORMAL
+
+        if self._play_from_cache(text, completion_event, result_container):
+            self.queue.put((completion_event, result_container))
+            return future
+
         if not self.client:
              logger.error("TTS failed: No TTS Client initialized")
-             return
-
-        # Create a placeholder for the result to preserve order
-        completion_event = threading.Event()
-        result_container = {} # Mutable dict to hold result
+             self._finish(result_container, False)
+             return future
         
         # Put placeholder in queue IMMEDIATELY
         self.queue.put((completion_event, result_container))
+        self.jobs.put((priority, next(self._job_seq), text, completion_event, result_container))
+        return future
 
-        # Generate audio in a separate thread
+    def play_file(self, path) -> Future:
+        """
+        Queues a sound file (decoded to PCM once, off the audio thread) like an utterance.
+        """
+        logger.info(f"Queueing sound: {path}")
+        future = Future()
+        completion_event, result_container = self._placeholder(future)
+        result_container['file'] = path
         with self.lock:
-            self.active_generations += 1
-        threading.Thread(target=self._generate_audio, args=(text, completion_event, result_container)).start()
+            self.pending += 1
+        self.queue.put((completion_event, result_container))
+        self.jobs.put((PRIORITY_FIRST, next(self._job_seq), None, completion_event, result_container))
+        return future
 
-    def _generate_audio(self, text, completion_event, result_container):
+    def _placeholder(self, future: Future):
+        """
+        The event and mutable result dict that keep an utterance's place in the playback order.
+        """
+        result_container = {
+            'queued_at': time.perf_counter(),
+            'future': future,
+            'epoch': self.epoch,
+            'stream': AudioStreamBuffer(),
+        }
+        return threading.Event(), result_container
+
+    def _decode_sound(self, path, completion_event, result_container):
+        stream = result_container['stream']
         try:
-            from pathlib import Path
-            import uuid
-            
-            # Save to temp file with unique name in the system temp directory
-            # We use a suffix to ensure it's treated as an mp3
-            temp_dir = tempfile.gettempdir()
-            filename = f"tts_{uuid.uuid4().hex}.mp3"
-            temp_file = Path(os.path.join(temp_dir, filename))
-            
-            if self.provider == "elevenlabs":
-                # ElevenLabs Generation
-                # Ensure voice ID is set, or use a default
-                voice_id = config.ELEVENLABS_VOICE_ID 
-                print("Voice ID: " + voice_id)
-                
-                # Use text_to_speech.convert (returns generator of bytes)
-                # Updated for new ElevenLabs SDK
-                audio_stream = self.client.text_to_speech.convert(
-                    text=text,
-                    voice_id=voice_id,
-                    model_id=config.ELEVENLABS_MODEL_ID
-                )
-                
-                # Write stream to file
-                with open(temp_file, "wb") as f:
-                    for chunk in audio_stream:
-                        f.write(chunk)
-                        
-            elif self.provider == "openai":
-                # OpenAI Generation
-                response = self.client.audio.speech.create(
-                    model="tts-1",
-                    voice="nova", 
-                    input=text
-                )
-                response.stream_to_file(temp_file)
+            pcm = self.sounds.get(path)
+            if pcm is None:
+                pcm = self.sounds[path] = decode_file(path)
+            stream.write(pcm)
+        except Exception as e:
+            logger.error(f"Failed to decode {path}: {e}")
+        finally:
+            stream.close()
+            completion_event.set()
+
+    def _cache_key(self, text: str) -> str:
+        return cache_key(self.provider, self.voice_id, self.model_id, PCM_FORMAT, text)
+
+    def _cacheable(self, text: str) -> bool:
+        return self.cache is not None and len(text) <= config.TTS_CACHE_MAX_CHARS
+
+    def _play_from_cache(self, text, completion_event, result_container) -> bool:
+        """
+        Fills the result from the disk cache. Returns False on a miss.
+        """
+        if not self._cacheable(text):
+            return False
+        key = self._cache_key(text)
+        path = self.cache.get(key)
+        if path is None:
+            result_container['cache_key'] = key
+            return False
+
+        logger.debug(f"TTS cache hit: {text!r}")
+        tracer.mark("tts_cache_hit")
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Blocking speak() from a worker thread
+            self._read_cached(path, completion_event, result_container)
+        else:
+            # The playback worker waits on completion_event, not on us
+            loop.run_in_executor(None, self._read_cached, path, completion_event, result_container)
+        return True
+
+    def _read_cached(self, path, completion_event, result_container):
+        stream = result_container['stream']
+        try:
+            stream.write(path.read_bytes())
+        except OSError as e:
+            logger.warning(f"Failed to read cached audio {path}: {e}")
+        finally:
+            stream.close()
+            completion_event.set()
+
+    def _store_in_cache(self, text, result_container, data: bytes):
+        key = result_container.get('cache_key')
+        if key and data:
+            self.cache.put(key, data, text)
+
+    def _provider_chunks(self, text):
+        """
+        Yields 24 kHz 16-bit mono PCM chunks from the provider as they arrive
+        (raw PCM is requested, so nothing has to be decoded).
+        """
+        if self.provider == "elevenlabs":
+            yield from self.client.text_to_speech.stream(
+                text=text,
+                voice_id=self.voice_id,
+                model_id=self.model_id,
+                output_format=PCM_FORMAT,
+            )
+
+        elif self.provider == "openai":
+            with self.client.audio.speech.with_streaming_response.create(
+                model=self.model_id,
+                voice=self.voice_id,
+                input=text,
+                response_format="pcm"
+            ) as response:
+                yield from response.iter_bytes(4096)
+
+    def _generate_stream(self, text, stream: AudioStreamBuffer, completion_event, result_container):
+        """
+        Writes provider chunks straight into the playback buffer.
+        """
+        tracer.mark("tts_request")
+        try:
+            # Keep a copy for the cache; only stored if the stream completes
+            audio = [] if result_container.get('cache_key') else None
+            chunks = self._provider_chunks(text)
+            try:
+                for chunk in chunks:
+                    if self._cancelled(result_container):
+                        # Interrupted: closing the generator closes the HTTP response
+                        logger.debug(f"TTS generation cancelled: {text!r}")
+                        return
+                    tracer.mark("tts_first_byte")
+                    stream.write(chunk)
+                    if audio is not None:
+                        audio.append(chunk)
+            finally:
+                chunks.close()
+            if audio is not None:
+                self._store_in_cache(text, result_container, b"".join(audio))
 
-            # Set result
-            result_container['path'] = temp_file
-            
         except Exception as e:
-            logger.error(f"TTS Generation Error ({self.provider}): {e}")
-            result_container['path'] = None
+            logger.error(f"TTS Streaming Error ({self.provider}): {e}")
         finally:
-            # Signal completion
+            stream.close()
             completion_event.set()
-            
-            with self.lock:
-                self.active_generations -= 1
+
+    def warm_up(self, phrases) -> int:
+        """
+        Synthesizes phrases that are not cached yet, so they later play with
+        no network round trip. Blocking; returns how many were synthesized.
+        """
+        if self.cache is None or not self.client:
+            logger.warning("TTS warm-up skipped (cache or provider unavailable).")
+            return 0
+
+        created = 0
+        for text in phrases:
+            if not self._cacheable(text):
+                continue
+            key = self._cache_key(text)
+            if self.cache.contains(key):
+                continue
+            try:
+                data = b"".join(self._provider_chunks(text))
+            except Exception as e:
+                logger.error(f"TTS warm-up failed for {text!r}: {e}")
+                continue
+            self.cache.put(key, data, text)
+            created += 1
+        if created:
+            logger.info(f"TTS cache warmed with {created} phrases.")
+        return created
 
     def wait_for_idle(self):
         """
-        Blocks until all generation threads are done AND the playback queue is empty.
+        Blocks until everything queued has been generated and played.
         """
-        # 1. Wait for generations to finish
-        while True:
-            with self.lock:
-                if self.active_generations == 0:
-                    break
-            time.sleep(0.1)
-        
-        # 2. Wait for playback queue to empty
-        self.queue.join()
+        with self.idle_cond:
+            self.idle_cond.wait_for(lambda: self.pending == 0)
+
+    async def idle(self):
+        """
+        Waits, without blocking the event loop, until everything queued has played.
+        """
+        with self.lock:
+            if self.pending == 0:
+                return
+            loop = asyncio.get_running_loop()
+            waiter = loop.create_future()
+            self._idle_waiters.append((loop, waiter))
+        await waiter
 
     def stop(self):
         self.is_running = False
+        for _ in self.generation_threads:
+            self.jobs.put((_PRIORITY_STOP, next(self._job_seq), None, None, None))
+        self.player.close()
+        for http in self.http_clients:
+            http.close()
+        if self.cache is not None:
+            logger.info(f"TTS cache stats: {self.cache.stats()}")
+            self.cache.flush()
         if self.playback_thread.is_alive():
             self.playback_thread.join(timeout=1)
 
-tts = TextToSpeech()
+tts = registry.register("tts", TextToSpeech)
@@ -0,0 +1,259 @@
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Optional
+
+from assistant.core.config import config
+from assistant.core.logging_config import logger
+
+INDEX_FILE = "index.json"
+INDEX_VERSION = 1
+
+
+def normalize_text(text: str) -> str:
+    """
+    Canonical form used for cache keys: NFC, collapsed whitespace.
+    Case and punctuation are kept since they change how a phrase is spoken.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(provider: str, voice_id: str, model_id: str, audio_format: str, text: str) -> str:
+    material = "\0".join([provider, voice_id, model_id, audio_format, normalize_text(text)])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _atomic_write(path: Path, data: bytes):
+    # Write next to the target and rename, so readers never see a partial file
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class TTSCache:
+    """
+    Content-addressed, size-bounded on-disk cache of synthesized audio.
+
+    Files are named by the hash of (provider, voice, model, audio format,
+    normalized text). The index (key -> size, last use, text) is loaded at
+    startup, so the directory is never scanned; least recently used entries
+    are evicted once the total size exceeds max_bytes. All writes go through
+    a temp file and rename. `lock` guards the in-memory index only; disk
+    writes are serialized by `write_lock`, so get() never waits for the disk.
+    """
+    def __init__(self, directory, max_bytes: int, suffix: str = ".pcm"):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+
+        # key -> {"size", "used", "text"}, least recently used first
+        self.entries: "OrderedDict[str, dict]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._dirty = False
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.entries),
+            "total_bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hit_ratio, 3),
+            "bytes_saved": self.bytes_saved,
+        }
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / f"{key}{self.suffix}"
+
+    def _load_index(self):
+        index_path = self.directory / INDEX_FILE
+        if not index_path.exists():
+            return
+        try:
+            data = json.loads(index_path.read_text())
+            if data.get("version") != INDEX_VERSION:
+                logger.warning("TTS cache index has an unknown version, starting empty.")
+                return
+            entries = sorted(data["entries"].items(), key=lambda kv: kv[1]["used"])
+            for key, entry in entries:
+                self.entries[key] = entry
+                self.total_bytes += entry["size"]
+            self.hits = data.get("hits", 0)
+            self.misses = data.get("misses", 0)
+            self.bytes_saved = data.get("bytes_saved", 0)
+            logger.info(f"TTS cache: {len(self.entries)} entries, {self.total_bytes / 1e6:.1f} MB.")
+        except Exception as e:
+            logger.warning(f"Failed to load TTS cache index, starting empty: {e}")
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def _index_data(self) -> bytes:
+        # Snapshot under self.lock; written out by _write_index() under write_lock only
+        data = {
+            "version": INDEX_VERSION,
+            "entries": dict(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "bytes_saved": self.bytes_saved,
+        }
+        self._dirty = False
+        return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+    def _write_index(self, data: bytes):
+        _atomic_write(self.directory / INDEX_FILE, data)
+
+    def get(self, key: str) -> Optional[Path]:
+        """
+        Returns the cached file for key (and marks it recently used), or None.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            path = self.path_for(key)
+            if entry is not None and not path.exists():
+                # Removed behind our back
+                del self.entries[key]
+                self.total_bytes -= entry["size"]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                self._dirty = True
+                return None
+            entry["used"] = time.time()
+            self.entries.move_to_end(key)
+            self.hits += 1
+            self.bytes_saved += entry["size"]
+            self._dirty = True
+            return path
+
+    def contains(self, key: str) -> bool:
+        with self.lock:
+            return key in self.entries
+
+    def put(self, key: str, data: bytes, text: str = ""):
+        if not data or len(data) > self.max_bytes:
+            return
+        with self.write_lock:
+            try:
+                _atomic_write(self.path_for(key), data)
+            except OSError as e:
+                logger.warning(f"Failed to write TTS cache entry: {e}")
+                return
+            with self.lock:
+                old = self.entries.pop(key, None)
+                if old is not None:
+                    self.total_bytes -= old["size"]
+                self.entries[key] = {"size": len(data), "used": time.time(), "text": text}
+                self.total_bytes += len(data)
+                evicted = self._evict()
+                index = self._index_data()
+            for old_key in evicted:
+                try:
+                    self.path_for(old_key).unlink(missing_ok=True)
+                except OSError as e:
+                    logger.warning(f"Failed to evict TTS cache entry {old_key}: {e}")
+            self._write_index(index)
+
+    def _evict(self) -> list:
+        """
+        Drops least recently used entries from the index; returns their keys
+        so the caller can delete the files outside the lock.
+        """
+        evicted = []
+        while self.total_bytes > self.max_bytes and self.entries:
+            key, entry = self.entries.popitem(last=False)
+            self.total_bytes -= entry["size"]
+            evicted.append(key)
+            logger.debug(f"Evicted TTS cache entry: {entry.get('text', key)!r}")
+        return evicted
+
+    def flush(self):
+        """
+        Persists LRU order and hit counters gathered since the last write.
+        """
+        with self.write_lock:
+            with self.lock:
+                if not self._dirty:
+                    return
+                index = self._index_data()
+            self._write_index(index)
+
+    def clear(self):
+        with self.write_lock:
+            with self.lock:
+                keys = list(self.entries)
+                self.entries.clear()
+                self.total_bytes = 0
+                index = self._index_data()
+            for key in keys:
+                self.path_for(key).unlink(missing_ok=True)
+            self._write_index(index)
+
+
+def load_phrases(path=None) -> list:
+    path = Path(path or config.TTS_WARMUP_PHRASES)
+    if not path.exists():
+        return []
+    lines = path.read_text(encoding="utf-8").splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+
+
+def main(argv: Optional[Iterable[str]] = None):
+    """
+    python -m assistant.output.tts_cache warm [--file PHRASES] [phrase ...]
+    python -m assistant.output.tts_cache stats
+    python -m assistant.output.tts_cache clear
+    """
+    ap = argparse.ArgumentParser(prog="python -m assistant.output.tts_cache", description="TTS audio cache tools")
+    sub = ap.add_subparsers(dest="action", required=True)
+    warm = sub.add_parser("warm", help="pre-synthesize phrases into the cache")
+    warm.add_argument("--file", help=f"phrase list, one per line (default {config.TTS_WARMUP_PHRASES})")
+    warm.add_argument("phrases", nargs="*")
+    sub.add_parser("stats", help="print cache statistics")
+    sub.add_parser("clear", help="delete all cached audio")
+    args = ap.parse_args(argv)
+
+    if args.action == "warm":
+        from assistant.output.tts import tts
+        phrases = args.phrases or load_phrases(args.file)
+        created = tts.warm_up(phrases)
+        print(f"Warmed {len(phrases)} phrases ({created} newly synthesized).")
+        tts.stop()
+        return
+
+    cache = TTSCache(config.TTS_CACHE_DIR, config.TTS_CACHE_MAX_MB * 1024 * 1024)
+    if args.action == "stats":
+        print(json.dumps(cache.stats(), indent=2))
+    elif args.action == "clear":
+        cache.clear()
+        print("TTS cache cleared.")
+
+
+if __name__ == "__main__":
+    main()
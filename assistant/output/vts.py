@@ -1,9 +1,14 @@
+import asyncio
+import inspect
+import itertools
 import json
 import logging
 import websockets
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Callable, List, Optional
 from assistant.core.config import config
+from assistant.core.registry import registry
 from assistant.core.logging_config import logger
+from assistant.core.tracing import tracer
 
 
 class VTSClient:
@@ -15,6 +20,24 @@ class VTSClient:
         
         self.ws = None
         self.connected = False
+
+        # Request multiplexing: one reader task resolves futures by requestID
+        # and routes event messages to subscribers.
+        self._request_ids = itertools.count(1)
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._event_handlers: Dict[str, List[Callable[[Dict[str, Any]], Any]]] = {}
+        self._reader_task = None
+        # One connect (and its up to 60 s authentication) at a time
+        self._connect_lock = asyncio.Lock()
+        self.subscribe("ModelLoadedEvent", self._on_model_loaded)
+
+        # Hotkey name -> hotkeyID for the loaded model, rebuilt on ModelLoadedEvent
+        self.hotkey_ids: Dict[str, str] = {}
+        self.hotkey_model_id = None
+        self.hotkey_cache_valid = False
+        self.hotkey_cache_hits = 0
+        self.hotkey_cache_misses = 0
+        self._hotkey_refresh_lock = asyncio.Lock()
         
         # Load mood mapping
         self.moods = {}
@@ -38,39 +61,113 @@ class VTSClient:
             payload["data"] = data
         return payload
 
-    async def _send(self, ws, payload: Dict[str, Any]) -> Dict[str, Any]:
-        await ws.send(json.dumps(payload))
-        response = await ws.recv()
-        return json.loads(response)
+    async def request(self, message_type: str, data: Optional[Dict[str, Any]] = None, timeout: float = None) -> Dict[str, Any]:
+        """
+        Sends a request with a unique requestID and waits for its response.
+        Any number of requests can be in flight at once.
+        """
+        if not self.ws:
+            raise ConnectionError("VTS not connected")
 
-    async def authenticate(self, ws) -> bool:
+        request_id = f"karien-{next(self._request_ids)}"
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await self.ws.send(json.dumps(self._req(message_type, data, request_id=request_id)))
+            return await asyncio.wait_for(future, timeout or config.VTS_REQUEST_TIMEOUT)
+        finally:
+            self._pending.pop(request_id, None)
+            if not future.done():
+                future.cancel()
+
+    async def _reader_loop(self, ws):
         """
-        Authenticates with VTS. Handles token requests if needed.
+        Reads every message on the socket: responses resolve their awaiting
+        request, everything else is treated as an event.
         """
-        auth_payload = self._req(
-            "AuthenticationRequest",
-            {
-                "pluginName": self.plugin_name,
-                "pluginDeveloper": self.developer,
-                "authenticationToken": self.token,
-            },
-            request_id="auth",
+        try:
+            async for raw in ws:
+                try:
+                    message = json.loads(raw)
+                except ValueError:
+                    logger.warning(f"Unparseable VTS message: {raw!r}")
+                    continue
+
+                future = self._pending.get(message.get("requestID"))
+                if future is not None and not future.done():
+                    future.set_result(message)
+                else:
+                    self._dispatch_event(message)
+        except websockets.ConnectionClosed as e:
+            logger.warning(f"VTS connection lost: {e}")
+        finally:
+            if self.ws is ws:
+                self.connected = False
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("VTS connection closed"))
+
+    def _dispatch_event(self, message: Dict[str, Any]):
+        message_type = message.get("messageType", "")
+        handlers = self._event_handlers.get(message_type)
+        if not handlers:
+            logger.debug(f"Ignoring unsolicited VTS message: {message_type}")
+            return
+        for handler in handlers:
+            try:
+                result = handler(message.get("data", {}))
+                if inspect.isawaitable(result):
+                    asyncio.ensure_future(result)
+            except Exception as e:
+                logger.error(f"VTS event handler for {message_type} failed: {e}")
+
+    def subscribe(self, event_name: str, handler: Callable[[Dict[str, Any]], Any]):
+        """
+        Registers a handler (sync or async) for a VTS event. Subscriptions are
+        (re)sent to VTS on every connect.
+        """
+        self._event_handlers.setdefault(event_name, []).append(handler)
+
+    async def _subscribe_events(self):
+        results = await asyncio.gather(*(
+            self.request("EventSubscriptionRequest", {"eventName": name, "subscribe": True, "config": {}})
+            for name in self._event_handlers
+        ), return_exceptions=True)
+        for name, resp in zip(self._event_handlers, results):
+            if isinstance(resp, Exception) or resp.get("messageType") == "APIError":
+                logger.warning(f"VTS subscription to {name} failed: {resp}")
+
+    def _on_model_loaded(self, data: Dict[str, Any]):
+        logger.info(
+            f"VTS model changed ({data.get('modelName')}, loaded={data.get('modelLoaded')}). "
+            "Invalidating hotkey cache."
         )
-        auth_resp = await self._send(ws, auth_payload)
+        self.hotkey_cache_valid = False
+
+    async def authenticate(self) -> bool:
+        """
+        Authenticates with VTS. Handles token requests if needed.
+        """
+        auth_data = {
+            "pluginName": self.plugin_name,
+            "pluginDeveloper": self.developer,
+            "authenticationToken": self.token,
+        }
+        auth_resp = await self.request("AuthenticationRequest", auth_data)
         
         if auth_resp.get("messageType") == "APIError" or not auth_resp.get("data", {}).get("authenticated"):
             logger.warning(f"VTS Auth Failed: {auth_resp.get('data', {}).get('message', 'Unknown Error')}")
             logger.info("Requesting new authentication token...")
             
-            token_req_payload = self._req(
+            # The user has to click "Allow" in VTS, so give this one longer
+            token_resp = await self.request(
                 "AuthenticationTokenRequest",
                 {
                     "pluginName": self.plugin_name,
                     "pluginDeveloper": self.developer,
                 },
-                request_id="token_req"
+                timeout=60,
             )
-            token_resp = await self._send(ws, token_req_payload)
             
             if token_resp.get("messageType") == "AuthenticationTokenResponse":
                 new_token = token_resp.get("data", {}).get("authenticationToken")
@@ -88,8 +185,8 @@ class VTSClient:
                         logger.error(f"Failed to save new token: {save_err}")
                     
                     # Retry Authentication
-                    auth_payload["data"]["authenticationToken"] = self.token
-                    auth_resp = await self._send(ws, auth_payload)
+                    auth_data["authenticationToken"] = self.token
+                    auth_resp = await self.request("AuthenticationRequest", auth_data)
                     
                     if not auth_resp.get("data", {}).get("authenticated"):
                         logger.error("VTS Re-Auth Failed even with new token.")
@@ -103,49 +200,104 @@ class VTSClient:
         
         return True
 
-    async def connect(self):
+    async def connect(self, stale=None):
         """
-        Establishes a persistent connection to VTube Studio.
+        Establishes a persistent connection to VTube Studio. Calls are
+        serialized, so a caller that waited on another's attempt reuses its
+        connection. `stale` is a socket that just failed: it is closed and
+        replaced, unless another caller already did that.
         """
-        if self.connected and self.ws:
-            return
+        async with self._connect_lock:
+            if stale is not None and self.ws is stale:
+                await self.close()
+            if self.connected and self.ws:
+                return
+            if self.ws:
+                # Left over from a lost connection; close it with its reader first
+                await self.close()
 
-        logger.info(f"Connecting to VTube Studio at {self.url}...")
-        try:
-            self.ws = await websockets.connect(self.url, open_timeout=2)
-            if await self.authenticate(self.ws):
-                self.connected = True
-                logger.info("VTS connected and authenticated.")
-            else:
-                logger.error("VTS connected but failed authentication.")
+            logger.info(f"Connecting to VTube Studio at {self.url}...")
+            try:
+                self.ws = await websockets.connect(self.url, open_timeout=2)
+                self._reader_task = asyncio.create_task(self._reader_loop(self.ws))
+                if await self.authenticate():
+                    self.connected = True
+                    logger.info("VTS connected and authenticated.")
+                    self.hotkey_cache_valid = False
+                    await self._subscribe_events()
+                else:
+                    logger.error("VTS connected but failed authentication.")
+                    await self.close()
+            except Exception as e:
+                logger.error(f"Failed to connect to VTS: {e}")
                 await self.close()
-        except Exception as e:
-            logger.error(f"Failed to connect to VTS: {e}")
-            self.connected = False
 
     async def close(self):
         if self.ws:
             await self.ws.close()
+        if self._reader_task:
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+            self._reader_task = None
         self.connected = False
         self.ws = None
         logger.info("VTS connection closed.")
 
-    async def trigger_hotkey(self, ws, hotkey_name: str):
+    async def refresh_hotkeys(self):
         """
-        Triggers a hotkey by name using the provided websocket connection.
+        Rebuilds the hotkey name -> ID index for the currently loaded model.
         """
-        # 1. Get Hotkeys
-        hk_resp = await self._send(ws, self._req("HotkeysInCurrentModelRequest", request_id="hk_list"))
-        hotkeys = hk_resp.get("data", {}).get("availableHotkeys", [])
-        
-        # 2. Find Hotkey ID
-        match = next((hk for hk in hotkeys if hk.get("name") == hotkey_name), None)
-        if not match:
+        hk_resp = await self.request("HotkeysInCurrentModelRequest")
+        data = hk_resp.get("data", {})
+        self.hotkey_ids = {
+            hk.get("name"): hk["hotkeyID"]
+            for hk in data.get("availableHotkeys", [])
+            if hk.get("name") and hk.get("hotkeyID")
+        }
+        self.hotkey_model_id = data.get("modelID")
+        self.hotkey_cache_valid = True
+        logger.info(f"Cached {len(self.hotkey_ids)} hotkeys for model '{data.get('modelName')}'.")
+
+    async def _lookup_hotkey(self, hotkey_name: str) -> Optional[str]:
+        if self.hotkey_cache_valid and hotkey_name in self.hotkey_ids:
+            self.hotkey_cache_hits += 1
+            logger.debug(
+                f"Hotkey cache hit: {hotkey_name} "
+                f"(hits={self.hotkey_cache_hits}, misses={self.hotkey_cache_misses})"
+            )
+            return self.hotkey_ids[hotkey_name]
+
+        self.hotkey_cache_misses += 1
+        logger.debug(
+            f"Hotkey cache miss: {hotkey_name} "
+            f"(hits={self.hotkey_cache_hits}, misses={self.hotkey_cache_misses})"
+        )
+        # Concurrent misses share one refresh
+        async with self._hotkey_refresh_lock:
+            if not self.hotkey_cache_valid:
+                await self.refresh_hotkeys()
+        return self.hotkey_ids.get(hotkey_name)
+
+    async def trigger_hotkey(self, hotkey_name: str):
+        """
+        Triggers a hotkey by name over the persistent connection.
+        Hotkey IDs come from the per-model cache, so a trigger is normally one request.
+        """
+        hotkey_id = await self._lookup_hotkey(hotkey_name)
+        if not hotkey_id:
             logger.error(f"Hotkey '{hotkey_name}' not found in current model.")
             return
 
-        # 3. Trigger
-        trig_resp = await self._send(ws, self._req("HotkeyTriggerRequest", {"hotkeyID": match["hotkeyID"]}, request_id="hk_trig"))
+        trig_resp = await self.request("HotkeyTriggerRequest", {"hotkeyID": hotkey_id})
+        if trig_resp.get("messageType") == "APIError" and self.hotkey_cache_valid:
+            # The model may have changed before its event reached us; refresh once and retry
+            logger.warning(f"VTS Trigger Failed with cached ID, refreshing hotkeys: {trig_resp}")
+            self.hotkey_cache_valid = False
+            hotkey_id = await self._lookup_hotkey(hotkey_name)
+            if not hotkey_id:
+                logger.error(f"Hotkey '{hotkey_name}' not found in current model.")
+                return
+            trig_resp = await self.request("HotkeyTriggerRequest", {"hotkeyID": hotkey_id})
+
         if trig_resp.get("messageType") == "APIError":
             logger.error(f"VTS Trigger Failed: {trig_resp}")
         else:
@@ -162,22 +314,31 @@ class VTSClient:
 
         hotkey_name = self.moods[mood_key]
         logger.info(f"Triggering mood: {mood_key} -> {hotkey_name}")
-        
+        with tracer.span("mood_trigger"):
+            await self._trigger_mood(hotkey_name)
+
+    async def _trigger_mood(self, hotkey_name: str):
         if not self.connected or not self.ws:
+            if self._connect_lock.locked():
+                # Authentication can wait up to a minute for the user; don't hold the reply for it
+                logger.warning("VTS still connecting, skipping mood.")
+                return
             logger.warning("VTS not connected. Attempting valid connection...")
             await self.connect()
         
         if self.connected and self.ws:
+            ws = self.ws
             try:
-                await self.trigger_hotkey(self.ws, hotkey_name)
+                await self.trigger_hotkey(hotkey_name)
             except Exception as e:
-                logger.error(f"Error triggering mood (reconnecting...): {e}")
-                self.connected = False
-                await self.connect()
+                logger.error(f"Error triggering mood (reconnecting...): {e!r}")
+                await self.connect(stale=ws)
                 if self.connected and self.ws: # Retry once
-                     await self.trigger_hotkey(self.ws, hotkey_name)
-
-
+                    try:
+                        await self.trigger_hotkey(hotkey_name)
+                    except Exception as e:
+                        # A mood is cosmetic; never let it end the turn
+                        logger.error(f"Error triggering mood after reconnecting, giving up: {e!r}")
 
 
-vts = VTSClient()
+vts = registry.register("vts", VTSClient)
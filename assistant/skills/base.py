@@ -1,22 +1,72 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from dataclasses import dataclass
+from typing import List, Optional
 
-class Skill(ABC):
-    @property
-    @abstractmethod
-    def name(self) -> str:
-        pass
+# Process output kept in a result (and possibly sent to the LLM)
+MAX_OUTPUT_CHARS = 500
 
-    @property
-    @abstractmethod
-    def description(self) -> str:
-        pass
 
-    @property
-    def commands(self) -> List[str]:
-        """List of command keys this skill handles."""
-        return []
+@dataclass
+class SkillResult:
+    """
+    Outcome of one command. duration is filled in by the SkillRunner and
+    covers the skill itself, not the wait for a concurrency slot.
+    """
+    command: str
+    success: bool
+    output: str = ""
+    error: Optional[str] = None
+    duration: float = 0.0
+    timed_out: bool = False
+
+    def describe(self) -> str:
+        """
+        Note for the conversation history; empty for a plain success.
+        """
+        if not self.success:
+            return f"[RESULT: {self.command} failed: {self.error or 'unknown error'}]"
+        if self.output:
+            return f"[RESULT: {self.command} ok: {self.output}]"
+        return ""
 
+
+async def run_process(command: str, *argv: str) -> SkillResult:
+    """
+    Runs argv without blocking the event loop. Cancelling the caller (a
+    timeout, shutdown) kills the process.
+    """
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *argv, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+    except OSError as e:
+        return SkillResult(command, False, error=str(e))
+    try:
+        stdout, stderr = await process.communicate()
+    except asyncio.CancelledError:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+
+    output = stdout.decode(errors="replace").strip()[:MAX_OUTPUT_CHARS]
+    if process.returncode != 0:
+        error = stderr.decode(errors="replace").strip()[:MAX_OUTPUT_CHARS]
+        return SkillResult(command, False, output, error=error or f"exit status {process.returncode}")
+    return SkillResult(command, True, output)
+
+
+class Skill(ABC):
+    """
+    A skill's implementation. Its name, commands, timeout, concurrency and
+    intents live in its manifest (config/skills/*.json, see
+    assistant.skills.registry); the module is only imported on first use.
+    """
     @abstractmethod
-    def execute(self, command: str, params: List[str]) -> bool:
+    async def execute(self, command: str, params: List[str]) -> SkillResult:
+        """
+        Runs one command on the event loop; never blocks it (use run_process
+        or asyncio.to_thread). May be cancelled at any await.
+        """
         pass
@@ -1,49 +1,39 @@
-import subprocess
+import asyncio
 import webbrowser
 import platform
 from typing import List
-from assistant.skills.base import Skill
+from assistant.skills.base import Skill, SkillResult, run_process
 from assistant.core.logging_config import logger
 
 class LauncherSkill(Skill):
-    @property
-    def name(self) -> str:
-        return "Launcher"
-
-    @property
-    def description(self) -> str:
-        return "Opens applications and URLs."
-
-    @property
-    def commands(self) -> List[str]:
-        return ["open_app", "open_url"]
-
-    def execute(self, command: str, params: List[str]) -> bool:
+    async def execute(self, command: str, params: List[str]) -> SkillResult:
         if not params:
             logger.warning("LauncherSkill: No parameters provided.")
-            return False
+            return SkillResult(command, False, error="no parameters")
             
         target = " ".join(params)
         
-        try:
-            if command == "open_app":
-                logger.info(f"Launching app: {target}")
-                if platform.system() == "Darwin": # macOS
-                    subprocess.run(["open", "-a", target], check=False)
-                    return True
-                else:
-                    logger.warning("App launching only supported on macOS.")
-                    return False
-                    
-            elif command == "open_url":
-                logger.info(f"Opening URL: {target}")
-                if not target.startswith("http"):
-                    target = "https://" + target
-                webbrowser.open(target)
-                return True
+        if command == "open_app":
+            logger.info(f"Launching app: {target}")
+            if platform.system() == "Darwin": # macOS
+                return await run_process(command, "open", "-a", target)
+            else:
+                logger.warning("App launching only supported on macOS.")
+                return SkillResult(command, False, error="only supported on macOS")
                 
-        except Exception as e:
-            logger.error(f"LauncherSkill Error: {e}")
-            return False
+        elif command == "open_url":
+            logger.info(f"Opening URL: {target}")
+            if not target.startswith("http"):
+                target = "https://" + target
+            # webbrowser may start a browser process and wait for it
+            opened = await asyncio.to_thread(webbrowser.open, target)
+            return SkillResult(command, opened, error=None if opened else "no browser")
+
+        elif command == "close_app":
+            # params is a list, e.g. ['YouTube']
+            app_name = params[0]
+            logger.info(f"Closing app: {app_name}")
+            # AppleScript to quit app
+            return await run_process(command, "osascript", "-e", f'tell application "{app_name}" to quit')
         
-        return False
+        return SkillResult(command, False, error="unknown command")
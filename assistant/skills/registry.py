@@ -0,0 +1,146 @@
+import importlib
+import json
+import threading
+import time
+from importlib.metadata import entry_points
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from assistant.core.config import config
+from assistant.core.logging_config import logger
+from assistant.core.registry import registry
+
+# Installed packages add skills with an entry point in this group whose object
+# is a manifest dict (see config/skills/*.json), e.g. in pyproject.toml:
+#   [project.entry-points."karien.skills"]
+#   weather = "karien_weather.manifest:MANIFEST"
+ENTRY_POINT_GROUP = "karien.skills"
+
+
+class CommandSpec:
+    """
+    One command as described by its skill's manifest.
+    """
+    def __init__(self, name: str, skill: "SkillSpec", data: dict):
+        self.name = name
+        self.skill = skill
+        # What goes after the comma in the prompt's "[CMD: name, example]"
+        self.example = data.get("example", "nan")
+        self.hint = data.get("hint")
+        self.intents: List[str] = data.get("intents", [])
+        self.acknowledgement_template = data.get("acknowledgement", "Tamam.")
+        # Run only once the reply has been spoken, instead of as soon as the tag is complete
+        self.after_speech = bool(data.get("after_speech", False))
+
+    def acknowledgement(self, command: str, params: List[str]) -> str:
+        """
+        Spoken reply when the command runs via the local fast path; "{0}" is the first parameter.
+        """
+        return self.acknowledgement_template.format(*params)
+
+    def tool_schema(self) -> dict:
+        """
+        The command as a function for native tool calling; its one argument is the [CMD] parameter.
+        """
+        return {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": self.hint or self.skill.description,
+                "parameters": {
+                    "type": "object",
+                    "properties": {"param": {"type": "string", "description": f"örn. {self.example}"}},
+                },
+            },
+        }
+
+
+class SkillSpec:
+    """
+    A skill's manifest. The implementation module is imported, and the
+    skill built, on its first command (load()).
+    """
+    def __init__(self, data: dict, source: str):
+        self.name = data["name"]
+        self.description = data.get("description", "")
+        self.module = data["module"]
+        self.class_name = data["class"]
+        self.timeout: Optional[float] = data.get("timeout")
+        self.max_concurrency = int(data.get("max_concurrency", 1))
+        self.source = source
+        self.commands = {name: CommandSpec(name, self, command) for name, command in data["commands"].items()}
+        self.instance = None
+        self.load_seconds = None
+        self._lock = threading.Lock()
+
+    @property
+    def intents(self) -> Dict[str, List[str]]:
+        return {name: command.intents for name, command in self.commands.items() if command.intents}
+
+    def acknowledgement(self, command: str, params: List[str]) -> str:
+        return self.commands[command].acknowledgement(command, params)
+
+    def load(self):
+        with self._lock:
+            if self.instance is None:
+                started = time.perf_counter()
+                module = importlib.import_module(self.module)
+                self.instance = getattr(module, self.class_name)()
+                self.load_seconds = time.perf_counter() - started
+                logger.info(f"Loaded {self.name} skill in {self.load_seconds * 1000:.0f} ms")
+        return self.instance
+
+
+class SkillRegistry:
+    """
+    Every available skill, from the manifests in config/skills and from
+    installed entry points, without importing any of them. commands maps
+    each command to its skill for dispatch; the prompt's command list and
+    the intent fast path are generated from the same manifests.
+    """
+    def __init__(self, directory: Path = None):
+        self.skills: Dict[str, SkillSpec] = {}
+        self.commands: Dict[str, CommandSpec] = {}
+        directory = Path(directory or config.SKILLS_DIR)
+        for path in sorted(directory.glob("*.json")):
+            try:
+                self.add(json.loads(path.read_text(encoding="utf-8")), str(path))
+            except Exception as e:
+                logger.error(f"Failed to load skill manifest {path.name}: {e}")
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            try:
+                self.add(entry_point.load(), f"entry point {entry_point.name}")
+            except Exception as e:
+                logger.error(f"Failed to load skill entry point {entry_point.name}: {e}")
+        logger.debug(f"Skills: {', '.join(self.skills)} ({len(self.commands)} commands)")
+
+    def add(self, manifest: dict, source: str = "") -> SkillSpec:
+        skill = SkillSpec(manifest, source)
+        if skill.name in self.skills:
+            logger.warning(f"Skill {skill.name} from {source} replaces the one from {self.skills[skill.name].source}")
+            for name in self.skills[skill.name].commands:
+                self.commands.pop(name, None)
+        self.skills[skill.name] = skill
+        for name, command in skill.commands.items():
+            if name in self.commands:
+                logger.warning(f"Command {name} of {skill.name} shadows the one of {self.commands[name].skill.name}")
+            self.commands[name] = command
+        return skill
+
+    def tool_schemas(self) -> List[dict]:
+        return [command.tool_schema() for command in self.commands.values()]
+
+    def prompt_section(self) -> str:
+        """
+        The system prompt's command list, one "[CMD: ...]" line per command.
+        """
+        lines = []
+        for command in self.commands.values():
+            line = f"- [CMD: {command.name}, {command.example}]"
+            if command.hint:
+                line += f" ({command.hint})"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+skills = registry.register("skills", SkillRegistry)
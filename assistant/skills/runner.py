@@ -0,0 +1,108 @@
+import asyncio
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+from assistant.core.logging_config import logger
+from assistant.core.tracing import percentile
+from assistant.skills.base import SkillResult
+from assistant.skills.registry import SkillRegistry, SkillSpec
+
+# Upper bucket edges (ms) of the per-skill duration histogram; the last bucket is open
+HISTOGRAM_EDGES_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class SkillTimings:
+    """
+    Duration histogram and outcome counts per skill.
+    """
+    def __init__(self):
+        self.buckets: Dict[str, List[int]] = defaultdict(lambda: [0] * (len(HISTOGRAM_EDGES_MS) + 1))
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.outcomes: Dict[str, Counter] = defaultdict(Counter)
+
+    def add(self, skill: str, result: SkillResult):
+        ms = result.duration * 1000
+        bucket = next((i for i, edge in enumerate(HISTOGRAM_EDGES_MS) if ms <= edge), len(HISTOGRAM_EDGES_MS))
+        self.buckets[skill][bucket] += 1
+        self.samples[skill].append(ms)
+        if result.timed_out:
+            outcome = "timeout"
+        elif result.error == "cancelled":
+            outcome = "cancelled"
+        else:
+            outcome = "ok" if result.success else "failed"
+        self.outcomes[skill][outcome] += 1
+
+    def report(self) -> str:
+        labels = [f"≤{edge}" for edge in HISTOGRAM_EDGES_MS] + [f">{HISTOGRAM_EDGES_MS[-1]}"]
+        lines = [f"{'skill':<12} {'n':>4} {'p50 ms':>8} {'p90 ms':>8}  " + " ".join(f"{label:>6}" for label in labels)]
+        for skill, samples in sorted(self.samples.items()):
+            counts = " ".join(f"{count:>6}" for count in self.buckets[skill])
+            outcomes = ", ".join(f"{k} {v}" for k, v in sorted(self.outcomes[skill].items()))
+            lines.append(
+                f"{skill:<12} {len(samples):>4} {percentile(samples, 50):>8.0f} {percentile(samples, 90):>8.0f}  "
+                f"{counts}  ({outcomes})"
+            )
+        return "\n".join(lines)
+
+
+class SkillRunner:
+    """
+    Runs skill commands on the event loop: each skill gets max_concurrency
+    slots (later commands wait for one) and its timeout, after which the
+    command is cancelled and its process killed. A skill's module is
+    imported on its first command. A command keeps running when the reply
+    that asked for it is interrupted; cancel_all() stops everything at shutdown.
+    """
+    def __init__(self, skills: SkillRegistry, default_timeout: float = 10.0):
+        self.skills = skills
+        self.default_timeout = default_timeout
+        self.slots = {name: asyncio.Semaphore(spec.max_concurrency) for name, spec in skills.skills.items()}
+        self.tasks = set()
+        self.timings = SkillTimings()
+
+    async def run(self, command: str, params: List[str]) -> SkillResult:
+        spec = self.skills.commands.get(command)
+        if spec is None:
+            logger.warning(f"Unknown command: {command}")
+            return SkillResult(command, False, error="unknown command")
+        task = asyncio.create_task(self._run(spec.skill, command, params), name=f"skill-{command}")
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        # Shielded: interrupting the reply does not undo a command the user asked for
+        return await asyncio.shield(task)
+
+    async def _run(self, skill: SkillSpec, command: str, params: List[str]) -> SkillResult:
+        timeout = skill.timeout or self.default_timeout
+        async with self.slots[skill.name]:
+            started = time.perf_counter()
+            try:
+                async with asyncio.timeout(timeout):
+                    result = await self._call(skill, command, params)
+            except TimeoutError:
+                result = SkillResult(command, False, error=f"timed out after {timeout:g}s", timed_out=True)
+            except asyncio.CancelledError:
+                self.timings.add(
+                    skill.name, SkillResult(command, False, error="cancelled", duration=time.perf_counter() - started)
+                )
+                raise
+            except Exception as e:
+                logger.error(f"{skill.name} skill error: {e}")
+                result = SkillResult(command, False, error=str(e))
+            result.duration = time.perf_counter() - started
+        self.timings.add(skill.name, result)
+        return result
+
+    async def _call(self, skill: SkillSpec, command: str, params: List[str]) -> SkillResult:
+        instance = skill.instance
+        if instance is None:
+            # First command of this skill: import it off the event loop
+            instance = await asyncio.to_thread(skill.load)
+        return await instance.execute(command, params)
+
+    async def cancel_all(self):
+        tasks = list(self.tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
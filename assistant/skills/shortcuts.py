@@ -1,32 +1,14 @@
-import subprocess
 from typing import List
-from assistant.skills.base import Skill
+from assistant.skills.base import Skill, SkillResult, run_process
 from assistant.core.logging_config import logger
 
 class ShortcutsSkill(Skill):
-    @property
-    def name(self) -> str:
-        return "Shortcuts"
-
-    @property
-    def description(self) -> str:
-        return "Runs Apple Shortcuts."
-
-    @property
-    def commands(self) -> List[str]:
-        return ["run_shortcut"]
-
-    def execute(self, command: str, params: List[str]) -> bool:
+    async def execute(self, command: str, params: List[str]) -> SkillResult:
         if not params:
-            return False
+            return SkillResult(command, False, error="no parameters")
             
         shortcut_name = " ".join(params)
         logger.info(f"Running Shortcut: {shortcut_name}")
         
-        try:
-            # shortcuts run "Name"
-            subprocess.run(["shortcuts", "run", shortcut_name], check=False)
-            return True
-        except Exception as e:
-            logger.error(f"ShortcutsSkill Error: {e}")
-            return False
+        # shortcuts run "Name"
+        return await run_process(command, "shortcuts", "run", shortcut_name)
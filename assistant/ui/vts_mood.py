@@ -1,4 +1,5 @@
 import asyncio
+import itertools
 import json
 from pathlib import Path
 from typing import Dict, Any, Optional, List
@@ -11,6 +12,8 @@ PLUGIN_DEV = "Abdullah Arda Gundogdu"
 TOKEN_FILE = Path("../../.secrets/vts_token.json")
 MOODS_FILE = Path("../../config/moods.json")
 
+_request_ids = itertools.count(1)
+
 
 def req(message_type: str, data: Optional[Dict[str, Any]] = None, request_id: str = "req") -> Dict[str, Any]:
     payload = {
@@ -25,8 +28,13 @@ def req(message_type: str, data: Optional[Dict[str, Any]] = None, request_id: st
 
 
 async def send(ws, payload: Dict[str, Any]) -> Dict[str, Any]:
+    # Give every request its own ID and skip anything that isn't its reply (e.g. events)
+    payload = dict(payload, requestID="%s-%d" % (payload["requestID"], next(_request_ids)))
     await ws.send(json.dumps(payload))
-    return json.loads(await ws.recv())
+    while True:
+        r = json.loads(await ws.recv())
+        if r.get("requestID") == payload["requestID"]:
+            return r
 
 
 def load_token() -> str:
@@ -0,0 +1,76 @@
+"""
+Intent fast-path evaluation: precision, coverage and match latency.
+
+Runs the local IntentMatcher over a labelled corpus of Turkish utterances
+(benchmarks/data/intent_corpus.jsonl). Rows with "command": null must fall
+through to the LLM; any fast-path answer on them counts as a false positive.
+
+    python -m benchmarks.bench_intents [--corpus PATH] [--threshold 0.85] [--repeat 200]
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+from assistant.brain.intents import IntentMatcher
+from assistant.skills.registry import SkillRegistry
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "data", "intent_corpus.jsonl")
+
+
+def load_corpus(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--corpus", default=DEFAULT_CORPUS)
+    ap.add_argument("--threshold", type=float, default=0.85)
+    ap.add_argument("--repeat", type=int, default=200)
+    ap.add_argument("-v", "--verbose", action="store_true", help="print every misclassified row")
+    args = ap.parse_args()
+
+    matcher = IntentMatcher.from_skills(SkillRegistry().skills.values(), threshold=args.threshold)
+    rows = load_corpus(args.corpus)
+
+    correct = wrong = missed = false_positive = 0
+    commands = sum(1 for row in rows if row["command"])
+    for row in rows:
+        match = matcher.match(row["text"])
+        expected = (row["command"], row["params"]) if row["command"] else None
+        got = (match.command, match.params) if match else None
+        if got == expected:
+            correct += expected is not None
+            continue
+        if expected is None:
+            false_positive += 1
+        elif got is None:
+            missed += 1
+        else:
+            wrong += 1
+        if args.verbose:
+            print(f"  {row['text']!r}: expected {expected}, got {got}")
+
+    answered = correct + wrong + false_positive
+    precision = correct / answered if answered else 1.0
+    coverage = correct / commands if commands else 0.0
+    print(f"{len(rows)} utterances, {commands} commands, {len(rows) - commands} for the LLM")
+    print(f"precision {precision:.1%}  coverage {coverage:.1%}  "
+          f"(correct {correct}, wrong {wrong}, missed {missed}, false positives {false_positive})")
+
+    timings = []
+    for _ in range(args.repeat):
+        for row in rows:
+            start = time.perf_counter()
+            matcher.match(row["text"])
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    p50 = statistics.median(timings) * 1e6
+    p99 = timings[int(len(timings) * 0.99) - 1] * 1e6
+    print(f"match latency p50 {p50:.1f} us  p99 {p99:.1f} us  ({len(timings)} calls)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Micro-benchmark: streaming response parsing, legacy regex loop vs ResponseParser.
+
+Feeds multi-kilobyte synthetic replies chunked at 1-5 characters (roughly how
+LLM deltas arrive) and reports time per turn and per character.
+
+    python -m benchmarks.bench_response_parser [--sizes 1024 4096 16384] [--repeat 5]
+"""
+import argparse
+import random
+import re
+import time
+
+from assistant.core.response_parser import ResponseParser, SentenceReady
+
+MOODS = ["neutral", "happy", "annoyed", "sad", "proud"]
+WORDS = (
+    "bence şöyle yap hadi bakalım tamam ama dikkat et çünkü bu iş biraz uzun "
+    "sürebilir Spotify açıyorum 3.5 saat sonra yine konuşuruz off hmm hahaha"
+).split()
+
+
+def synthetic_reply(size: int, rng: random.Random, words=(4, 14)) -> str:
+    parts = [f"[{rng.choice(MOODS)}] "]
+    length = len(parts[0])
+    while length < size:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(*words)))
+        sentence = sentence.capitalize() + rng.choice([". ", "! ", "? "])
+        if rng.random() < 0.1:
+            sentence = f"[{rng.choice(MOODS)}] " + sentence
+        parts.append(sentence)
+        length += len(sentence)
+    parts.append("[CMD: open_app, Spotify]")
+    return "".join(parts)
+
+
+def chunked(text: str, rng: random.Random):
+    i = 0
+    while i < len(text):
+        n = rng.randint(1, 5)
+        yield text[i:i + n]
+        i += n
+
+
+def legacy_parse(chunks) -> int:
+    """The per-token regex loop formerly inlined in Orchestrator.run."""
+    spoken = 0
+    full_response_buffer = ""
+    sentence_buffer = ""
+    mood_detected = False
+    for token in chunks:
+        full_response_buffer += token
+        sentence_buffer += token
+        if not mood_detected:
+            mood_match = re.search(r"^\s*\[([a-zA-Z_]+)\]", full_response_buffer)
+            if mood_match:
+                mood_detected = True
+                sentence_buffer = sentence_buffer.replace(mood_match.group(0), "", 1)
+        if re.search(r"[.!?]\s", sentence_buffer):
+            parts = re.split(r"([.!?]\s)", sentence_buffer, 1)
+            if len(parts) >= 2:
+                sentence = parts[0] + parts[1]
+                remainder = "".join(parts[2:])
+                clean_sentence = re.sub(r"\[[a-zA-Z_]+\]", "", sentence).strip()
+                if clean_sentence and "[" not in clean_sentence:
+                    spoken += 1
+                    sentence_buffer = remainder
+    re.search(r"\[CMD:.*?\]", sentence_buffer)
+    re.search(r"\s*\[CMD:\s*(\w+),\s*(.*?)\]\s*$", full_response_buffer)
+    return spoken
+
+
+def streaming_parse(chunks) -> int:
+    spoken = 0
+    parser = ResponseParser()
+    for token in chunks:
+        for event in parser.feed(token):
+            if isinstance(event, SentenceReady):
+                spoken += 1
+    for event in parser.finish():
+        if isinstance(event, SentenceReady):
+            spoken += 1
+    return spoken
+
+
+def bench(fn, chunks, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(chunks)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1024, 4096, 16384])
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    # Short sentences keep the legacy buffers small; run-on sentences expose
+    # its O(n^2) rescans of sentence_buffer.
+    scenarios = [("short sentences", (4, 14)), ("run-on sentences", (150, 400))]
+    for label, words in scenarios:
+        print(f"\n{label} (words/sentence {words[0]}-{words[1]})")
+        print(f"{'size':>7} {'chunks':>7} {'legacy ms':>10} {'parser ms':>10} {'parser us/char':>15} {'speedup':>8}")
+        for size in args.sizes:
+            text = synthetic_reply(size, rng, words)
+            chunks = list(chunked(text, rng))
+            legacy = bench(legacy_parse, chunks, args.repeat)
+            new = bench(streaming_parse, chunks, args.repeat)
+            print(
+                f"{len(text):>7} {len(chunks):>7} {legacy * 1000:>10.2f} {new * 1000:>10.2f} "
+                f"{new / len(text) * 1e6:>15.3f} {legacy / new:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
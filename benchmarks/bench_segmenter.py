@@ -0,0 +1,168 @@
+"""
+TTS chunking benchmark: time to first audio, TTS requests and playback stalls.
+
+Replays timed LLM streams through the response parser and compares:
+
+- legacy: one TTS request per sentence (the parser's SentenceReady events)
+- adaptive: SpeechSegmenter with the configured thresholds (--sweep tries a grid)
+
+Streams are recorded by running the assistant with LLM_STREAM_LOG=<file>.jsonl
+(one completion per line: {"user": ..., "deltas": [[ms_since_request, text], ...]}).
+
+    python -m benchmarks.bench_segmenter [FILE.jsonl ...] [--sweep]
+
+Without files it reads benchmarks/data/llm_streams/*.jsonl, falling back to
+built-in replies streamed with --ttft-ms/--token-ms timing. Audio is modelled
+as --tts-ttfb-ms to the first byte and SECONDS_PER_CHAR of speech per character,
+played back to back; a stall is time the speaker waits for the next chunk.
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import statistics
+
+from assistant.core.config import config
+from assistant.core.response_parser import ResponseParser, SentenceReady, TextDelta
+from assistant.core.segmenter import SpeechSegmenter
+
+# Roughly how long Turkish TTS takes to say one character
+SECONDS_PER_CHAR = 0.065
+
+REPLIES = [
+    "[neutral] Açıyorum bakalım, ne dinleyeceğiz? [CMD: open_app, Spotify]",
+    "[happy] Off, sonunda sordun! Bugün hava güzel, dışarı çıkıp biraz yürü bence. Hem kafan dağılır hem de "
+    "bana sonra anlatırsın. Ama ceketini al, akşam serinliyor.",
+    "[annoyed] Bunu sana üç kere anlattım ama neyse, bir kere daha. Kara delikler, kütlesi çok büyük yıldızlar "
+    "çöktüğünde oluşuyor ve çekimleri o kadar güçlü ki ışık bile kaçamıyor. En yakını bile binlerce ışık yılı "
+    "uzakta, yani korkmana gerek yok. Başka?",
+    "[neutral] Saat 14.30'da toplantın var, 15. kattaki salonda. Dr. Ayşe de gelecekmiş.",
+    "[sad] Hmm... Bilmiyorum ki. Belki yarın daha iyi hissedersin. Bence erken yat.",
+    "[happy] Hahaha, tamam tamam! Sesi %50 yapıyorum. [CMD: set_volume, 50]",
+    "[neutral] Bence akşam hafif bir şeyler ye, mesela mercimek çorbası ya da ızgara tavuk, yanına da salata. "
+    "Çok ağır yemek yersen uyuyamazsın çünkü. Bir de su içmeyi unutma.",
+    "[annoyed] Tamam. Peki. Anladım. Kapatıyorum. [CMD: close_app, Safari]",
+    "[neutral] youtube.com adresini açıyorum, oradan bakarsın. [CMD: open_url, youtube.com]",
+    "[happy] Evet! Yaptım işte, bak ne güzel oldu, değil mi? Bir dahakine de bana sor, ben hallederim. "
+    "Gerçi bazen tembellik ediyorum ama olsun.",
+]
+
+_TOKEN = re.compile(r"\s*(?:\w{1,4}|[^\w\s])")
+
+
+def synthetic_streams(ttft_ms: float, token_ms: float):
+    for reply in REPLIES:
+        tokens = _TOKEN.findall(reply)
+        yield [(ttft_ms + i * token_ms, token) for i, token in enumerate(tokens)]
+
+
+def load_streams(paths):
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield [tuple(delta) for delta in json.loads(line)["deltas"]]
+
+
+def legacy_chunks(stream):
+    parser = ResponseParser()
+    chunks = []
+    for at, text in stream:
+        chunks += [(at, e.text) for e in parser.feed(text) if isinstance(e, SentenceReady)]
+    end = stream[-1][0] if stream else 0.0
+    return chunks + [(end, e.text) for e in parser.finish() if isinstance(e, SentenceReady)]
+
+
+def adaptive_chunks(stream, first_min: int, target: int, max_chars: int):
+    parser = ResponseParser()
+    segmenter = SpeechSegmenter(first_min_chars=first_min, target_chars=target, max_chars=max_chars)
+    chunks = []
+
+    def route(at, events):
+        for e in events:
+            if isinstance(e, TextDelta):
+                chunks.extend((at, chunk) for chunk in segmenter.feed(e.text))
+
+    for at, text in stream:
+        route(at, parser.feed(text))
+    end = stream[-1][0] if stream else 0.0
+    route(end, parser.finish())
+    return chunks + [(end, chunk) for chunk in segmenter.finish()]
+
+
+def play(chunks, ttfb_ms: float):
+    """
+    (first audio ms, total stall ms) with chunks requested as they are cut and played in order.
+    """
+    first, stall, playing_until = None, 0.0, None
+    for at, text in chunks:
+        start = at + ttfb_ms
+        if playing_until is not None:
+            stall += max(0.0, start - playing_until)
+            start = max(start, playing_until)
+        first = start if first is None else first
+        playing_until = start + len(text) * SECONDS_PER_CHAR * 1000
+    return first, stall
+
+
+def evaluate(streams, chunker, ttfb_ms: float) -> dict:
+    firsts, stalls, requests, longest = [], [], [], 0
+    for stream in streams:
+        chunks = chunker(stream)
+        if not chunks:
+            continue
+        first, stall = play(chunks, ttfb_ms)
+        firsts.append(first)
+        stalls.append(stall)
+        requests.append(len(chunks))
+        longest = max(longest, max(len(text) for _, text in chunks))
+    ordered = sorted(firsts)
+    return {
+        "p50": statistics.median(firsts),
+        "p90": ordered[int(0.9 * (len(ordered) - 1))],
+        "requests": statistics.mean(requests),
+        "stall": statistics.mean(stalls),
+        "longest": longest,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("files", nargs="*")
+    ap.add_argument("--sweep", action="store_true", help="try a grid of first-chunk and target sizes")
+    ap.add_argument("--tts-ttfb-ms", type=float, default=250)
+    ap.add_argument("--ttft-ms", type=float, default=350, help="built-in replies: time to first token")
+    ap.add_argument("--token-ms", type=float, default=25, help="built-in replies: time per token")
+    args = ap.parse_args()
+
+    paths = args.files or sorted(glob.glob(os.path.join(os.path.dirname(__file__), "data", "llm_streams", "*.jsonl")))
+    if paths:
+        streams = [s for s in load_streams(paths) if s]
+        source = f"{len(streams)} recorded streams from {len(paths)} files"
+    else:
+        streams = list(synthetic_streams(args.ttft_ms, args.token_ms))
+        source = f"{len(streams)} built-in replies ({args.ttft_ms:.0f} ms TTFT, {args.token_ms:.0f} ms/token)"
+    print(f"{source}, TTS first byte {args.tts_ttfb_ms:.0f} ms")
+
+    variants = [("legacy", legacy_chunks)]
+    grid = [(config.SEGMENT_FIRST_MIN_CHARS, config.SEGMENT_TARGET_CHARS)]
+    if args.sweep:
+        grid = [(f, t) for f in (20, 30, 45, 60) for t in (60, 120, 180)]
+    for first_min, target in grid:
+        variants.append((
+            f"adaptive {first_min}/{target}",
+            lambda s, f=first_min, t=target: adaptive_chunks(s, f, t, config.SEGMENT_MAX_CHARS),
+        ))
+
+    print(f"{'chunker':<18} {'first audio p50':>15} {'p90':>7} {'requests/reply':>15} {'stall ms/reply':>15} {'longest':>8}")
+    for name, chunker in variants:
+        r = evaluate(streams, chunker, args.tts_ttfb_ms)
+        print(
+            f"{name:<18} {r['p50']:>15.0f} {r['p90']:>7.0f} {r['requests']:>15.2f} "
+            f"{r['stall']:>15.0f} {r['longest']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
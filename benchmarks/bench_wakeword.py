@@ -0,0 +1,152 @@
+"""
+Standby wake word benchmark: CPU and detection latency, before/after.
+
+Replays recorded audio through two detectors, as fast as possible:
+
+- legacy: the old loop (fresh KaldiRecognizer per standby period, 4096-frame
+  reads, every partial result parsed, no gate)
+- engine: the resident WakeWordEngine (VAD gate, WAKE_HOP_MS hops, parse on change)
+
+Each `<name>.wav` (16 kHz mono 16-bit) needs a `<name>.json` labelling where
+the wake phrase ends: {"wake": [[start_s, end_s], ...]}. A detection within
+2 s after a label's end is a hit; its latency is detection time minus the end.
+
+    python -m benchmarks.bench_wakeword benchmarks/data/wake [--model assistant/input/model]
+    python -m benchmarks.bench_wakeword --silence 120        # quiet-room standby CPU only
+
+CPU % is thread CPU time per second of audio, i.e. the share of one core the
+detector needs to keep up in real time.
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import statistics
+import time
+import wave
+from array import array
+
+from vosk import KaldiRecognizer, Model, SetLogLevel
+
+from assistant.core.config import config
+from assistant.input.wakeword import WAKE_KEYWORDS, WakeWordEngine
+
+RATE = 16000
+# Detections later than this after a label's end count as false alarms
+MATCH_WINDOW_S = 2.0
+
+
+class LegacyDetector:
+    """
+    The pre-engine standby loop, kept here for comparison.
+    """
+    def __init__(self, model, keywords):
+        self.model = model
+        self.keywords = keywords
+        self.hop_bytes = 4096 * 2
+        self.reset()
+
+    def reset(self):
+        self.stats = {"parses": 0}
+        grammar = json.dumps(self.keywords + ["[unk]"])
+        self.recognizer = KaldiRecognizer(self.model, RATE, grammar)
+
+    def process(self, data):
+        self.stats["parses"] += 1
+        if self.recognizer.AcceptWaveform(data):
+            text = json.loads(self.recognizer.Result()).get("text", "")
+        else:
+            text = json.loads(self.recognizer.PartialResult()).get("partial", "")
+        return next((k for k in self.keywords if k in text), None)
+
+
+def load(path: str):
+    with wave.open(path, "rb") as w:
+        if w.getframerate() != RATE or w.getnchannels() != 1 or w.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected 16 kHz mono 16-bit PCM")
+        pcm = w.readframes(w.getnframes())
+    with open(os.path.splitext(path)[0] + ".json") as f:
+        return pcm, json.load(f)["wake"]
+
+
+def room_noise(seconds: float, level: float = 30.0) -> bytes:
+    rng = random.Random(7)
+    return array("h", (int(rng.gauss(0, level)) for _ in range(int(seconds * RATE)))).tobytes()
+
+
+def run(detector, files) -> dict:
+    hits, false_alarms, latencies, parses = 0, 0, [], 0
+    labels_total = 0
+    audio_seconds = 0.0
+    cpu = 0.0
+    for pcm, labels in files:
+        detector.reset()
+        labels_total += len(labels)
+        pending = sorted(labels)
+        started = time.thread_time()
+        for offset in range(0, len(pcm) - detector.hop_bytes + 1, detector.hop_bytes):
+            if not detector.process(pcm[offset:offset + detector.hop_bytes]):
+                continue
+            at = (offset + detector.hop_bytes) / (RATE * 2)
+            match = next((l for l in pending if l[0] <= at <= l[1] + MATCH_WINDOW_S), None)
+            if match:
+                pending.remove(match)
+                hits += 1
+                latencies.append((at - match[1]) * 1000)
+            else:
+                false_alarms += 1
+            # The assistant would go active here; standby restarts afterwards
+            parses += detector.stats["parses"]
+            detector.reset()
+        cpu += time.thread_time() - started
+        parses += detector.stats["parses"]
+        audio_seconds += len(pcm) / (RATE * 2)
+
+    return {
+        "cpu": 100 * cpu / audio_seconds if audio_seconds else 0.0,
+        "hits": hits,
+        "missed": labels_total - hits,
+        "false": false_alarms,
+        "p50": statistics.median(latencies) if latencies else float("nan"),
+        "p90": sorted(latencies)[int(0.9 * (len(latencies) - 1))] if latencies else float("nan"),
+        "parses": parses,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("directory", nargs="?", default=os.path.join(os.path.dirname(__file__), "data", "wake"))
+    ap.add_argument("--model", default="assistant/input/model")
+    ap.add_argument("--silence", type=float, metavar="SECONDS", help="measure a quiet room instead of recordings")
+    args = ap.parse_args()
+
+    SetLogLevel(-1)
+    model = Model(args.model)
+    if args.silence:
+        files = [(room_noise(args.silence), [])]
+    else:
+        paths = sorted(glob.glob(os.path.join(args.directory, "*.wav")))
+        if not paths:
+            ap.error(f"no WAV files in {args.directory}")
+        files = [load(path) for path in paths]
+
+    total = sum(len(pcm) for pcm, _ in files) / (RATE * 2)
+    print(f"{len(files)} files, {total:.0f}s of audio, {sum(len(l) for _, l in files)} wake phrases")
+    print(f"{'detector':<10} {'CPU %':>6} {'hits':>5} {'missed':>6} {'false':>5} {'p50 ms':>7} {'p90 ms':>7} {'parses':>7}")
+    detectors = {
+        "legacy": LegacyDetector(model, WAKE_KEYWORDS),
+        "engine": WakeWordEngine(
+            model, WAKE_KEYWORDS, hop_ms=config.WAKE_HOP_MS, gate_margin_db=config.WAKE_GATE_MARGIN_DB
+        ),
+    }
+    for name, detector in detectors.items():
+        r = run(detector, files)
+        print(
+            f"{name:<10} {r['cpu']:>6.1f} {r['hits']:>5} {r['missed']:>6} {r['false']:>5} "
+            f"{r['p50']:>7.0f} {r['p90']:>7.0f} {r['parses']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Virtual microphone for the e2e harness: feeds recorded (or synthetic) speech
+into the shared capture ring in real time, in place of the PyAudio stream.
+"""
+import math
+import queue
+import random
+import threading
+import time
+import wave
+from array import array
+from typing import Callable, Optional
+
+from benchmarks.e2e.fakes import FRAME_BYTES, RATE, SPEECH_DB, level_db
+
+
+def load_wav(path: str) -> bytes:
+    with wave.open(path, "rb") as w:
+        if w.getframerate() != RATE or w.getnchannels() != 1 or w.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected 16 kHz mono 16-bit PCM")
+        return w.readframes(w.getnframes())
+
+
+def synthetic_utterance(seconds: float, seed: int = 0, level: float = 3000.0) -> bytes:
+    """
+    Speech-like PCM: voiced syllables (harmonic stacks) in words separated by short pauses.
+    """
+    rng = random.Random(seed)
+    out = array("h")
+    while len(out) < seconds * RATE:
+        for _ in range(rng.randint(1, 3)):
+            f0 = rng.uniform(110, 250)
+            n = int(0.18 * RATE)
+            phases = [rng.uniform(0, 6) for _ in range(8)]
+            for i in range(n):
+                t = i / RATE
+                envelope = math.sin(math.pi * i / n) ** 0.7
+                value = sum(math.sin(2 * math.pi * f0 * k * t + phases[k - 1]) / k for k in range(1, 9))
+                out.append(int(max(-32767, min(32767, level * envelope * value / 2))))
+        out.extend([0] * int(rng.uniform(0.05, 0.15) * RATE))
+    return out.tobytes()
+
+
+def speech_end_offset(pcm: bytes) -> int:
+    """
+    Byte offset just after the last frame loud enough to be speech.
+    """
+    last = 0
+    for offset in range(0, len(pcm) - FRAME_BYTES + 1, FRAME_BYTES):
+        if level_db(pcm[offset:offset + FRAME_BYTES]) > SPEECH_DB:
+            last = offset + FRAME_BYTES
+    return last
+
+
+class VirtualMicrophone:
+    """
+    Stands in for the PyAudio input stream of AudioCapture: a thread writes one
+    device block per block period, background noise unless an utterance is
+    queued with say(). attach() installs it, capture.stop() stops it.
+    """
+    def __init__(self, frames_per_buffer: int, noise: float = 25.0, seed: int = 1):
+        self.block_bytes = frames_per_buffer * 2
+        self.block_seconds = frames_per_buffer / RATE
+        self.noise = noise
+        self.rng = random.Random(seed)
+        self.utterances = queue.Queue()
+        self.running = False
+        self.ring = None
+        self.thread = None
+
+    def attach(self, capture):
+        with capture.lock:
+            capture.stream = self
+        self.ring = capture.ring
+        self.start_stream()
+
+    def say(self, pcm: bytes, on_speech_end: Optional[Callable[[float], None]] = None):
+        """
+        Queues an utterance. on_speech_end gets the perf_counter time at which
+        its last speech frame was written.
+        """
+        self.utterances.put((pcm, speech_end_offset(pcm), on_speech_end))
+
+    def noise_pcm(self, seconds: float) -> bytes:
+        """
+        Room noise like the microphone's idle signal (lead-in for an utterance).
+        """
+        return array("h", (int(self.rng.gauss(0, self.noise)) for _ in range(int(seconds * RATE)))).tobytes()
+
+    def _noise_block(self) -> bytes:
+        return self.noise_pcm(self.block_seconds)
+
+    def _run(self):
+        current, end, callback, pos = None, 0, None, 0
+        next_at = time.perf_counter()
+        while self.running:
+            if current is None:
+                try:
+                    current, end, callback = self.utterances.get_nowait()
+                    pos = 0
+                except queue.Empty:
+                    pass
+            if current is not None:
+                block = current[pos:pos + self.block_bytes]
+                block += bytes(self.block_bytes - len(block))
+                pos += self.block_bytes
+                self.ring.write(block)
+                if callback is not None and pos >= end:
+                    callback(time.perf_counter())
+                    callback = None
+                if pos >= len(current):
+                    current = None
+            else:
+                self.ring.write(self._noise_block())
+
+            next_at += self.block_seconds
+            time.sleep(max(0.0, next_at - time.perf_counter()))
+
+    # PyAudio stream interface used by AudioCapture
+    def start_stream(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="virtual-mic", daemon=True)
+        self.thread.start()
+
+    def stop_stream(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1)
+
+    def close(self):
+        self.stop_stream()
+
+    def is_active(self) -> bool:
+        return self.running
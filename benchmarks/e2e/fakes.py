@@ -0,0 +1,413 @@
+"""
+Local stand-ins for the services a turn talks to, for the offline e2e harness:
+
+- FakeDeepgram: the live-transcription WebSocket protocol. It watches the
+  energy of the audio it receives and answers each utterance with the next
+  scripted transcript (interims while speech arrives, a final on Finalize or
+  after its own endpointing silence).
+- FakeVTS: enough of the VTube Studio public API for auth, hotkeys and events.
+- FakeHTTP: OpenAI chat completions (SSE) with scripted replies and token
+  timing, plus OpenAI and ElevenLabs TTS endpoints streaming silent audio
+  (raw PCM when asked for it, as the assistant does, otherwise fake MP3).
+
+All of them run in one background thread (own event loop), so their work
+does not share the event loop being measured.
+"""
+import asyncio
+import json
+import math
+import re
+import threading
+import time
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import websockets
+from websockets.asyncio.server import serve
+
+_CMD_TAG = re.compile(r"\s*\[CMD:\s*(\w+)\s*,\s*([^\]]*)\]")
+
+# 128 kbps MP3, and the 24 kHz 16-bit mono PCM the assistant asks for
+MP3_BYTES_PER_SECOND = 16000
+PCM_BYTES_PER_SECOND = 48000
+# Spoken audio per character of reply text
+SECONDS_PER_CHAR = 0.065
+
+RATE = 16000
+FRAME_BYTES = RATE * 2 // 50  # 20 ms
+SPEECH_DB = 50.0
+
+
+def level_db(frame: bytes) -> float:
+    samples = array("h", frame[:len(frame) - len(frame) % 2])
+    if not samples:
+        return 0.0
+    return 10 * math.log10(sum(s * s for s in samples) / len(samples) + 1.0)
+
+
+def fake_mp3(seconds: float) -> bytes:
+    """
+    Bytes shaped like a 128 kbps MP3 of the given length. Only the length
+    matters; nothing in the harness decodes it.
+    """
+    frame = b"\xff\xfb\x90\x64" + bytes(413)
+    count = max(1, int(seconds * MP3_BYTES_PER_SECOND) // len(frame))
+    return frame * count
+
+
+class FakeDeepgram:
+    """
+    Deepgram live API stand-in. transcripts[i] answers the i-th utterance heard,
+    across reconnects.
+    """
+    def __init__(self, transcripts: List[str], finalize_ms: float = 150, interim_ms: float = 300):
+        self.transcripts = transcripts
+        self.finalize_ms = finalize_ms
+        self.interim_ms = interim_ms
+        self.cursor = 0
+        self.connections = 0
+        self.finalizes = 0
+        self.audio_bytes = 0
+
+    async def handler(self, ws):
+        self.connections += 1
+        query = parse_qs(urlparse(ws.request.path).query)
+        endpointing_ms = float(query.get("endpointing", ["600"])[0])
+        state = {"received": 0, "speech": 0, "silence": 0, "interims": 0, "partial": b""}
+
+        async def final(from_finalize: bool):
+            await asyncio.sleep(self.finalize_ms / 1000)
+            heard = state["speech"] > 0
+            text = ""
+            if heard and self.cursor < len(self.transcripts):
+                text = self.transcripts[self.cursor]
+                self.cursor += 1
+            await ws.send(json.dumps({
+                "type": "Results",
+                "is_final": True,
+                "speech_final": not from_finalize,
+                "from_finalize": from_finalize,
+                "start": 0.0,
+                "duration": state["received"] / (RATE * 2),
+                "channel": {"alternatives": [{"transcript": text}]},
+            }))
+            state.update(speech=0, silence=0, interims=0)
+
+        async for message in ws:
+            if isinstance(message, str):
+                kind = json.loads(message).get("type")
+                if kind == "Finalize":
+                    self.finalizes += 1
+                    await final(from_finalize=True)
+                elif kind == "CloseStream":
+                    await ws.close()
+                    return
+                continue
+
+            self.audio_bytes += len(message)
+            state["received"] += len(message)
+            data = state["partial"] + message
+            whole = len(data) - len(data) % FRAME_BYTES
+            state["partial"] = data[whole:]
+            for offset in range(0, whole, FRAME_BYTES):
+                if level_db(data[offset:offset + FRAME_BYTES]) > SPEECH_DB:
+                    state["speech"] += 1
+                    state["silence"] = 0
+                elif state["speech"]:
+                    state["silence"] += 1
+
+            if not state["speech"] or self.cursor >= len(self.transcripts):
+                continue
+            if state["silence"] * 20 >= endpointing_ms:
+                # Our own endpointing (when the client does not send Finalize)
+                await final(from_finalize=False)
+                continue
+            # One more word per interim interval of speech
+            due = int(state["speech"] * 20 // self.interim_ms)
+            if due > state["interims"]:
+                state["interims"] = due
+                words = self.transcripts[self.cursor].split()
+                await ws.send(json.dumps({
+                    "type": "Results",
+                    "is_final": False,
+                    "channel": {"alternatives": [{"transcript": " ".join(words[:min(due, len(words))])}]},
+                }))
+
+
+class FakeVTS:
+    """
+    VTube Studio public API stand-in: authenticates anyone, lists the mood
+    hotkeys, counts lip-sync parameter injects, and answers every other
+    request after latency_ms.
+    """
+    def __init__(self, hotkeys: List[str], latency_ms: float = 5):
+        self.hotkeys = hotkeys
+        self.latency_ms = latency_ms
+        self.triggered: List[str] = []
+        self.injected = 0
+
+    def _respond(self, request: dict) -> dict:
+        kind = request.get("messageType", "")
+        data: Dict[str, object] = {}
+        if kind == "AuthenticationRequest":
+            data = {"authenticated": True, "reason": "fake"}
+        elif kind == "AuthenticationTokenRequest":
+            data = {"authenticationToken": "fake-token"}
+        elif kind == "HotkeysInCurrentModelRequest":
+            data = {
+                "modelID": "fake-model",
+                "modelName": "Fake",
+                "availableHotkeys": [{"name": name, "hotkeyID": f"hk-{name}"} for name in self.hotkeys],
+            }
+        elif kind == "HotkeyTriggerRequest":
+            hotkey = request.get("data", {}).get("hotkeyID", "")
+            self.triggered.append(hotkey)
+            data = {"hotkeyID": hotkey}
+        elif kind == "InjectParameterDataRequest":
+            self.injected += 1
+        return {
+            "apiName": "VTubeStudioPublicAPI",
+            "apiVersion": "1.0",
+            "requestID": request.get("requestID"),
+            "messageType": kind.replace("Request", "Response"),
+            "data": data,
+        }
+
+    async def handler(self, ws):
+        async for raw in ws:
+            request = json.loads(raw)
+            if self.latency_ms:
+                await asyncio.sleep(self.latency_ms / 1000)
+            try:
+                await ws.send(json.dumps(self._respond(request)))
+            except websockets.ConnectionClosed:
+                # The client hung up with a request (e.g. a lip-sync inject) in flight
+                return
+
+
+class FakeHTTP(ThreadingHTTPServer):
+    """
+    OpenAI (chat completions + speech) and ElevenLabs (text-to-speech stream) stand-in.
+    replies maps a user message to its scripted assistant reply.
+    """
+    daemon_threads = True
+
+    def __init__(
+        self,
+        replies: Dict[str, str],
+        ttft_ms: float = 350,
+        token_ms: float = 25,
+        tts_ttfb_ms: float = 200,
+        tts_realtime_factor: float = 4.0,
+    ):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.replies = replies
+        self.ttft_ms = ttft_ms
+        self.token_ms = token_ms
+        self.tts_ttfb_ms = tts_ttfb_ms
+        self.tts_realtime_factor = tts_realtime_factor
+        self.chat_requests = 0
+        self.tts_requests = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def reply_for(self, messages: list) -> str:
+        user = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        return self.replies.get(user.strip(), "[neutral] Anlamadım ama olsun.")
+
+
+def tokens(text: str) -> List[str]:
+    """
+    Splits a reply roughly like a BPE tokenizer would stream it (word pieces with leading spaces).
+    """
+    out = []
+    for i, word in enumerate(text.split(" ")):
+        piece = word if i == 0 else " " + word
+        out.extend(piece[j:j + 4] for j in range(0, len(piece), 4))
+    return out
+
+
+def chat_deltas(reply: str, tools: bool = False) -> List[dict]:
+    """
+    Streamed deltas for a reply. With tools, each "[CMD: name, param]" tag
+    becomes a tool call whose JSON arguments arrive in a few fragments.
+    """
+    if not tools:
+        return [{"content": token} for token in tokens(reply)]
+    deltas = []
+    calls = 0
+    for i, part in enumerate(_CMD_TAG.split(reply)):
+        if i % 3 == 0:
+            deltas.extend({"content": token} for token in tokens(part) if token)
+        elif i % 3 == 1:
+            name = part
+        else:
+            arguments = json.dumps({"param": part.strip()}, ensure_ascii=False)
+            fragments = [arguments[j:j + 8] for j in range(0, len(arguments), 8)]
+            deltas.append({"tool_calls": [{
+                "index": calls, "id": f"call_{calls}", "type": "function",
+                "function": {"name": name, "arguments": ""},
+            }]})
+            deltas.extend({"tool_calls": [{"index": calls, "function": {"arguments": f}}]} for f in fragments)
+            calls += 1
+    return deltas
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: FakeHTTP
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _start_chunked(self, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_chunked(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self._body()
+        query = parse_qs(urlparse(self.path).query)
+        try:
+            if path.endswith("/chat/completions"):
+                self._chat(body)
+            elif path.endswith("/audio/speech"):
+                self._speech(body.get("input", ""), pcm=body.get("response_format") == "pcm")
+            elif "/text-to-speech/" in path:
+                self._speech(body.get("text", ""), pcm=query.get("output_format", [""])[0].startswith("pcm"))
+            else:
+                self.send_error(404)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client closed the stream early (barge-in, discarded speculation)
+            self.close_connection = True
+
+    def _chat(self, body: dict):
+        server = self.server
+        server.chat_requests += 1
+        reply = server.reply_for(body.get("messages", []))
+        base = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": body.get("model", "")}
+        usage = {"prompt_tokens": sum(len(str(m.get("content", ""))) // 4 for m in body.get("messages", [])),
+                 "completion_tokens": len(tokens(reply))}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        if not body.get("stream"):
+            payload = json.dumps({
+                **base, "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": usage,
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        self._start_chunked("text/event-stream")
+        time.sleep(server.ttft_ms / 1000)
+        for i, delta in enumerate(chat_deltas(reply, tools=bool(body.get("tools")))):
+            if i:
+                time.sleep(server.token_ms / 1000)
+            else:
+                delta = {"role": "assistant", **delta}
+            chunk = {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+            self._chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+        done = {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        self._chunk(f"data: {json.dumps(done)}\n\n".encode())
+        self._chunk(f"data: {json.dumps({**base, 'choices': [], 'usage': usage})}\n\n".encode())
+        self._chunk(b"data: [DONE]\n\n")
+        self._end_chunked()
+
+    def _speech(self, text: str, pcm: bool):
+        server = self.server
+        server.tts_requests += 1
+        seconds = max(0.4, len(text) * SECONDS_PER_CHAR)
+        if pcm:
+            audio, rate = bytes(int(seconds * PCM_BYTES_PER_SECOND) & ~1), PCM_BYTES_PER_SECOND
+            self._start_chunked("audio/pcm")
+        else:
+            audio, rate = fake_mp3(seconds), MP3_BYTES_PER_SECOND
+            self._start_chunked("audio/mpeg")
+        time.sleep(server.tts_ttfb_ms / 1000)
+        # Generated faster than real time, like the real providers
+        step = 4096
+        pause = step / rate / server.tts_realtime_factor
+        try:
+            for offset in range(0, len(audio), step):
+                if offset:
+                    time.sleep(pause)
+                self._chunk(audio[offset:offset + step])
+            self._end_chunked()
+        except (BrokenPipeError, ConnectionResetError):
+            # Client hung up (barge-in)
+            pass
+
+
+class FakeServers:
+    """
+    Starts the fakes on free localhost ports in a background thread.
+    env() gives the environment that points the assistant at them.
+    """
+    def __init__(self, deepgram: FakeDeepgram, vts: FakeVTS, http: FakeHTTP):
+        self.deepgram = deepgram
+        self.vts = vts
+        self.http = http
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.ports: Dict[str, int] = {}
+        self._ready = threading.Event()
+        self._stop: Optional[asyncio.Event] = None
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        http_thread = threading.Thread(target=self.http.serve_forever, name="fake-http", daemon=True)
+        ws_thread = threading.Thread(target=lambda: asyncio.run(self._serve()), name="fake-ws", daemon=True)
+        self._threads = [http_thread, ws_thread]
+        for thread in self._threads:
+            thread.start()
+        if not self._ready.wait(5):
+            raise RuntimeError("fake servers did not start")
+
+    async def _serve(self):
+        self.loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        async with serve(self.deepgram.handler, "127.0.0.1", 0) as dg, serve(self.vts.handler, "127.0.0.1", 0) as vts:
+            self.ports["deepgram"] = dg.sockets[0].getsockname()[1]
+            self.ports["vts"] = vts.sockets[0].getsockname()[1]
+            self._ready.set()
+            await self._stop.wait()
+
+    def env(self) -> Dict[str, str]:
+        return {
+            "DEEPGRAM_API_KEY": "fake",
+            "DEEPGRAM_URL": f"ws://127.0.0.1:{self.ports['deepgram']}/v1/listen",
+            "VTS_URL": f"ws://127.0.0.1:{self.ports['vts']}",
+            "OPENAI_API_KEY": "fake",
+            "OPENAI_BASE_URL": f"{self.http.url}/v1",
+            "ELEVENLABS_BASE_URL": self.http.url,
+        }
+
+    def stop(self):
+        self.http.shutdown()
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._stop.set)
+        for thread in self._threads:
+            thread.join(timeout=2)
+
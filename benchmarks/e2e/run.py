@@ -0,0 +1,285 @@
+"""
+Offline end-to-end benchmark: runs the real Orchestrator against local fakes
+of Deepgram, OpenAI (chat + TTS), ElevenLabs and VTube Studio, with recorded
+or synthetic speech fed through a virtual microphone.
+
+    python -m benchmarks.e2e.run                         # default scenario, report only
+    python -m benchmarks.e2e.run --repeat 4 --check      # fail (exit 1) on regression vs baseline
+    python -m benchmarks.e2e.run --repeat 4 --update-baseline
+
+A scenario (benchmarks/e2e/scenarios/*.json) lists turns: what the user says
+("audio": a 16 kHz mono WAV relative to the scenario, or "speech_seconds" of
+synthetic speech), what Deepgram transcribes ("transcript") and what the LLM
+answers ("reply"; omitted for intent fast-path commands), the commands the
+turn must dispatch ("commands", optional), plus fake service timings. The
+session starts in active mode, unless the first turn sets "wake": then a fake
+wake word detection fires first and the turn is heard through the wake replay.
+
+Latencies come from the per-turn trace (assistant.core.tracing); the harness
+adds user_speech_end, when the last speech frame entered the microphone.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.e2e.audio import VirtualMicrophone, load_wav, synthetic_utterance
+from benchmarks.e2e.fakes import FakeDeepgram, FakeHTTP, FakeServers, FakeVTS
+
+HERE = os.path.dirname(__file__)
+DEFAULT_SCENARIO = os.path.join(HERE, "scenarios", "default.json")
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+
+# Harness-only segments, on top of assistant.core.tracing.SEGMENTS
+E2E_SEGMENTS = {
+    "user_to_final": ("user_speech_end", "stt_final"),
+    "user_to_audio": ("user_speech_end", "playback_start"),
+}
+# Compared against the baseline by --check
+CHECKED = ["user_to_audio", "user_to_final", "final_to_audio", "tts_first_byte", "llm_first_token"]
+# Upper bound for one turn (speech + reply) before the run is declared stuck
+TURN_TIMEOUT_SECONDS = 30
+
+
+def load_scenario(path: str, repeat: int) -> dict:
+    with open(path, encoding="utf-8") as f:
+        scenario = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    turns = []
+    for n in range(repeat):
+        for i, turn in enumerate(scenario["turns"]):
+            if "audio" in turn:
+                pcm = load_wav(os.path.join(base, turn["audio"]))
+            else:
+                pcm = synthetic_utterance(turn.get("speech_seconds", 1.0), seed=n * 100 + i)
+            turns.append({**turn, "pcm": pcm})
+    scenario["turns"] = turns
+    return scenario
+
+
+def start_fakes(scenario: dict) -> FakeServers:
+    moods_path = os.path.join(HERE, "..", "..", "config", "moods.json")
+    with open(moods_path, encoding="utf-8") as f:
+        hotkeys = list(json.load(f).values())
+    stt, llm, tts, vts = (scenario.get(k, {}) for k in ("stt", "llm", "tts", "vts"))
+    servers = FakeServers(
+        FakeDeepgram(
+            [t["transcript"] for t in scenario["turns"]],
+            finalize_ms=stt.get("finalize_ms", 150),
+            interim_ms=stt.get("interim_ms", 300),
+        ),
+        FakeVTS(hotkeys, latency_ms=vts.get("latency_ms", 5)),
+        FakeHTTP(
+            {t["transcript"]: t["reply"] for t in scenario["turns"] if "reply" in t},
+            ttft_ms=llm.get("ttft_ms", 350),
+            token_ms=llm.get("token_ms", 25),
+            tts_ttfb_ms=tts.get("ttfb_ms", 200),
+            tts_realtime_factor=tts.get("realtime_factor", 4),
+        ),
+    )
+    servers.start()
+    return servers
+
+
+def run_session(scenario: dict, lead_seconds: float) -> dict:
+    """
+    Drives one Orchestrator session through every turn. Imports the assistant
+    here, after the environment points it at the fakes.
+    """
+    from assistant.brain.llm import brain
+    from assistant.core.config import config
+    from assistant.core.orchestrator import orchestrator
+    from assistant.core.tracing import tracer
+    from assistant.input.capture import capture
+    from assistant.input.stt import stt
+    from assistant.input.vosk_stt import vosk_stt
+    from assistant.skills.base import SkillResult
+    from assistant.skills.runner import SkillRunner
+
+    mic = VirtualMicrophone(config.CAPTURE_FRAMES_PER_BUFFER)
+    mic.attach(capture)
+
+    commands = []
+    orchestrator.is_active = not scenario["turns"][0].get("wake")
+    # No desktop side effects: window management, sounds and commands are recorded only
+    orchestrator.bring_vts_to_front = lambda: None
+    orchestrator.hide_vts = lambda: None
+    orchestrator.play_startup_sound = lambda: None
+    orchestrator.play_goodbye_sound = lambda: None
+
+    async def record_command(runner, skill, cmd, params):
+        commands.append((cmd, params))
+        return SkillResult(cmd, True)
+
+    SkillRunner._call = record_command
+
+    def fake_wakeword(keywords, timeout=None):
+        # Detected just as the user starts speaking; the turn's audio follows
+        vosk_stt.detected_at = capture.position
+        return True
+
+    vosk_stt.listen_for_wakeword = fake_wakeword
+
+    pending = list(scenario["turns"])
+    listen = stt.listen
+    stats = {"listens": 0}
+
+    async def scripted_listen(*args, **kwargs):
+        stats["listens"] += 1
+        if not pending:
+            orchestrator.running = False
+            return ""
+        turn = pending.pop(0)
+        lead = mic.noise_pcm(lead_seconds)
+        mic.say(lead + turn["pcm"], on_speech_end=lambda at: tracer.mark("user_speech_end", at=at))
+        return await listen(*args, **kwargs)
+
+    stt.listen = scripted_listen
+
+    async def session():
+        await asyncio.wait_for(orchestrator.run(), TURN_TIMEOUT_SECONDS * len(scenario["turns"]))
+
+    started = time.perf_counter()
+    asyncio.run(session())
+    return {
+        "seconds": time.perf_counter() - started,
+        "listens": stats["listens"],
+        "commands": commands,
+        "speculation": dict(brain.speculation_stats),
+        "lipsync": orchestrator.lipsync.summary() if orchestrator.lipsync else None,
+        "trace_file": str(config.TRACE_FILE),
+    }
+
+
+def report(samples: dict, names: list):
+    from assistant.core.tracing import percentile
+
+    print(f"{'segment':<24} {'n':>4} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+    results = {}
+    for name in names:
+        values = samples.get(name)
+        if not values:
+            continue
+        results[name] = {p: round(percentile(values, int(p[1:])), 1) for p in ("p50", "p90", "p99")}
+        print(
+            f"{name:<24} {len(values):>4} {results[name]['p50']:>8.0f} "
+            f"{results[name]['p90']:>8.0f} {results[name]['p99']:>8.0f}"
+        )
+    return results
+
+
+def check(results: dict, baseline: dict, tolerance: float, slack_ms: float) -> list:
+    """
+    Metrics whose p50 or p90 got worse than baseline * (1 + tolerance) + slack_ms.
+    """
+    regressions = []
+    for name, base in baseline.get("metrics", {}).items():
+        if name not in results:
+            regressions.append(f"{name}: missing from this run")
+            continue
+        for p in ("p50", "p90"):
+            limit = base[p] * (1 + tolerance) + slack_ms
+            if results[name][p] > limit:
+                regressions.append(f"{name} {p}: {results[name][p]:.0f} ms > {limit:.0f} ms (baseline {base[p]:.0f})")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scenario", default=DEFAULT_SCENARIO)
+    ap.add_argument("--repeat", type=int, default=1, help="run the scenario's turns this many times")
+    ap.add_argument("--tts-provider", choices=["openai", "elevenlabs"], default="openai")
+    ap.add_argument("--lead", type=float, default=0.4, help="seconds of room noise before each utterance")
+    ap.add_argument("--baseline", default=DEFAULT_BASELINE)
+    ap.add_argument("--check", action="store_true", help="exit 1 if a checked metric regressed")
+    ap.add_argument("--update-baseline", action="store_true")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    ap.add_argument("--slack-ms", type=float, default=50.0, help="allowed absolute slowdown")
+    args = ap.parse_args()
+
+    scenario = load_scenario(args.scenario, args.repeat)
+    servers = start_fakes(scenario)
+    workdir = tempfile.mkdtemp(prefix="karien-e2e-")
+    os.environ.update(servers.env())
+    os.environ.update({
+        "ELEVENLABS_API_KEY": "fake" if args.tts_provider == "elevenlabs" else "",
+        "TTS_STREAMING": "1",
+        "TTS_CACHE": "0",
+        "TTS_OUTPUT": "null",
+        "TRACE": "1",
+        "TRACE_FILE": os.path.join(workdir, "turns.jsonl"),
+    })
+    os.environ.update({k: str(v) for k, v in scenario.get("env", {}).items()})
+
+    try:
+        session = run_session(scenario, args.lead)
+    finally:
+        servers.stop()
+
+    from assistant.core.tracing import SEGMENTS, summarize
+
+    with open(session["trace_file"], encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    samples = summarize(records, {**SEGMENTS, **E2E_SEGMENTS})
+
+    turns = len(scenario["turns"])
+    print(
+        f"\n{len(records)}/{turns} turns in {session['seconds']:.1f}s "
+        f"({session['listens'] - 1 - turns} extra listens, {servers.deepgram.connections} Deepgram connections, "
+        f"{servers.deepgram.finalizes} finalizes, {servers.http.chat_requests} LLM and "
+        f"{servers.http.tts_requests} TTS requests, {len(servers.vts.triggered)} hotkeys, "
+        f"commands {session['commands']})"
+    )
+    spec = session["speculation"]
+    if spec["started"]:
+        print(
+            f"Speculative LLM: {spec['hits']}/{spec['started']} hits "
+            f"({100 * spec['hits'] / spec['started']:.0f}%), {spec['wasted_tokens']} completion and "
+            f"~{spec['wasted_prompt_tokens']} prompt tokens wasted"
+        )
+    lipsync = session["lipsync"]
+    if lipsync and lipsync["sent"]:
+        print(
+            f"Lip-sync: {lipsync['rate_hz']:.0f} Hz while speaking ({servers.vts.injected} injects received), "
+            f"{lipsync['dropped']} dropped, {lipsync['failed']} failed, audio-to-mouth offset "
+            f"p50 {lipsync['offset_p50_ms']:.0f} ms / p90 {lipsync['offset_p90_ms']:.0f} ms"
+        )
+    names = list(E2E_SEGMENTS) + list(SEGMENTS) + sorted(n for n in samples if n.startswith("span:"))
+    results = report(samples, names)
+
+    if args.update_baseline:
+        baseline = {
+            "scenario": os.path.relpath(args.scenario, HERE),
+            "repeat": args.repeat,
+            "metrics": {name: results[name] for name in CHECKED if name in results},
+        }
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+
+    failed = len(records) < turns
+    if failed:
+        print(f"FAIL: only {len(records)} of {turns} turns completed")
+    dispatched = [[cmd, list(params)] for cmd, params in session["commands"]]
+    for turn in scenario["turns"]:
+        for expected in turn.get("commands", []):
+            if expected not in dispatched:
+                print(f"FAIL: {turn['transcript']!r} did not dispatch {expected}")
+                failed = True
+    if args.check:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = check(results, json.load(f), args.tolerance, args.slack_ms)
+        for line in regressions:
+            print(f"REGRESSION: {line}")
+        failed = failed or bool(regressions)
+        if not regressions:
+            print("No regressions against baseline.")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+WAV-driven evaluation of the local VAD used for Deepgram endpointing.
+
+Each `<name>.wav` (16 kHz mono 16-bit) needs a `<name>.json` next to it with the
+labelled utterances: {"utterances": [[start_s, end_s], ...]}. Pauses inside an
+utterance must not end the turn; the gap between utterances must.
+
+    python -m benchmarks.eval_vad --synthesize benchmarks/data/vad   # build a labelled synthetic set
+    python -m benchmarks.eval_vad benchmarks/data/vad                # score the config defaults
+    python -m benchmarks.eval_vad benchmarks/data/vad --grid         # sweep thresholds
+
+Reported per setting: missed and false-start utterances, premature ends (a
+turn cut inside an utterance), onset error, end-of-speech detection delay and
+the share of audio that would actually be uploaded.
+"""
+import argparse
+import glob
+import itertools
+import json
+import os
+import statistics
+import wave
+
+import numpy as np
+
+from assistant.core.config import config
+from assistant.input.vad import SPEECH_END, SPEECH_START, VoiceActivityDetector
+
+RATE = 16000
+CHUNK_BYTES = 2048  # DeepgramSTT reads 1024 frames at a time
+
+
+def load(path: str):
+    with wave.open(path, "rb") as w:
+        if w.getframerate() != RATE or w.getnchannels() != 1 or w.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected 16 kHz mono 16-bit PCM")
+        pcm = w.readframes(w.getnframes())
+    with open(os.path.splitext(path)[0] + ".json") as f:
+        return pcm, json.load(f)["utterances"]
+
+
+def run_vad(pcm: bytes, hangover_ms: int, min_speech_ms: int, margin_db: float, prespeech_ms: int):
+    """
+    Replays pcm through the VAD in DeepgramSTT-sized chunks, mirroring its
+    upload policy. Returns ([(start_s, end_s or None)], bytes uploaded).
+    """
+    vad = VoiceActivityDetector(
+        sample_rate=RATE, hangover_ms=hangover_ms, min_speech_ms=min_speech_ms, speech_margin_db=margin_db
+    )
+    frame_s = vad.frame_ms / 1000
+    prespeech_chunks = max(1, -(-prespeech_ms * RATE * 2 // 1000 // CHUNK_BYTES))
+    segments, pending, sent = [], 0, 0
+    for offset in range(0, len(pcm) - CHUNK_BYTES + 1, CHUNK_BYTES):
+        chunk = pcm[offset:offset + CHUNK_BYTES]
+        events = vad.process(chunk)
+        for event in events:
+            if event == SPEECH_START:
+                segments.append([vad.speech_started_frame * frame_s, None])
+                sent += pending * CHUNK_BYTES
+            elif event == SPEECH_END:
+                segments[-1][1] = vad.speech_ended_frame * frame_s
+                segments[-1].append((vad.frames * frame_s))
+        if vad.in_speech or events:
+            sent += CHUNK_BYTES
+            pending = 0
+        else:
+            pending = min(pending + 1, prespeech_chunks)
+    return segments, sent
+
+
+def score(files, **params) -> dict:
+    missed = false_starts = premature = 0
+    onset_errors, end_delays = [], []
+    total_bytes = sent_bytes = utterances = 0
+    for pcm, labels in files:
+        segments, sent = run_vad(pcm, **params)
+        total_bytes += len(pcm)
+        sent_bytes += sent
+        utterances += len(labels)
+        used = set()
+        for start, end in labels:
+            hits = [i for i, seg in enumerate(segments) if seg[0] < end and (seg[1] is None or seg[1] > start)]
+            if not hits:
+                missed += 1
+                continue
+            used.update(hits)
+            premature += len(hits) - 1
+            first, last = segments[hits[0]], segments[hits[-1]]
+            onset_errors.append(abs(first[0] - start) * 1000)
+            if last[1] is not None:
+                # When the local turn actually ended (speech end + hangover) vs the true end
+                end_delays.append((last[2] - end) * 1000)
+        false_starts += len(segments) - len(used)
+
+    return {
+        "missed": missed,
+        "false_starts": false_starts,
+        "premature_ends": premature,
+        "onset_ms": statistics.median(onset_errors) if onset_errors else float("nan"),
+        "end_delay_ms": statistics.median(end_delays) if end_delays else float("nan"),
+        "uploaded": sent_bytes / total_bytes if total_bytes else 0.0,
+        "utterances": utterances,
+    }
+
+
+def synthesize(directory: str, count: int = 24, seed: int = 3):
+    """
+    Writes a labelled synthetic set: voiced syllables (harmonic stacks with
+    jittered pitch), fricative bursts and intra-utterance pauses, over
+    background noise at a range of SNRs, with keyboard clicks and mains hum
+    as distractors.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(directory, exist_ok=True)
+    t_syllable = np.arange(int(0.18 * RATE)) / RATE
+
+    def syllable():
+        f0 = rng.uniform(110, 260)
+        wave_ = sum(np.sin(2 * np.pi * f0 * k * t_syllable + rng.uniform(0, 6)) / k for k in range(1, 12))
+        envelope = np.sin(np.pi * np.arange(len(t_syllable)) / len(t_syllable)) ** 0.7
+        out = wave_ * envelope
+        if rng.random() < 0.3:
+            # Fricative onset ("s", "ş")
+            fric = rng.normal(0, 0.6, int(0.08 * RATE))
+            fric = np.diff(fric, prepend=0)
+            out = np.concatenate([fric, out])
+        return out
+
+    for n in range(count):
+        noise_level = 10 ** rng.uniform(1.3, 2.6)  # RMS ~26-52 dB
+        speech_level = noise_level * 10 ** (rng.uniform(10, 35) / 20)  # SNR 10-35 dB
+        lead_in = np.zeros(int(rng.uniform(0.8, 2.0) * RATE))
+        parts, labels, t = [lead_in], [], len(lead_in) / RATE
+        for _ in range(rng.integers(1, 4)):
+            start = t
+            words = []
+            for _ in range(rng.integers(2, 9)):
+                words.append(np.concatenate([syllable() for _ in range(rng.integers(1, 4))]))
+                # Short pauses between words, now and then a longer thinking pause
+                pause = rng.uniform(0.05, 0.2) if rng.random() < 0.85 else rng.uniform(0.3, 0.5)
+                words.append(np.zeros(int(pause * RATE)))
+            utterance = np.concatenate(words[:-1])
+            utterance *= speech_level / np.sqrt(np.mean(utterance ** 2))
+            parts.append(utterance)
+            t += len(utterance) / RATE
+            labels.append([round(start, 3), round(t, 3)])
+            gap = np.zeros(int(rng.uniform(1.5, 3.0) * RATE))
+            parts.append(gap)
+            t += len(gap) / RATE
+
+        signal = np.concatenate(parts)
+        signal += rng.normal(0, noise_level, len(signal))
+        signal += noise_level * 0.5 * np.sin(2 * np.pi * 50 * np.arange(len(signal)) / RATE)
+        for _ in range(rng.integers(0, 4)):
+            # Keyboard click: a few ms of loud broadband noise
+            at = rng.integers(0, len(signal) - 200)
+            signal[at:at + 80] += rng.normal(0, speech_level * 0.8, 80)
+
+        pcm = np.clip(signal, -32768, 32767).astype(np.int16).tobytes()
+        name = os.path.join(directory, f"synthetic_{n:02d}")
+        with wave.open(name + ".wav", "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(RATE)
+            w.writeframes(pcm)
+        with open(name + ".json", "w") as f:
+            json.dump({"utterances": labels}, f)
+    print(f"Wrote {count} labelled files to {directory}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("directory", nargs="?", default=os.path.join(os.path.dirname(__file__), "data", "vad"))
+    ap.add_argument("--synthesize", metavar="DIR", help="write a synthetic labelled set to DIR and exit")
+    ap.add_argument("--grid", action="store_true", help="sweep hangover / min speech / margin")
+    args = ap.parse_args()
+
+    if args.synthesize:
+        synthesize(args.synthesize)
+        return
+
+    paths = sorted(glob.glob(os.path.join(args.directory, "*.wav")))
+    if not paths:
+        ap.error(f"no WAV files in {args.directory} (use --synthesize to create some)")
+    files = [load(path) for path in paths]
+
+    defaults = (config.VAD_HANGOVER_MS, config.VAD_MIN_SPEECH_MS, config.VAD_SPEECH_MARGIN_DB)
+    if args.grid:
+        settings = list(itertools.product([500, 700, 900], [60, 100, 160], [6.0, 10.0, 14.0]))
+    else:
+        settings = [defaults]
+
+    print(f"{len(files)} files, {sum(len(labels) for _, labels in files)} utterances")
+    print(f"{'hangover':>8} {'min':>4} {'margin':>6} {'missed':>6} {'false':>5} {'cut':>4} "
+          f"{'onset ms':>8} {'end ms':>7} {'upload':>7}")
+    for hangover, min_speech, margin in settings:
+        result = score(
+            files, hangover_ms=hangover, min_speech_ms=min_speech, margin_db=margin,
+            prespeech_ms=config.VAD_PRESPEECH_MS,
+        )
+        marker = " *" if (hangover, min_speech, margin) == defaults else ""
+        print(
+            f"{hangover:>8} {min_speech:>4} {margin:>6.0f} {result['missed']:>6} {result['false_starts']:>5} "
+            f"{result['premature_ends']:>4} {result['onset_ms']:>8.0f} {result['end_delay_ms']:>7.0f} "
+            f"{result['uploaded']:>6.0%}{marker}"
+        )
+
+
+if __name__ == "__main__":
+    main()